@@ -0,0 +1,223 @@
+"""Headless batch code generation from a JSONL file of requests.
+
+Runs every request through CommandParser, CodeGenerator and FileManager,
+without microphone, speech or UI, so scaffolds can be generated in bulk
+and generation throughput measured. Each input line is a JSON object:
+
+    {"prompt": "create a flask api for todos", "language": "python", "project_name": "todo_api"}
+
+Only the prompt is required (use --prompt-key to read it from another
+field). `id` names the item in the results; it defaults to the line number.
+A result line is appended to the output as each item finishes, with the
+file written, where the code came from and per-item timings. Items already
+recorded as "ok" in the output are skipped, so an interrupted run resumes
+where it stopped when started again with the same arguments; failed items
+and items that fell back to an offline template are tried again.
+
+Usage:
+    python batch_generate.py prompts.jsonl [--output results.jsonl] [--concurrency 4] [--regenerate]
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.settings import Config
+from core.code_generator import CodeGenerator
+from core.command_parser import CommandParser
+from core.file_manager import FileManager
+from core.rate_limiter import RequestScheduler
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def load_items(path, prompt_key):
+    """Input items as dicts with id, prompt, language and project_name"""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            prompt = str(entry.get(prompt_key) or "").strip()
+            if not prompt:
+                print(f"[Batch] Line {number} has no {prompt_key!r}, skipped")
+                continue
+            items.append({
+                "id": str(entry.get("id") or entry.get("request_id") or f"line-{number}"),
+                "prompt": prompt,
+                "language": entry.get("language"),
+                "project_name": entry.get("project_name"),
+            })
+    return items
+
+def load_finished(path):
+    """Ids recorded as done in an earlier run's output"""
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut off by the interruption
+            if record.get("status") == "ok":
+                finished.add(record.get("id"))
+            else:
+                finished.discard(record.get("id"))
+    return finished
+
+class TimedSink:
+    """Streaming file wrapper that notes when the first code arrived"""
+
+    def __init__(self, target):
+        self.target = target
+        self.first_write = None
+
+    def write(self, text):
+        if text and self.first_write is None:
+            self.first_write = time.perf_counter()
+        self.target.write(text)
+
+    def add_block(self, block):
+        self.target.add_block(block)
+
+    def reset(self):
+        self.target.reset()
+
+class BatchRunner:
+    def __init__(self, code_gen, file_mgr, concurrency, regenerate=False):
+        self.code_gen = code_gen
+        self.file_mgr = file_mgr
+        self.parser = CommandParser()
+        self.concurrency = concurrency
+        self.regenerate = regenerate
+
+    def _project_name(self, item, parsed):
+        # Items run in parallel, so every one gets its own directory, even when names repeat
+        name = item["project_name"] or parsed["project_name"]
+        name = f"{name}_{item['id']}" if name else f"batch_{item['id']}"
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("._") or f"batch_{item['id']}"
+
+    def run_item(self, item):
+        """Generate one item on the calling thread, returns its result record"""
+        started = time.perf_counter()
+        record = {"id": item["id"], "prompt": item["prompt"],
+                  "started_at": datetime.now().isoformat(timespec="seconds")}
+        try:
+            parsed = self.parser.parse_command(item["prompt"])
+            language = item["language"] or parsed["language"]
+            record.update(language=language, project_name=self._project_name(item, parsed))
+            target = self.file_mgr.open_stream(language, record["project_name"])
+            sink = TimedSink(target)
+            try:
+                code = self.code_gen.generate_code_stream(
+                    item["prompt"], language, sink=sink, regenerate=self.regenerate,
+                    priority=RequestScheduler.PRIORITY_BATCH)
+            finally:
+                filepath, _ = target.close()
+            usage = self.code_gen.last_usage or {}
+            record.update(
+                # Offline templates are not worth keeping: a resumed run tries them again
+                status="fallback" if self.code_gen.last_source == "fallback" else "ok",
+                source=self.code_gen.last_source,
+                rate_limited=self.code_gen.rate_limited,
+                filepath=filepath,
+                extra_files=target.extra_files,
+                chars=len(code),
+                lines=code.count("\n") + 1 if code else 0,
+                ttft=round(sink.first_write - started, 3) if sink.first_write is not None else None,
+                request_type=usage.get("type"),
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+            )
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        return record
+
+    async def run(self, items, output):
+        """Generate items with bounded concurrency, appending each result as it finishes"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(item):
+            async with semaphore:
+                return await asyncio.to_thread(self.run_item, item)
+
+        results = []
+        for done in asyncio.as_completed([one(item) for item in items]):
+            record = await done
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            results.append(record)
+            print(f"[Batch] {record['id']}: {record['status']} in {record['seconds']:.1f} s "
+                  f"({len(results)}/{len(items)})")
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate code for every request in a JSONL file")
+    parser.add_argument("input", help="JSONL file with one request per line")
+    parser.add_argument("--output", help="results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=Config.BATCH_CONCURRENCY,
+                        help="requests generated at the same time")
+    parser.add_argument("--prompt-key", default="prompt", help="field holding the request text")
+    parser.add_argument("--regenerate", action="store_true", help="skip the generation cache lookup")
+    parser.add_argument("--limit", type=int, help="stop after this many pending items")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    items = load_items(args.input, args.prompt_key)
+    finished = load_finished(output_path)
+    pending = [item for item in items if item["id"] not in finished]
+    print(f"[Batch] {len(items)} items, {len(items) - len(pending)} already done, "
+          f"{len(pending)} to generate with concurrency {args.concurrency}")
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    if not pending:
+        return
+
+    code_gen = CodeGenerator()
+    runner = BatchRunner(code_gen, FileManager(), max(1, args.concurrency), regenerate=args.regenerate)
+    started = time.perf_counter()
+    results = []
+    try:
+        with open(output_path, "a", encoding="utf-8") as output:
+            results = asyncio.run(runner.run(pending, output))
+    except KeyboardInterrupt:
+        print(f"\n[Batch] Interrupted; run the same command again to resume ({output_path})")
+        return
+    wall = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == "ok"]
+    seconds = [r["seconds"] for r in ok]
+    ttfts = [r["ttft"] for r in ok if r.get("ttft") is not None]
+    fallbacks = sum(1 for r in results if r["status"] == "fallback")
+    sources = {}
+    for r in ok:
+        sources[r["source"]] = sources.get(r["source"], 0) + 1
+    print("\n=== Batch summary ===")
+    print(f"Items:       {len(results)} ({len(ok)} ok, {fallbacks} offline templates, "
+          f"{len(results) - len(ok) - fallbacks} failed)")
+    print(f"Sources:     {sources}")
+    print(f"Wall time:   {wall:.1f} s, {len(results) / wall * 60 if wall else 0:.1f} items/min")
+    if seconds:
+        print(f"Per item:    p50 {percentile(seconds, 50):.1f} s, p95 {percentile(seconds, 95):.1f} s")
+    if ttfts:
+        print(f"First code:  p50 {percentile(ttfts, 50):.2f} s, p95 {percentile(ttfts, 95):.2f} s")
+    print(f"Tokens:      {code_gen.token_stats}")
+    print(f"Scheduler:   {code_gen.scheduler.summary()}")
+    print(f"Results:     {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Offline benchmark for wake word and command capture.
+
+Replays WAV fixtures through VoiceInput with a local stub recognizer, so it
+needs neither a microphone nor network access. The fixture directory holds
+mono WAV files plus a manifest.json listing them:
+
+    [
+        {"file": "spectra_01.wav", "type": "wake", "said": "spectra", "word_end": 1.42},
+        {"file": "banana_01.wav", "type": "wake", "said": "banana"},
+        {"file": "command_01.wav", "type": "command",
+         "transcript": "create a python script named hello", "speech_end": 3.10}
+    ]
+
+Wake fixtures whose `said` contains one of VoiceInput.wake_variants should be
+detected; all others count towards false accepts. Times are in seconds from
+the start of the file.
+
+Usage:
+    python benchmark_voice.py fixtures/ [--speed 0] [--cloud] [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.voice_input import VoiceInput
+from core.audio_replay import ReplayMicrophone, StubRecognizer
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def run_wake_fixture(path, fixture, args):
+    mic = ReplayMicrophone(path, speed=args.speed)
+    recognizer = StubRecognizer(fixture.get("said", ""))
+    voice_input = VoiceInput(microphone=mic, recognizer=recognizer)
+    if args.cloud:
+        voice_input.wake_detector.templates = []
+
+    started = time.perf_counter()
+    detected = False
+    while not detected and not mic.exhausted:
+        detected = voice_input.listen_for_wake_word()
+    wall = time.perf_counter() - started
+    voice_input.close()
+
+    said = fixture.get("said", "").lower()
+    result = {
+        "file": fixture["file"],
+        "type": "wake",
+        "said": said,
+        "expected": any(variant in said for variant in voice_input.wake_variants),
+        "detected": detected,
+        "recognizer_calls": recognizer.calls,
+        "audio_sent": recognizer.audio_seconds,
+        "bytes_sent": recognizer.bytes_received,
+        "encode_time": voice_input.preprocessor.totals["encode_time"],
+        "vad_dropped": voice_input.vad.stats["dropped"],
+        "realtime_factor": wall / mic.duration,
+        "latency": None,
+    }
+    if detected and "word_end" in fixture:
+        detected_at = mic.opened_at[-1] + voice_input.last_wake_at
+        result["latency"] = detected_at - fixture["word_end"]
+    return result
+
+def run_command_fixture(path, fixture, args):
+    mic = ReplayMicrophone(path, speed=args.speed)
+    recognizer = StubRecognizer(fixture.get("transcript", ""))
+    voice_input = VoiceInput(microphone=mic, recognizer=recognizer)
+
+    # Capture from the top of the file, as if the wake word had just ended
+    voice_input.open_stream()
+    voice_input.mark_command_start(voice_input.stream.opened_at)
+    started = time.perf_counter()
+    text = voice_input.get_audio_input()
+    wall = time.perf_counter() - started
+    voice_input.close()
+
+    result = {
+        "file": fixture["file"],
+        "type": "command",
+        "heard": text,
+        "recognizer_calls": recognizer.calls,
+        "audio_sent": recognizer.audio_seconds,
+        "bytes_sent": recognizer.bytes_received,
+        "encode_time": voice_input.preprocessor.totals["encode_time"],
+        "vad_dropped": voice_input.vad.stats["dropped"],
+        "realtime_factor": wall / mic.duration,
+        "end_of_speech_delay": None,
+    }
+    if voice_input.last_phrase_end is not None and "speech_end" in fixture:
+        ended_at = mic.opened_at[-1] + voice_input.last_phrase_end
+        result["end_of_speech_delay"] = ended_at - fixture["speech_end"]
+    return result
+
+def summarize(results, wake_variants):
+    wake = [r for r in results if r["type"] == "wake"]
+    commands = [r for r in results if r["type"] == "command"]
+    summary = {"fixtures": len(results)}
+
+    positives = [r for r in wake if r["expected"]]
+    negatives = [r for r in wake if not r["expected"]]
+    summary["false_reject_rate"] = (
+        sum(not r["detected"] for r in positives) / len(positives) if positives else None
+    )
+    summary["false_accept_rate"] = (
+        sum(r["detected"] for r in negatives) / len(negatives) if negatives else None
+    )
+    per_variant = {}
+    for variant in dict.fromkeys(wake_variants):
+        said = [r for r in positives if variant in r["said"]]
+        if said:
+            per_variant[variant] = {
+                "fixtures": len(said),
+                "false_reject_rate": sum(not r["detected"] for r in said) / len(said),
+            }
+    summary["per_variant"] = per_variant
+
+    latencies = [r["latency"] for r in wake if r["latency"] is not None]
+    summary["wake_latency_mean"] = sum(latencies) / len(latencies) if latencies else None
+    summary["wake_latency_p95"] = percentile(latencies, 95)
+
+    delays = [r["end_of_speech_delay"] for r in commands if r["end_of_speech_delay"] is not None]
+    summary["end_of_speech_delay_mean"] = sum(delays) / len(delays) if delays else None
+    summary["end_of_speech_delay_p95"] = percentile(delays, 95)
+
+    summary["recognizer_calls"] = sum(r["recognizer_calls"] for r in results)
+    summary["wake_recognizer_calls"] = sum(r["recognizer_calls"] for r in wake)
+    summary["audio_seconds_sent"] = sum(r["audio_sent"] for r in results)
+    summary["bytes_sent"] = sum(r["bytes_sent"] for r in results)
+    summary["encode_time"] = sum(r["encode_time"] for r in results)
+    summary["vad_dropped"] = sum(r["vad_dropped"] for r in results)
+    return summary
+
+def print_summary(summary):
+    def fmt(value, unit=""):
+        if value is None:
+            return "n/a"
+        return f"{value * 1000:.0f} ms" if unit == "ms" else f"{value:.1%}" if unit == "%" else str(value)
+
+    print("\n=== Voice input benchmark ===")
+    print(f"Fixtures:                {summary['fixtures']}")
+    print(f"False reject rate:       {fmt(summary['false_reject_rate'], '%')}")
+    for variant, stats in summary["per_variant"].items():
+        print(f"  {variant:<22} {fmt(stats['false_reject_rate'], '%')} of {stats['fixtures']}")
+    print(f"False accept rate:       {fmt(summary['false_accept_rate'], '%')}")
+    print(f"Wake latency mean/p95:   {fmt(summary['wake_latency_mean'], 'ms')} / {fmt(summary['wake_latency_p95'], 'ms')}")
+    print(f"End-of-speech mean/p95:  {fmt(summary['end_of_speech_delay_mean'], 'ms')} / "
+          f"{fmt(summary['end_of_speech_delay_p95'], 'ms')}")
+    print(f"Recognizer calls:        {summary['recognizer_calls']} ({summary['wake_recognizer_calls']} for wake word)")
+    print(f"Audio sent:              {summary['audio_seconds_sent']:.1f} s, "
+          f"{summary['bytes_sent'] / 1024:.0f} KB (encode {summary['encode_time'] * 1000:.0f} ms)")
+    print(f"Segments dropped by VAD: {summary['vad_dropped']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV fixtures through VoiceInput")
+    parser.add_argument("fixtures", help="directory containing manifest.json and WAV files")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="playback speed relative to real time (0 = as fast as possible)")
+    parser.add_argument("--cloud", action="store_true",
+                        help="ignore enrolled samples and use the cloud wake word path")
+    parser.add_argument("--json", help="write per-fixture results and the summary to this file")
+    args = parser.parse_args()
+
+    with open(os.path.join(args.fixtures, "manifest.json"), encoding="utf-8") as f:
+        fixtures = json.load(f)
+
+    results = []
+    for fixture in fixtures:
+        path = os.path.join(args.fixtures, fixture["file"])
+        if fixture["type"] == "wake":
+            result = run_wake_fixture(path, fixture, args)
+        else:
+            result = run_command_fixture(path, fixture, args)
+        results.append(result)
+        print(f"[Bench] {fixture['file']}: {result}")
+
+    summary = summarize(results, VoiceInput.wake_variants)
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
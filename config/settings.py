@@ -7,11 +7,144 @@ load_dotenv()
 class Config:
     # API Keys
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com")  # point at fake_api_server.py for testing
+    
+    # API connection
+    API_TIMEOUT = float(os.getenv("API_TIMEOUT", "60.0"))  # seconds per request
+    API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5.0"))
+    API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "2"))  # for connection errors and 5xx, each charged to the rate limits
+    API_PREWARM = os.getenv("API_PREWARM", "true").lower() == "true"  # connect at startup
+    API_KEEPALIVE_SECONDS = float(os.getenv("API_KEEPALIVE_SECONDS", "25.0"))  # ping interval, 0 = only warm once
+    API_HEDGE = os.getenv("API_HEDGE", "true").lower() == "true"  # duplicate requests slower than usual
+    API_HEDGE_PERCENTILE = float(os.getenv("API_HEDGE_PERCENTILE", "0.95"))
+    API_HEDGE_MIN_DELAY = float(os.getenv("API_HEDGE_MIN_DELAY", "1.0"))  # never hedge sooner than this; bounds the worst case
+    API_TRANSPORT = os.getenv("API_TRANSPORT", "live")  # live, record, replay or fake (local fake API, no key needed)
+    API_REPLAY_TIMING = float(os.getenv("API_REPLAY_TIMING", "1.0"))  # multiplies recorded delays, 0 = none
+    FAKE_API_LATENCY = float(os.getenv("FAKE_API_LATENCY", "0.2"))  # seconds before a fake completion starts
+    FAKE_API_TOKENS_PER_SECOND = float(os.getenv("FAKE_API_TOKENS_PER_SECOND", "0"))  # fake stream pace, 0 = no limit
+    FAKE_API_ERROR_RATE = float(os.getenv("FAKE_API_ERROR_RATE", "0.0"))  # fraction of fake completions that fail
     
     # App Settings
     WAKE_WORD = os.getenv("WAKE_WORD", "spectra")
     USE_INTERNET_TTS = os.getenv("USE_INTERNET_TTS", "true").lower() == "true"
+    TTS_LANG = os.getenv("TTS_LANG", "en")
+    TTS_TLD = os.getenv("TTS_TLD", "co.in")  # Indian English accent
     
     # Paths
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    CODE_DIRECTORY = os.path.join(BASE_DIR, "generated_code")
\ No newline at end of file
+    CODE_DIRECTORY = os.path.join(BASE_DIR, "generated_code")
+    WAKE_WORD_SAMPLES_DIR = os.getenv("WAKE_WORD_SAMPLES_DIR", os.path.join(BASE_DIR, "wake_word_samples"))
+    FALLBACK_TEMPLATES_DIR = os.getenv("FALLBACK_TEMPLATES_DIR")  # extra offline templates, same layout as core/templates
+    GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", os.path.join(BASE_DIR, "generation_cache.sqlite3"))
+    API_CASSETTE = os.getenv("API_CASSETTE", os.path.join(BASE_DIR, "api_cassette.jsonl.gz"))  # API_TRANSPORT record/replay
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, "tts_cache"))
+    
+    # Wake word spotting
+    WAKE_WORD_THRESHOLD = float(os.getenv("WAKE_WORD_THRESHOLD", "18.0"))  # used with a single enrolled sample
+    WAKE_WORD_SENSITIVITY = float(os.getenv("WAKE_WORD_SENSITIVITY", "1.3"))  # margin over enrolled sample spread
+    WAKE_WORD_HOP_FRAMES = int(os.getenv("WAKE_WORD_HOP_FRAMES", "10"))  # run the matcher every 10 x 10 ms
+    WAKE_WORD_BARGE_IN_MARGIN = float(os.getenv("WAKE_WORD_BARGE_IN_MARGIN", "0.8"))  # stricter match over uncancelled playback
+
+    
+    # Circuit breaker around the API
+    BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "10"))  # recent calls considered
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "3"))
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))  # opens at this share of failures
+    BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "30.0"))  # slower calls count as failures
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15.0"))  # wait before the first probe
+    BREAKER_MAX_OPEN_SECONDS = float(os.getenv("BREAKER_MAX_OPEN_SECONDS", "300.0"))
+    
+    # Model routing: smallest model first, escalating when output fails validation
+    ROUTER_MODELS = [name.strip() for name in os.getenv("ROUTER_MODELS", "llama-3.1-8b-instant,llama-3.1-70b-versatile").split(",") if name.strip()]
+    ROUTER_COMPLEXITY_LIMITS = [float(v) for v in os.getenv("ROUTER_COMPLEXITY_LIMITS", "0.35").split(",") if v.strip()]  # per model but the last
+    ROUTER_LATENCY_BUDGET = float(os.getenv("ROUTER_LATENCY_BUDGET", "20.0"))  # seconds per command, 0 = no budget
+    ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+    ROUTER_STATS_ALPHA = float(os.getenv("ROUTER_STATS_ALPHA", "0.2"))
+    
+    # Client-side rate limiting; x-ratelimit-* response headers keep the budgets in sync
+    RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "30"))  # requests per minute
+    RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", "6000"))  # tokens per minute
+    RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_COMPLETION_TOKENS", "1500"))  # expected answer size when budgeting
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "20.0"))  # longest wait for an interactive request
+    RATE_LIMIT_BATCH_MAX_WAIT = float(os.getenv("RATE_LIMIT_BATCH_MAX_WAIT", "600.0"))  # longest wait for batch work
+    
+    # Completion budget (max_tokens) per kind of request
+    PROMPT_MAX_TOKENS_ONE_LINER = int(os.getenv("PROMPT_MAX_TOKENS_ONE_LINER", "512"))
+    PROMPT_MAX_TOKENS_SCRIPT = int(os.getenv("PROMPT_MAX_TOKENS_SCRIPT", "3072"))
+    PROMPT_MAX_TOKENS_GUI = int(os.getenv("PROMPT_MAX_TOKENS_GUI", "6144"))
+    PROMPT_MAX_TOKENS_MULTI_FILE = int(os.getenv("PROMPT_MAX_TOKENS_MULTI_FILE", "4096"))  # per file
+    
+    # Answers cut off at max_tokens are continued from their last lines instead of regenerated
+    CONTINUATION_MAX_CALLS = int(os.getenv("CONTINUATION_MAX_CALLS", "2"))
+    CONTINUATION_MAX_TOKENS = int(os.getenv("CONTINUATION_MAX_TOKENS", "2048"))
+    CONTINUATION_TAIL_CHARS = int(os.getenv("CONTINUATION_TAIL_CHARS", "1500"))  # code sent back as context
+    
+    # Multi-file projects: a manifest is planned first, then files are generated in parallel
+    PROJECT_MAX_FILES = int(os.getenv("PROJECT_MAX_FILES", "8"))
+    PROJECT_MAX_CONCURRENCY = int(os.getenv("PROJECT_MAX_CONCURRENCY", "4"))
+    PROJECT_PLAN_MAX_TOKENS = int(os.getenv("PROJECT_PLAN_MAX_TOKENS", "1024"))
+    
+    # Follow-up edits: patches against the last project instead of regenerating it
+    EDIT_CONTEXT_TOKENS = int(os.getenv("EDIT_CONTEXT_TOKENS", "1500"))  # budget for the code sent with an edit
+    EDIT_OUTLINE_CHARS = int(os.getenv("EDIT_OUTLINE_CHARS", "400"))  # per file, names of the sections not sent
+    EDIT_MAX_TOKENS = int(os.getenv("EDIT_MAX_TOKENS", "2048"))
+    
+    # Headless batch generation (batch_generate.py)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    
+    # Generated code cache
+    GENERATION_CACHE = os.getenv("GENERATION_CACHE", "true").lower() == "true"
+    GENERATION_CACHE_TTL_HOURS = float(os.getenv("GENERATION_CACHE_TTL_HOURS", "168"))  # 0 = never expire
+    GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "500"))
+    
+    # Synthesized speech cache
+    TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "50"))  # least recently played files are evicted above this
+    TTS_MEMORY_ITEMS = int(os.getenv("TTS_MEMORY_ITEMS", "32"))  # decoded phrases kept in memory
+    TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "120"))  # long text is spoken sentence by sentence
+    TTS_SYNTH_WORKERS = int(os.getenv("TTS_SYNTH_WORKERS", "3"))  # chunks synthesized in parallel
+    SPEECH_LOW_PRIORITY_TTL = float(os.getenv("SPEECH_LOW_PRIORITY_TTL", "3.0"))  # stale progress chatter is skipped
+    SPEECH_ACK_TIMEOUT = float(os.getenv("SPEECH_ACK_TIMEOUT", "10.0"))  # longest wait for an acknowledgement to finish
+    
+    # Shared audio stream
+    AUDIO_BUFFER_SECONDS = float(os.getenv("AUDIO_BUFFER_SECONDS", "30"))
+    AUDIO_PREROLL_SECONDS = float(os.getenv("AUDIO_PREROLL_SECONDS", "0.3"))  # audio kept from before a command starts, back to the wake word
+    AUDIO_CHUNK = int(os.getenv("AUDIO_CHUNK", "1024"))  # samples per microphone read
+    
+    # Run capture, wake word spotting and speech recognition in a separate process
+    AUDIO_WORKER_PROCESS = os.getenv("AUDIO_WORKER_PROCESS", "true").lower() == "true"
+    AUDIO_WORKER_RESTART_DELAY = float(os.getenv("AUDIO_WORKER_RESTART_DELAY", "1.0"))  # doubled after each failed restart
+    AUDIO_WORKER_MAX_RESTART_DELAY = float(os.getenv("AUDIO_WORKER_MAX_RESTART_DELAY", "30.0"))
+    AUDIO_WORKER_MAX_RESTARTS = int(os.getenv("AUDIO_WORKER_MAX_RESTARTS", "5"))  # failures in a row before giving up
+    AUDIO_WORKER_STALL_SECONDS = float(os.getenv("AUDIO_WORKER_STALL_SECONDS", "5.0"))  # restart if no audio arrives
+    AUDIO_WORKER_COMMAND_TIMEOUT = float(os.getenv("AUDIO_WORKER_COMMAND_TIMEOUT", "30.0"))
+    
+    # Handling of Spectra's own voice in the microphone: "gate" ignores audio captured
+    # while speaking, "cancel" subtracts the known output, "off" does nothing. Command
+    # capture always subtracts it when the output is known, so the user can answer
+    # over the acknowledgement
+    ECHO_MODE = os.getenv("ECHO_MODE", "gate").lower()
+    ECHO_TAIL_SECONDS = float(os.getenv("ECHO_TAIL_SECONDS", "0.3"))  # room reverb after playback stops
+    ECHO_MAX_DELAY = float(os.getenv("ECHO_MAX_DELAY", "0.25"))  # longest speaker-to-microphone delay searched
+    ECHO_ADAPT = float(os.getenv("ECHO_ADAPT", "0.3"))
+    ECHO_OVERSUBTRACT = float(os.getenv("ECHO_OVERSUBTRACT", "1.5"))
+    ECHO_GAIN_FLOOR = float(os.getenv("ECHO_GAIN_FLOOR", "0.05"))
+    
+    # Voice activity detection
+    VAD_ENERGY_MARGIN_DB = float(os.getenv("VAD_ENERGY_MARGIN_DB", "9.0"))  # speech must be this far above the noise floor
+    VAD_FLATNESS_MAX = float(os.getenv("VAD_FLATNESS_MAX", "0.35"))
+    VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", "0.3"))
+    VAD_NOISE_ADAPT = float(os.getenv("VAD_NOISE_ADAPT", "0.2"))
+    VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "200"))
+    VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "200"))
+    VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", "150"))
+    
+    # Speech recognition backends (see core/recognizers.py), tried in this order
+    RECOGNIZER_BACKENDS = [name.strip() for name in os.getenv("RECOGNIZER_BACKENDS", "google").split(",") if name.strip()]
+    RECOGNIZER_RACE = os.getenv("RECOGNIZER_RACE", "false").lower() == "true"  # query backends concurrently
+    RECOGNIZER_RACE_WIDTH = int(os.getenv("RECOGNIZER_RACE_WIDTH", "0"))  # 0 = race all backends
+    RECOGNIZER_MIN_CONFIDENCE = float(os.getenv("RECOGNIZER_MIN_CONFIDENCE", "0.6"))
+    RECOGNIZER_TIMEOUT = float(os.getenv("RECOGNIZER_TIMEOUT", "8.0"))
+    RECOGNIZER_STATS_ALPHA = float(os.getenv("RECOGNIZER_STATS_ALPHA", "0.2"))  # smoothing for latency stats
+    WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+    RECOGNIZER_SAMPLE_RATE = int(os.getenv("RECOGNIZER_SAMPLE_RATE", "16000"))  # audio is resampled to this before upload
+    RECOGNIZER_COMPRESS = os.getenv("RECOGNIZER_COMPRESS", "true").lower() == "true"  # FLAC-encode once up front
\ No newline at end of file
@@ -0,0 +1,182 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import httpx
+from groq import Groq
+from config.settings import Config
+from core.api_transport import make_transport, api_base_url
+
+def make_groq_client(on_response=None):
+    """Groq client on a long-lived connection pool, with timeouts from Config.
+
+    The SDK does not retry: RequestScheduler.run does, so every attempt is
+    charged to the rate limits. Returns (client, http_client); the httpx client is exposed so the pool
+    can be pre-warmed and kept alive by a ConnectionWarmer. `on_response`
+    is called with every httpx response, e.g. to read rate-limit headers.
+    API_TRANSPORT can record the responses to a cassette, replay them, or
+    use the local fake API instead.
+    """
+    limits = httpx.Limits(max_connections=10, max_keepalive_connections=4,
+                          keepalive_expiry=max(Config.API_KEEPALIVE_SECONDS * 2, 30.0))
+    http_client = httpx.Client(
+        event_hooks={"response": [on_response]} if on_response else None,
+        timeout=httpx.Timeout(Config.API_TIMEOUT, connect=Config.API_CONNECT_TIMEOUT),
+        limits=limits,
+        transport=make_transport(limits),
+    )
+    client = Groq(
+        # Replayed and fake responses need no key, but the SDK insists on one
+        api_key=Config.GROQ_API_KEY or "offline",
+        base_url=api_base_url(),
+        timeout=httpx.Timeout(Config.API_TIMEOUT, connect=Config.API_CONNECT_TIMEOUT),
+        max_retries=0,
+        http_client=http_client,
+    )
+    return client, http_client
+
+class ConnectionWarmer:
+    """Opens the API connection at startup and pings it so it never goes cold.
+
+    A cheap authenticated GET of the model list goes through the same
+    httpx pool the SDK uses, so DNS, TCP and TLS are done before the
+    first command, and again every API_KEEPALIVE_SECONDS.
+    """
+
+    def __init__(self, http_client, interval=None):
+        self.http_client = http_client
+        self.interval = Config.API_KEEPALIVE_SECONDS if interval is None else interval
+        self.url = api_base_url().rstrip("/") + "/openai/v1/models"
+        self.last_latency = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="api-warmer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def ping(self):
+        started = time.perf_counter()
+        response = self.http_client.get(self.url, headers={"Authorization": f"Bearer {Config.GROQ_API_KEY}"})
+        response.read()
+        self.last_latency = time.perf_counter() - started
+        return response.status_code
+
+    def _run(self):
+        first = True
+        while not self._stop.is_set():
+            try:
+                status = self.ping()
+                if first:
+                    print(f"[API] Connection warmed in {self.last_latency * 1000:.0f} ms (HTTP {status})")
+                    first = False
+            except Exception as e:
+                print(f"[API] Warm-up ping failed: {e}")
+            if not self.interval:
+                break
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+def close_quietly(result):
+    """Release a response nobody will read, e.g. the losing stream of a hedged pair"""
+    for target in (result, getattr(result, "response", None)):
+        close = getattr(target, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+            return
+
+class HedgedCaller:
+    """Runs API calls, sending a duplicate when the first is slower than usual.
+
+    The hedge delay is the API_HEDGE_PERCENTILE of recently observed
+    response-start latencies (never below API_HEDGE_MIN_DELAY). Whichever
+    copy answers first wins; the other is released when it completes.
+    A slow call therefore costs at most about that delay plus one normal
+    response time: with the default 1 s floor, ~1.05 s instead of the
+    slow tail. The duplicate is a request of its own, so `may_hedge` can
+    veto it, e.g. when there is no rate-limit budget left for it.
+    """
+
+    MIN_SAMPLES = 5
+
+    def __init__(self, enabled=None):
+        self.enabled = Config.API_HEDGE if enabled is None else enabled
+        self.samples = deque(maxlen=200)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="api")
+
+    def delay(self):
+        """Seconds to wait before hedging, None while there are too few samples"""
+        with self._lock:
+            samples = sorted(self.samples)
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(Config.API_HEDGE_PERCENTILE * (len(samples) - 1) + 0.5))
+        return max(samples[index], Config.API_HEDGE_MIN_DELAY)
+
+    def percentile(self, fraction):
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * (len(samples) - 1) + 0.5))]
+
+    def _record(self, elapsed):
+        with self._lock:
+            self.samples.append(elapsed)
+
+    def call(self, fn, discard=close_quietly, may_hedge=None):
+        """Return fn(), hedged with a second fn() if the first is slow and may_hedge() allows it"""
+        with self._lock:
+            self.stats["calls"] += 1
+        started = time.perf_counter()
+        delay = self.delay() if self.enabled else None
+        if delay is None:
+            try:
+                result = fn()
+            except Exception:
+                with self._lock:
+                    self.stats["errors"] += 1
+                raise
+            self._record(time.perf_counter() - started)
+            return result
+
+        primary = self._executor.submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        pending = [primary]
+        if not done and may_hedge is not None and not may_hedge():
+            print(f"[API] No response after {delay * 1000:.0f} ms, no budget for a hedged request")
+            with self._lock:
+                self.stats["hedges_skipped"] += 1
+        elif not done:
+            print(f"[API] No response after {delay * 1000:.0f} ms, sending a hedged request")
+            with self._lock:
+                self.stats["hedged"] += 1
+            pending.append(self._executor.submit(fn))
+
+        error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                self._record(time.perf_counter() - started)
+                if future is not primary:
+                    with self._lock:
+                        self.stats["hedge_wins"] += 1
+                for loser in pending:
+                    loser.add_done_callback(lambda f: discard(f.result()) if discard and not f.exception() else None)
+                return result
+        with self._lock:
+            self.stats["errors"] += 1
+        raise error
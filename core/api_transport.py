@@ -0,0 +1,231 @@
+import json
+import gzip
+import time
+import codecs
+import hashlib
+import threading
+import httpx
+from config.settings import Config
+
+# How the API client reaches the API (API_TRANSPORT):
+#   live   - straight to GROQ_BASE_URL
+#   record - live, and every completion is saved to the API_CASSETTE file
+#   replay - completions come from the API_CASSETTE file, no network or API key needed
+#   fake   - an in-process fake_api_server.py, no network or API key needed
+TRANSPORT_MODES = ("live", "record", "replay", "fake")
+
+# Response headers worth recording: the body type and what the rate limiter reads
+KEPT_HEADERS = ("content-type", "retry-after")
+
+def request_keys(request):
+    """(exact, loose) identity of a request in a cassette.
+
+    Both hash the method, path and JSON body (key order ignored); the
+    loose key leaves out the model, so a replay still matches when the
+    router picks a different model than it did while recording.
+    """
+    try:
+        body = json.loads(request.read() or b"{}")
+    except ValueError:
+        body = {"raw": request.content.decode("utf-8", "replace")}
+
+    def digest(payload):
+        text = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(f"{request.method} {request.url.path} {text}".encode("utf-8")).hexdigest()[:20]
+
+    loose = {key: value for key, value in body.items() if key != "model"} if isinstance(body, dict) else body
+    return digest(body), digest(loose)
+
+def describe(request):
+    """Short summary of a completion request, for logs and for reading a cassette by eye"""
+    try:
+        body = json.loads(request.read() or b"{}")
+        messages = body.get("messages") or [{}]
+        prompt = str(messages[-1].get("content", ""))[:80]
+        return {"model": body.get("model"), "stream": bool(body.get("stream")), "prompt": prompt}
+    except (ValueError, AttributeError):
+        return {}
+
+class Cassette:
+    """Recorded API responses in a JSON Lines file (gzip-compressed if the name ends in .gz).
+
+    One line per response: the request keys and summary, status, kept
+    headers, the milliseconds until the headers arrived, and the body as
+    [milliseconds since the previous piece, text] pairs, so streamed
+    answers replay with their original pacing. Responses to the same
+    request are replayed in the order they were recorded; the last one
+    repeats once they run out.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}  # key -> recorded responses, in order
+        self._served = {}  # key -> responses replayed so far
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "missed": 0}
+        self.load()
+
+    def _open(self, mode):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def load(self):
+        try:
+            with self._open("r") as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        for line in lines:
+            self._index(json.loads(line))
+        print(f"[Cassette] Loaded {len(lines)} recorded response(s) from {self.path}")
+
+    def _index(self, entry):
+        self.entries.setdefault(entry["key"], []).append(entry)
+        if entry.get("loose") and entry["loose"] != entry["key"]:
+            self.entries.setdefault(entry["loose"], []).append(entry)
+
+    def append(self, entry):
+        with self._lock:
+            # gzip files take appended members, so both kinds of file grow a line at a time
+            with self._open("a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._index(entry)
+            self.stats["recorded"] += 1
+
+    def next(self, keys):
+        """The next recorded response for the first of `keys` that has one, or None"""
+        with self._lock:
+            for key in keys:
+                entries = self.entries.get(key)
+                if entries:
+                    served = self._served.get(key, 0)
+                    self._served[key] = served + 1
+                    self.stats["replayed"] += 1
+                    return entries[min(served, len(entries) - 1)]
+            self.stats["missed"] += 1
+            return None
+
+class RecordingStream(httpx.SyncByteStream):
+    """Passes a response body through, noting each piece and when it arrived"""
+
+    def __init__(self, stream, entry, cassette):
+        self.stream = stream
+        self.entry = entry
+        self.cassette = cassette
+        self.complete = False
+
+    def __iter__(self):
+        # Network pieces can split a UTF-8 character; the decoder holds it until it is whole
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        last = time.perf_counter()
+        for data in self.stream:
+            text = decoder.decode(data)
+            if text:
+                now = time.perf_counter()
+                self.entry["chunks"].append([round((now - last) * 1000), text])
+                last = now
+            yield data
+        self.complete = True
+
+    def close(self):
+        self.stream.close()
+        # A body closed before its end (e.g. the losing copy of a hedged request) is not worth keeping
+        if self.complete:
+            self.cassette.append(self.entry)
+
+class RecordingTransport(httpx.BaseTransport):
+    """Sends requests to the live API and writes every completion to a cassette"""
+
+    def __init__(self, transport, cassette):
+        self.transport = transport
+        self.cassette = cassette
+
+    def handle_request(self, request):
+        if request.method != "POST":
+            return self.transport.handle_request(request)
+        # Record readable text rather than compressed bytes
+        request.headers["Accept-Encoding"] = "identity"
+        key, loose = request_keys(request)
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() in KEPT_HEADERS or name.lower().startswith("x-ratelimit-")}
+        entry = {"key": key, "loose": loose, "request": describe(request), "status": response.status_code,
+                 "headers": headers, "wait": round((time.perf_counter() - started) * 1000), "chunks": []}
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=RecordingStream(response.stream, entry, self.cassette),
+                              extensions=response.extensions)
+
+    def close(self):
+        self.transport.close()
+
+class ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks, timing):
+        self.chunks = chunks
+        self.timing = timing
+
+    def __iter__(self):
+        for delay, text in self.chunks:
+            if self.timing:
+                time.sleep(delay / 1000 * self.timing)
+            yield text.encode("utf-8")
+
+class ReplayTransport(httpx.BaseTransport):
+    """Answers requests from a cassette, with the recorded delays multiplied by `timing` (0 = no delays).
+
+    Model-list pings always succeed; a completion that was never recorded
+    gets a 404, which the client treats like any other API error.
+    """
+
+    def __init__(self, cassette, timing=1.0):
+        self.cassette = cassette
+        self.timing = timing
+
+    def handle_request(self, request):
+        if request.method == "GET" and request.url.path.rstrip("/").endswith("/models"):
+            return httpx.Response(200, json={"object": "list", "data": []})
+        entry = self.cassette.next(request_keys(request))
+        if entry is None:
+            summary = describe(request)
+            print(f"[Cassette] No recorded response for {summary.get('prompt', request.url.path)!r}")
+            return httpx.Response(404, json={"error": {"message": f"No recorded response in {self.cassette.path}",
+                                                       "type": "cassette_miss"}})
+        if self.timing:
+            time.sleep(entry["wait"] / 1000 * self.timing)
+        return httpx.Response(entry["status"], headers=entry["headers"],
+                              stream=ReplayStream(entry["chunks"], self.timing))
+
+_fake_server = None
+_fake_lock = threading.Lock()
+
+def api_base_url():
+    """Base URL of the API for API_TRANSPORT; "fake" starts the local fake server on first use"""
+    global _fake_server
+    if Config.API_TRANSPORT != "fake":
+        return Config.GROQ_BASE_URL
+    with _fake_lock:
+        if _fake_server is None:
+            # Imported here: the fake server is a development tool at the top of the repo
+            from fake_api_server import FakeAPIServer
+            _fake_server = FakeAPIServer(("127.0.0.1", 0), latency=Config.FAKE_API_LATENCY,
+                                         tokens_per_second=Config.FAKE_API_TOKENS_PER_SECOND,
+                                         error_rate=Config.FAKE_API_ERROR_RATE).start()
+            print(f"[API] Using the fake API at {_fake_server.base_url}")
+        return _fake_server.base_url
+
+def needs_api_key():
+    return Config.API_TRANSPORT in ("live", "record")
+
+def make_transport(limits):
+    """httpx transport for API_TRANSPORT, or None to let httpx connect normally"""
+    mode = Config.API_TRANSPORT
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown API_TRANSPORT {mode!r}, expected one of {', '.join(TRANSPORT_MODES)}")
+    if mode == "record":
+        print(f"[Cassette] Recording API responses to {Config.API_CASSETTE}")
+        return RecordingTransport(httpx.HTTPTransport(limits=limits), Cassette(Config.API_CASSETTE))
+    if mode == "replay":
+        print(f"[Cassette] Replaying API responses from {Config.API_CASSETTE} (timing x{Config.API_REPLAY_TIMING})")
+        return ReplayTransport(Cassette(Config.API_CASSETTE), Config.API_REPLAY_TIMING)
+    return None
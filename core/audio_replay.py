@@ -0,0 +1,113 @@
+import time
+import wave
+import speech_recognition as sr
+
+class ReplayMicrophone(sr.AudioSource):
+    """Drop-in replacement for sr.Microphone that plays a WAV file instead.
+
+    `speed` is the playback rate relative to real time: 1.0 paces reads like
+    a live device, 4.0 runs four times faster and 0 reads as fast as the
+    consumer asks. Once the file is exhausted, reads raise EOFError, which
+    stops the shared AudioStream just like an unplugged device would.
+    """
+
+    def __init__(self, path, speed=1.0, chunk_size=1024):
+        with wave.open(path, "rb") as wav:
+            if wav.getnchannels() != 1:
+                raise ValueError(f"{path}: replay fixtures must be mono")
+            self.SAMPLE_RATE = wav.getframerate()
+            self.SAMPLE_WIDTH = wav.getsampwidth()
+            self._pcm = wav.readframes(wav.getnframes())
+        self.CHUNK = chunk_size
+        self.path = path
+        self.speed = speed
+        self.stream = None
+        self._offset = 0  # bytes consumed so far, across context entries
+        self.opened_at = []  # fixture time (seconds) at each __enter__
+
+    @property
+    def duration(self):
+        return len(self._pcm) / float(self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+
+    @property
+    def position(self):
+        """Seconds of the fixture consumed so far"""
+        return self._offset / float(self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+
+    @property
+    def exhausted(self):
+        return self._offset >= len(self._pcm)
+
+    def __enter__(self):
+        assert self.stream is None, "This audio source is already inside a context manager"
+        self.opened_at.append(self.position)
+        self.stream = ReplayMicrophone.ReplayStream(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+    class ReplayStream(object):
+        def __init__(self, microphone):
+            self.microphone = microphone
+
+        def read(self, size):
+            mic = self.microphone
+            if mic.exhausted:
+                raise EOFError(f"end of replay fixture {mic.path}")
+            length = size * mic.SAMPLE_WIDTH
+            data = mic._pcm[mic._offset:mic._offset + length]
+            mic._offset += length
+            if mic.speed:
+                time.sleep(size / float(mic.SAMPLE_RATE) / mic.speed)
+            return data.ljust(length, b"\0")
+
+        def close(self):
+            pass
+
+class StubRecognizer(sr.Recognizer):
+    """Local stand-in for the cloud recognizer that counts calls and payload.
+
+    `transcribe` maps an AudioData to the text to return; a plain string is
+    returned for every call. An empty result raises UnknownValueError just
+    like the real service does for unintelligible audio.
+    """
+
+    def __init__(self, transcribe="", latency=0.0):
+        super().__init__()
+        self.transcribe = transcribe
+        self.latency = latency
+        self.calls = 0
+        self.audio_seconds = 0.0
+        self.bytes_received = 0  # what the cloud recognizer would upload (FLAC, like recognize_google)
+
+    def recognize_google(self, audio_data, key=None, language="en-US", pfilter=0, show_all=False, with_confidence=False):
+        text = self._transcribe(audio_data)
+        if not text:
+            if show_all:
+                return []
+            raise sr.UnknownValueError()
+        if show_all:
+            return {"alternative": [{"transcript": text, "confidence": 1.0}], "final": True}
+        return text
+
+    def recognize_sphinx(self, audio_data, *args, **kwargs):
+        text = self._transcribe(audio_data)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    # The stub answers for every backend in core.recognizers
+    recognize_whisper = recognize_vosk = recognize_sphinx
+
+    def _transcribe(self, audio_data):
+        self.calls += 1
+        raw = audio_data.get_raw_data()
+        try:
+            self.bytes_received += len(audio_data.get_flac_data(convert_width=2))
+        except Exception:
+            self.bytes_received += len(audio_data.get_wav_data())
+        self.audio_seconds += len(raw) / float(audio_data.sample_rate * audio_data.sample_width)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.transcribe(audio_data) if callable(self.transcribe) else self.transcribe
@@ -0,0 +1,124 @@
+import time
+import threading
+from collections import deque
+from config.settings import Config
+
+class AudioStream:
+    """Long-lived microphone reader that keeps recent chunks in a ring buffer.
+
+    Consumers track their own position as an absolute chunk index, so the
+    wake word listener and command capture can read the same stream
+    independently, and command capture can start from a point in the past.
+    """
+
+    def __init__(self, microphone, buffer_seconds=None):
+        self.microphone = microphone
+        self.sample_rate = microphone.SAMPLE_RATE
+        self.sample_width = microphone.SAMPLE_WIDTH
+        self.chunk = microphone.CHUNK
+        buffer_seconds = buffer_seconds or Config.AUDIO_BUFFER_SECONDS
+        self._chunks = deque(maxlen=self.seconds_to_chunks(buffer_seconds))
+        self._times = deque(maxlen=self._chunks.maxlen)  # time.monotonic() when each chunk was read
+        self._head = 0  # absolute index of the next chunk to be written
+        self.opened_at = 0  # index of the first chunk read since the device was (re)opened
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.error = None
+        self.listeners = []  # callables(data, timestamp) that also receive every chunk
+
+    @property
+    def seconds_per_chunk(self):
+        return self.chunk / float(self.sample_rate)
+
+    def seconds_to_chunks(self, seconds):
+        return max(1, int(round(seconds / self.seconds_per_chunk)))
+
+    def seconds_since_open(self, index):
+        """Stream time of chunk `index`, measured from when the device was opened"""
+        return (index - self.opened_at) * self.seconds_per_chunk
+
+    def is_running(self):
+        return self._running
+
+    @property
+    def finished(self):
+        """True once a recorded source (e.g. a ReplayMicrophone) has run out; there is no more audio to open"""
+        return not self._running and isinstance(self.error, EOFError)
+
+    def start(self):
+        """Open the microphone once and start filling the ring buffer"""
+        if self._running:
+            return
+        self.error = None
+        self.opened_at = self._head
+        self._running = True
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _reader(self):
+        try:
+            with self.microphone as source:
+                print("[Audio] Stream opened")
+                while self._running:
+                    data = source.stream.read(self.chunk)
+                    captured = time.monotonic()
+                    with self._cond:
+                        self._chunks.append(data)
+                        self._times.append(captured)
+                        self._head += 1
+                        self._cond.notify_all()
+                    for listener in self.listeners:
+                        listener(data, captured)
+        except EOFError as e:
+            print(f"[Audio] Recording ended: {e}")
+            self.error = e
+        except Exception as e:
+            print(f"[Audio Stream Error] {e}")
+            self.error = e
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+
+    def position(self):
+        """Absolute index of the next chunk that will be captured"""
+        with self._cond:
+            return self._head
+
+    def oldest(self):
+        with self._cond:
+            return self._head - len(self._chunks)
+
+    def chunk_time(self, index):
+        """time.monotonic() at which chunk `index` finished recording (None if no longer buffered)"""
+        with self._cond:
+            oldest = self._head - len(self._times)
+            if oldest <= index < self._head:
+                return self._times[index - oldest]
+        return None
+
+    def read(self, cursor, timeout=None):
+        """Return (start_index, chunks) for everything captured from `cursor` on.
+
+        Blocks up to `timeout` seconds for new audio. If the consumer fell so
+        far behind that `cursor` was overwritten, reading resumes at the
+        oldest chunk still buffered.
+        """
+        with self._cond:
+            if self._head <= cursor and self._running:
+                self._cond.wait_for(lambda: self._head > cursor or not self._running, timeout)
+            if self._head <= cursor and not self._running:
+                raise OSError(f"audio stream stopped: {self.error}")
+            oldest = self._head - len(self._chunks)
+            if cursor < oldest:
+                print(f"[Audio] Consumer fell behind, skipped {oldest - cursor} chunk(s)")
+                cursor = oldest
+            chunks = [self._chunks[i - oldest] for i in range(cursor, self._head)]
+            return cursor, chunks
@@ -0,0 +1,92 @@
+import wave
+from math import gcd
+import numpy as np
+
+def pcm_to_float(pcm, sample_width=2):
+    """Convert little-endian signed PCM bytes to a float32 array in [-1, 1]"""
+    if sample_width == 1:
+        samples = np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128.0
+        return samples / 128.0
+    if sample_width == 3:
+        raw = np.frombuffer(pcm, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                   | (raw[:, 2].astype(np.int8).astype(np.int32) << 16))
+        return samples.astype(np.float32) / 8388608.0
+    dtype = {2: np.int16, 4: np.int32}[sample_width]
+    return np.frombuffer(pcm, dtype=dtype).astype(np.float32) / float(np.iinfo(dtype).max + 1)
+
+def read_wav(path):
+    """Read a WAV file, return (mono float32 samples, sample rate)"""
+    with wave.open(path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        samples = pcm_to_float(wav.readframes(wav.getnframes()), wav.getsampwidth())
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+def rms(pcm, sample_width=2):
+    """Root mean square of a PCM buffer in sample units, like audioop.rms"""
+    samples = pcm_to_float(pcm, sample_width)
+    if not len(samples):
+        return 0.0
+    return float(np.sqrt((samples ** 2).mean())) * float(1 << (8 * sample_width - 1))
+
+def peak_level(chunks, sample_width=2):
+    """RMS of the loudest PCM chunk as a fraction of full scale (0 to 1)"""
+    return max((rms(chunk, sample_width) for chunk in chunks), default=0.0) / float(1 << (8 * sample_width - 1))
+
+def float_to_pcm(samples, sample_width=2):
+    """Convert float samples in [-1, 1] back to little-endian signed PCM bytes"""
+    samples = np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0)
+    if sample_width == 1:
+        return (samples * 127.0 + 128.0).astype(np.uint8).tobytes()
+    if sample_width == 3:
+        ints = (samples * 8388607.0).astype(np.int32)
+        return np.stack([ints & 0xFF, (ints >> 8) & 0xFF, (ints >> 16) & 0xFF], axis=1).astype(np.uint8).tobytes()
+    dtype = {2: np.int16, 4: np.int32}[sample_width]
+    return (samples * float(np.iinfo(dtype).max)).astype(dtype).tobytes()
+
+def mixdown(samples, channels):
+    """Average interleaved channels into mono"""
+    if channels <= 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+def _sinc_kernel(distance, cutoff, half_width, beta=8.6):
+    window = np.i0(beta * np.sqrt(np.clip(1.0 - (distance / half_width) ** 2, 0.0, 1.0))) / np.i0(beta)
+    return (cutoff * np.sinc(cutoff * distance) * window).astype(np.float32)
+
+def resample(samples, from_rate, to_rate, zero_crossings=16, block=16384):
+    """Band-limited resampling with a Kaiser-windowed sinc kernel.
+
+    Every output sample is a weighted sum of the 2 * zero_crossings nearest
+    input samples. For rational rate pairs (44.1k -> 16k is 160/441) the
+    fractional offsets repeat, so the kernel is tabulated once per phase and
+    each block of output samples is a single gather-multiply-sum.
+    """
+    if from_rate == to_rate or not len(samples):
+        return samples
+    common = gcd(int(from_rate), int(to_rate))
+    up, down = int(to_rate) // common, int(from_rate) // common
+    cutoff = min(1.0, up / float(down)) * 0.97  # low-pass just below the new Nyquist when downsampling
+    half_width = int(np.ceil(zero_crossings / cutoff))
+    offsets = np.arange(-half_width + 1, half_width + 1)
+    padded = np.concatenate([np.zeros(half_width, np.float32), samples, np.zeros(half_width + 1, np.float32)])
+    table = None
+    if up <= 4096:
+        table = _sinc_kernel(np.arange(up)[:, None] / float(up) - offsets[None, :], cutoff, half_width)
+
+    out_count = len(samples) * up // down
+    output = np.empty(out_count, dtype=np.float32)
+    for start in range(0, out_count, block):
+        n = np.arange(start, min(start + block, out_count), dtype=np.int64)
+        base, phase = np.divmod(n * down, up)
+        taps = base[:, None] + offsets[None, :] + half_width
+        if table is not None:
+            weights = table[phase]
+        else:
+            weights = _sinc_kernel(phase[:, None] / float(up) - offsets[None, :], cutoff, half_width)
+        output[start:start + len(n)] = np.einsum("ij,ij->i", padded[taps], weights)
+    return output
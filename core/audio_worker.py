@@ -0,0 +1,344 @@
+import os
+import math
+import time
+import queue
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from config.settings import Config
+from core.audio_utils import peak_level
+
+class SharedFrameRing:
+    """Fixed-size ring of PCM chunks in shared memory.
+
+    Layout: an int64 header (head, chunk_bytes, slots, sample_rate,
+    sample_width), a float64 heartbeat, one float64 capture timestamp per
+    slot, then the slots themselves. A single writer advances `head` after
+    filling a slot; readers index by absolute chunk number and get
+    memoryviews straight into the segment, so nothing is copied.
+    """
+
+    HEADER = 8 * 8
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray((7,), dtype=np.int64, buffer=shm.buf)
+        self._heartbeat = np.ndarray((1,), dtype=np.float64, buffer=shm.buf, offset=7 * 8)
+        self.slots = int(self._header[2])
+        self.chunk_bytes = int(self._header[1])
+        self._times = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=self.HEADER)
+        self._data_offset = self.HEADER + 8 * self.slots
+
+    @classmethod
+    def create(cls, sample_rate, sample_width, chunk, seconds):
+        """Ring holding `seconds` of audio recorded in `chunk`-sample reads"""
+        slots = max(2, int(math.ceil(seconds * sample_rate / chunk)))
+        chunk_bytes = chunk * sample_width
+        shm = shared_memory.SharedMemory(create=True, size=cls.HEADER + slots * (8 + chunk_bytes))
+        header = np.ndarray((7,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[1:5] = chunk_bytes, slots, sample_rate, sample_width
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            # Older versions register the segment again; the worker is spawned by the
+            # creator and shares its resource tracker, so that changes nothing, and
+            # unregistering here would drop the creator's own registration
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def head(self):
+        return int(self._header[0])
+
+    @property
+    def sample_rate(self):
+        return int(self._header[3])
+
+    @property
+    def sample_width(self):
+        return int(self._header[4])
+
+    @property
+    def heartbeat(self):
+        return float(self._heartbeat[0])
+
+    def write(self, data, captured=None):
+        """Append one chunk (called by the worker for every chunk it records)"""
+        head = int(self._header[0])
+        slot = head % self.slots
+        start = self._data_offset + slot * self.chunk_bytes
+        length = min(len(data), self.chunk_bytes)
+        self.shm.buf[start:start + length] = data[:length]
+        self._times[slot] = captured if captured is not None else time.monotonic()
+        self._heartbeat[0] = time.monotonic()
+        self._header[0] = head + 1
+
+    def read(self, cursor):
+        """Return (start_index, [memoryview, ...]) for the chunks from `cursor` to head.
+
+        The views alias the shared segment: use them before the writer laps
+        the reader (slots chunks later), or copy with bytes(view).
+        """
+        head = self.head
+        cursor = max(cursor, head - self.slots + 1)
+        views = []
+        for index in range(cursor, head):
+            start = self._data_offset + (index % self.slots) * self.chunk_bytes
+            views.append(self.shm.buf[start:start + self.chunk_bytes])
+        return cursor, views
+
+    def close(self):
+        # Drop our numpy views first, they keep the buffer exported
+        self._header = self._heartbeat = self._times = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _follow_commands(commands, playback, stop, on_ring):
+    """Worker side: apply playback events, the ring to publish into and the stop request sent by the main process"""
+    while not stop.is_set():
+        try:
+            message = commands.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if message[0] == "stop":
+            stop.set()
+        elif message[0] == "playback":
+            playback.apply(message[1], message[2])
+        elif message[0] == "ring" and message[2] == os.getpid():
+            # The queue outlives workers: a ring sent to one that died since is not ours
+            on_ring(message[1])
+
+def audio_worker_main(events, commands, device_index=None):
+    """Entry point of the audio process: capture, wake word spotting and ASR.
+
+    The worker reports its pid and stream format with "ready"; the main
+    process answers with a ("ring", name, pid) command for a ring sized to
+    match, and every chunk captured from then on is written into it.
+    """
+    from core.voice_input import VoiceInput
+    from core.echo import PlaybackMonitor
+
+    rings = []
+    playback = PlaybackMonitor()
+    stop = threading.Event()
+    voice_input = VoiceInput(device_index=device_index, playback=playback)
+    stream = voice_input.stream
+
+    def publish(name):
+        ring = SharedFrameRing.attach(name)
+        rings.append(ring)
+        stream.listeners.append(ring.write)
+
+    threading.Thread(target=_follow_commands, args=(commands, playback, stop, publish), daemon=True).start()
+    if not voice_input.microphone:
+        events.put(("error", "no microphone available"))
+        return
+    voice_input.open_stream()
+    events.put(("ready", os.getpid(), stream.sample_rate, stream.sample_width, stream.chunk))
+
+    try:
+        while not stop.is_set():
+            if voice_input.listen_for_wake_word(timeout=0.5):
+                events.put(("wake", stream.position()))
+                events.put(("command", voice_input.get_audio_input()))
+            elif not stream.is_running():
+                # Let the supervisor restart the whole process with a fresh PyAudio instance
+                events.put(("error", f"audio device lost: {stream.error}"))
+                return
+    finally:
+        voice_input.close()
+        for ring in rings:
+            ring.close()
+
+class AudioWorkerClient:
+    """Main-process side of the audio worker, with the same interface as VoiceInput.
+
+    Capture, wake word matching and speech recognition run in a separate
+    process, so they never compete with the Qt UI for the GIL. Frames are
+    published in a SharedFrameRing (`ring`), sized from the format the
+    worker reports, which input_level() reads without copying. A
+    supervisor thread restarts the worker if it dies or the device
+    stalls, backing off between attempts, and gives up (setting `error`)
+    after AUDIO_WORKER_MAX_RESTARTS failures in a row.
+    """
+
+    def __init__(self, device_index=None, playback=None):
+        self.device_index = device_index
+        self._ctx = multiprocessing.get_context("spawn")
+        self.ring = None  # created once the worker reports its stream format
+        self._ring_lock = threading.Lock()
+        self._level_cursor = None
+        self.events = self._ctx.Queue()
+        self.commands = self._ctx.Queue()
+        self._wake = queue.Queue()
+        self._heard = queue.Queue()
+        self._closed = threading.Event()
+        self.process = None
+        self.restarts = 0
+        self.failures = 0  # restarts since the worker last captured audio for a while
+        self.error = None  # why the worker was given up on
+        self._last_error = None
+        self._started_at = 0.0
+
+        if playback is not None:
+            playback.listeners.append(self._forward_playback)
+        self._start_worker()
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor.start()
+
+    def _start_worker(self):
+        self.process = self._ctx.Process(
+            target=audio_worker_main,
+            args=(self.events, self.commands, self.device_index),
+            daemon=True,
+        )
+        self.process.start()
+        self._started_at = time.monotonic()
+        print(f"[Audio Worker] Started (pid {self.process.pid})")
+
+    def _open_ring(self, pid, sample_rate, sample_width, chunk):
+        ring = SharedFrameRing.create(sample_rate, sample_width, chunk, Config.AUDIO_BUFFER_SECONDS)
+        with self._ring_lock:
+            old, self.ring = self.ring, ring
+            self._level_cursor = None
+        if old is not None:
+            old.close()
+        self.commands.put(("ring", ring.name, pid))
+        print(f"[Audio Worker] Capturing at {sample_rate} Hz, {8 * sample_width}-bit")
+
+    def _close_ring(self):
+        with self._ring_lock:
+            ring, self.ring = self.ring, None
+        if ring is not None:
+            ring.close()
+
+    def _healthy(self):
+        """The worker captured audio for longer than the stall window before it ended"""
+        with self._ring_lock:
+            last = self.ring.heartbeat if self.ring is not None else 0.0
+        return last - self._started_at > Config.AUDIO_WORKER_STALL_SECONDS
+
+    def _restart_worker(self, reason):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=2)
+        if self._healthy():
+            self.failures = 0
+        self._close_ring()
+        self.failures += 1
+        if self.failures > Config.AUDIO_WORKER_MAX_RESTARTS:
+            self._give_up(f"{self._last_error or reason}, gave up after {self.restarts} restart(s)")
+            return
+        delay = min(Config.AUDIO_WORKER_RESTART_DELAY * 2 ** (self.failures - 1), Config.AUDIO_WORKER_MAX_RESTART_DELAY)
+        print(f"[Audio Worker] Restarting in {delay:g} s: {reason}")
+        self.restarts += 1
+        # Waiting on the close event lets close() interrupt a long backoff
+        if not self._closed.wait(delay):
+            self._start_worker()
+
+    def _give_up(self, error):
+        self.error = error
+        print(f"[Audio Worker Error] {error}")
+        # Wake anyone waiting for the worker, they will find `error` set
+        self._wake.put(None)
+        self._heard.put(None)
+
+    def _stalled(self):
+        """No audio for a while after startup, e.g. the device hung without erroring"""
+        since_start = time.monotonic() - self._started_at
+        if since_start < Config.AUDIO_WORKER_STALL_SECONDS:
+            return False
+        with self._ring_lock:
+            heartbeat = self.ring.heartbeat if self.ring is not None else 0.0
+        last = max(heartbeat, self._started_at)
+        return time.monotonic() - last > Config.AUDIO_WORKER_STALL_SECONDS
+
+    def _supervise(self):
+        while not self._closed.is_set():
+            try:
+                event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                event = None
+
+            if event is not None:
+                kind = event[0]
+                if kind == "wake":
+                    self._wake.put(event[1])
+                elif kind == "command":
+                    self._heard.put(event[1])
+                elif kind == "ready" and event[1] == self.process.pid:
+                    self._last_error = None
+                    self._open_ring(*event[1:])
+                elif kind == "error":
+                    self._last_error = event[1]
+                    print(f"[Audio Worker Error] {event[1]}")
+
+            if self._closed.is_set() or self.error:
+                continue
+            if not self.process.is_alive():
+                self._restart_worker(f"worker exited with code {self.process.exitcode}")
+            elif self._stalled():
+                self._restart_worker("no audio received")
+
+    def _forward_playback(self, event, interval):
+        self.commands.put(("playback", event, interval))
+
+    def input_level(self):
+        """Loudest chunk since the last call, as RMS over full scale (0 to 1), read straight from the ring"""
+        with self._ring_lock:
+            if self.ring is None:
+                return 0.0
+            if self._level_cursor is None:
+                self._level_cursor = self.ring.head
+            start, views = self.ring.read(self._level_cursor)
+            self._level_cursor = start + len(views)
+            try:
+                return peak_level(views, self.ring.sample_width)
+            finally:
+                # Release the views now, an exported buffer stops the ring from closing
+                for view in views:
+                    view.release()
+
+    def listen_for_wake_word(self, timeout=None):
+        """Wait for the worker to report the wake word, return True if detected"""
+        if self.error:
+            print(f"[Wake Word] Audio worker unavailable: {self.error}")
+            return False
+        try:
+            return self._wake.get(timeout=timeout) is not None
+        except queue.Empty:
+            return False
+
+    def get_audio_input(self):
+        """Return the command the worker captured after the last wake word"""
+        try:
+            command = self._heard.get(timeout=Config.AUDIO_WORKER_COMMAND_TIMEOUT)
+        except queue.Empty:
+            print("[Command] Timeout")
+            return "Sorry, I didn't catch that."
+        if command is None:
+            return "Error: No microphone available."
+        return command
+
+    def close(self):
+        self._closed.set()
+        self.commands.put(("stop",))
+        self._supervisor.join(timeout=2)
+        if self.process is not None:
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+        self._close_ring()
@@ -0,0 +1,120 @@
+import time
+import threading
+from collections import deque
+from config.settings import Config
+
+class CircuitBreaker:
+    """Stops calling a service that is known to be failing.
+
+    closed:    calls go through; outcomes of the last BREAKER_WINDOW calls
+               are kept, and the breaker opens when at least
+               BREAKER_FAILURE_RATE of them failed (calls slower than
+               BREAKER_SLOW_CALL_SECONDS count as failures). Failures
+               marked fatal (bad key, no network) open it at once.
+    open:      allow() is False, callers use their fallback immediately.
+               A background thread waits, then probes the service.
+    half_open: the probe is running, and one real call is let through
+               as a trial. Success closes the breaker, failure reopens it
+               with a doubled wait (up to BREAKER_MAX_OPEN_SECONDS).
+
+    `listeners` are called as listener(old_state, new_state, reason).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, probe=None):
+        self.name = name
+        self.probe = probe  # callable() -> bool, True if the service looks healthy
+        self.state = self.CLOSED
+        self.listeners = []
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._outcomes = deque(maxlen=Config.BREAKER_WINDOW)
+        self._open_seconds = Config.BREAKER_OPEN_SECONDS
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may be made now; every allowed call must be followed by record_*()"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self, elapsed=0.0):
+        if elapsed > Config.BREAKER_SLOW_CALL_SECONDS:
+            self.record_failure(reason=f"call took {elapsed:.1f} s")
+            return
+        with self._lock:
+            self.stats["calls"] += 1
+            self._outcomes.append(True)
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                self._open_seconds = Config.BREAKER_OPEN_SECONDS
+                self._transition(self.CLOSED, "trial call succeeded")
+
+    def record_skipped(self):
+        """The allowed call was never answered for a reason unrelated to health (e.g. rate limiting)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, fatal=False, reason="call failed"):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["failures"] += 1
+            self._outcomes.append(False)
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                self._open_seconds = min(self._open_seconds * 2, Config.BREAKER_MAX_OPEN_SECONDS)
+                self._transition(self.OPEN, f"trial call failed: {reason}")
+            elif self.state == self.CLOSED:
+                failures = self._outcomes.count(False)
+                if fatal:
+                    self._transition(self.OPEN, reason)
+                elif len(self._outcomes) >= Config.BREAKER_MIN_CALLS and \
+                        failures / len(self._outcomes) >= Config.BREAKER_FAILURE_RATE:
+                    self._transition(self.OPEN, f"{failures}/{len(self._outcomes)} recent calls failed ({reason})")
+
+    def _transition(self, state, reason):
+        """Change state (lock held) and tell listeners"""
+        old, self.state = self.state, state
+        if state == self.OPEN:
+            self.stats["opened"] += 1
+            threading.Thread(target=self._probe_later, name=f"{self.name}-probe", daemon=True).start()
+        elif state == self.CLOSED:
+            self._outcomes.clear()
+        print(f"[Circuit] {self.name}: {old} -> {state} ({reason})")
+        for listener in self.listeners:
+            try:
+                listener(old, state, reason)
+            except Exception as e:
+                print(f"[Circuit] Listener failed: {e}")
+
+    def _probe_later(self):
+        """Background probing while open"""
+        time.sleep(self._open_seconds)
+        with self._lock:
+            if self.state != self.OPEN:
+                return
+            self._transition(self.HALF_OPEN, f"probing after {self._open_seconds:.1f} s")
+        if self.probe is None:
+            return
+        try:
+            healthy = self.probe()
+        except Exception as e:
+            healthy = False
+            print(f"[Circuit] {self.name} probe failed: {e}")
+        with self._lock:
+            if self.state != self.HALF_OPEN:
+                return
+            if healthy:
+                self._open_seconds = Config.BREAKER_OPEN_SECONDS
+                self._transition(self.CLOSED, "probe succeeded")
+            else:
+                self._open_seconds = min(self._open_seconds * 2, Config.BREAKER_MAX_OPEN_SECONDS)
+                self._transition(self.OPEN, "probe failed")
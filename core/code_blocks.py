@@ -0,0 +1,201 @@
+import os
+import re
+
+# File extension -> language name used in generation prompts
+EXTENSION_LANGUAGES = {
+    "py": "python", "js": "javascript", "mjs": "javascript", "jsx": "javascript", "ts": "typescript",
+    "html": "html", "htm": "html", "css": "css", "java": "java", "cpp": "cpp", "cc": "cpp", "h": "cpp",
+    "hpp": "cpp", "json": "json", "md": "markdown", "txt": "text", "sql": "sql", "sh": "bash",
+    "yml": "yaml", "yaml": "yaml", "toml": "toml",
+}
+
+# Fence info strings -> language names
+LANGUAGE_ALIASES = {
+    "py": "python", "python3": "python", "js": "javascript", "node": "javascript", "jsx": "javascript",
+    "ts": "typescript", "c++": "cpp", "cxx": "cpp", "htm": "html", "sh": "bash", "shell": "bash",
+    "zsh": "bash", "yml": "yaml",
+}
+
+FILENAME = r"[\w][\w./-]*\.[A-Za-z0-9]{1,6}"
+# ```js title="app.js"  /  ```python main.py  /  ```python:main.py
+INFO_FILENAME = re.compile(rf"(?:(?:title|file|filename|name)\s*=\s*[\"']?|\s|:)({FILENAME})")
+# **style.css**  /  `app.js`:  /  ### File: app.js
+PROSE_FILENAME = re.compile(rf"(?:[`*]({FILENAME})[`*]|^\W*(?:file(?:name)?:?\s*)?({FILENAME}):?\W*$)", re.IGNORECASE)
+# # main.py  /  // File: app.js  /  <!-- index.html -->
+COMMENT_FILENAME = re.compile(rf"^\s*(?:#|//|/\*|<!--)\s*(?:file(?:name)?:\s*)?({FILENAME})\s*(?:\*/|-->)?\s*$",
+                              re.IGNORECASE)
+
+def file_language(path, default="text"):
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    return EXTENSION_LANGUAGES.get(extension, default)
+
+class CodeBlockExtractor:
+    """Pulls code blocks out of model output in one pass, as it streams in.
+
+    feed() returns the code of the primary (first) block as its lines
+    arrive, so it can be streamed to the main file. Every block, with its
+    language and any filename hint (from the fence, the prose line before
+    it or a first-line comment), is appended to `blocks` and passed to
+    `on_block` as soon as its fence closes. Only new text is scanned, a
+    line at a time.
+
+    An answer without fences is all primary code; a short preamble before
+    the first fence ("Here is the code:") is dropped. A `resume` extractor
+    reads the continuation of a cut-off answer: it is already inside the
+    primary block, so it only skips a re-opened fence.
+    """
+
+    PREAMBLE_LINES = 5
+
+    def __init__(self, resume=False, on_block=None):
+        self.blocks = []
+        self.on_block = on_block
+        # start -> code (unfenced) or fenced -> done <-> extra
+        self.state = "resume" if resume else "start"
+        self._pieces = []  # the unfinished line
+        self._preamble = []
+        self._hint = None  # filename named in the prose before the next block
+        self._block = None
+
+    @property
+    def primary_open(self):
+        """True while more primary code may follow, i.e. a cut-off here needs a continuation"""
+        return self.state in ("start", "resume", "fenced", "code")
+
+    def feed(self, text):
+        """Return the primary code contained in the next piece of output"""
+        out = []
+        start = 0
+        while True:
+            end = text.find("\n", start)
+            if end < 0:
+                if start < len(text):
+                    self._pieces.append(text[start:])
+                break
+            self._pieces.append(text[start:end + 1])
+            line, self._pieces = "".join(self._pieces), []
+            out.append(self._line(line))
+            start = end + 1
+        return "".join(out)
+
+    def flush(self, keep_partial=True):
+        """Return whatever primary code is still buffered at the end of the stream.
+
+        keep_partial=False drops an unfinished last line, e.g. when the
+        answer was cut off and a continuation will write it again; a later
+        block left open is then marked incomplete.
+        """
+        partial, self._pieces = "".join(self._pieces), []
+        tail = self._line(partial) if partial and keep_partial else ""
+        if self.state == "start":
+            self.state = "code"
+            tail = "".join(self._preamble) + tail
+            self._preamble = []
+            self._open(None, primary=True)
+            self._block["lines"].append(tail)
+        if self._block is not None:
+            self._close(complete=keep_partial or self._block["primary"])
+        return tail
+
+    def _open(self, fence, primary):
+        language, filename = None, None
+        if fence is not None:
+            info = fence.strip()[3:].strip()
+            first = re.split(r"[\s:{]", info, maxsplit=1)[0].lower()
+            if first and "." not in first and "=" not in first:
+                language = LANGUAGE_ALIASES.get(first, first)
+            match = INFO_FILENAME.search(" " + info)
+            filename = match.group(1) if match else None
+        self._block = {"index": len(self.blocks), "primary": primary, "language": language,
+                       "filename": filename or self._hint, "lines": []}
+        self._hint = None
+
+    def _close(self, complete=True):
+        block, self._block = self._block, None
+        code = "".join(block.pop("lines"))
+        if block["filename"] is None:
+            first_line = code.split("\n", 1)[0]
+            match = COMMENT_FILENAME.match(first_line)
+            if match:
+                block["filename"] = match.group(1)
+        if block["language"] is None and block["filename"]:
+            block["language"] = file_language(block["filename"], None)
+        block["code"] = code.strip("\n")
+        block["complete"] = complete
+        self.blocks.append(block)
+        if self.on_block is not None:
+            self.on_block(block)
+
+    def _line(self, line):
+        is_fence = line.lstrip().startswith("```")
+        if self.state == "resume":
+            if not line.strip():
+                return ""
+            self.state = "fenced"
+            self._open(None, primary=True)
+            if is_fence:
+                return ""
+            self._block["lines"].append(line)
+            return line
+        if self.state == "start":
+            if is_fence:
+                self.state = "fenced"
+                for held in self._preamble:
+                    self._note_prose(held)
+                self._preamble = []
+                self._open(line, primary=True)
+                return ""
+            self._preamble.append(line)
+            if len(self._preamble) < self.PREAMBLE_LINES:
+                return ""
+            self.state = "code"
+            held, self._preamble = "".join(self._preamble), []
+            self._open(None, primary=True)
+            self._block["lines"].append(held)
+            return held
+        if self.state in ("fenced", "extra"):
+            if is_fence:
+                self._close()
+                self.state = "done"
+                if line.strip() != "```":
+                    # "```css" where a bare closing fence was expected: the model skipped
+                    # the close, so this starts the next block
+                    self.state = "extra"
+                    self._open(line, primary=False)
+                return ""
+            self._block["lines"].append(line)
+            return line if self.state == "fenced" else ""
+        if self.state == "code":
+            if is_fence:
+                return ""
+            self._block["lines"].append(line)
+            return line
+        # done: prose between blocks
+        if is_fence:
+            self.state = "extra"
+            self._open(line, primary=False)
+        else:
+            self._note_prose(line)
+        return ""
+
+    def _note_prose(self, line):
+        if line.strip():
+            match = PROSE_FILENAME.search(line.strip())
+            self._hint = (match.group(1) or match.group(2)) if match else None
+
+def join_blocks(code, blocks):
+    """One text holding the primary code and any other blocks, readable by split_blocks()"""
+    extra = [block for block in blocks if not block["primary"] and block["complete"]]
+    if not extra:
+        return code
+    parts = [f"```\n{code}\n```"]
+    for block in extra:
+        info = " ".join(part for part in (block["language"], block["filename"]) if part)
+        parts.append(f"```{info}\n{block['code']}\n```")
+    return "\n\n".join(parts)
+
+def split_blocks(text):
+    """(primary code, other complete blocks) of a model answer or a join_blocks() text"""
+    extractor = CodeBlockExtractor()
+    code = extractor.feed(text) + extractor.flush()
+    return code.strip(), [block for block in extractor.blocks if not block["primary"] and block["complete"]]
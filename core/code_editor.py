@@ -0,0 +1,241 @@
+import os
+import re
+import ast
+import time
+from config.settings import Config
+from core.code_blocks import file_language
+from core.prompt_builder import estimate_tokens
+from core.file_manager import inside_project
+
+# Words that say nothing about which part of the code a request is about
+STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "into", "from", "make", "add", "change", "update",
+    "modify", "fix", "remove", "delete", "rename", "replace", "also", "please", "can", "you", "code",
+    "program", "app", "script", "file", "should", "when", "then", "new", "use", "have", "has", "its",
+}
+
+BLOCK_PATTERN = re.compile(
+    r"(?:^|\n)(?P<path>[^\n]*)\n<<<<<<< SEARCH\n(?P<search>.*?)\n?=======\n(?P<replace>.*?)\n?>>>>>>> REPLACE",
+    re.DOTALL,
+)
+
+NAME_PATTERN = re.compile(r"(?:def|class|function|interface|struct)\s+([A-Za-z_$][\w$]*)|([A-Za-z_$][\w$]*)\s*[=(:{]")
+
+def words(text):
+    """Lower-case words of text, with snake_case and camelCase identifiers split up"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return {word for word in re.findall(r"[a-z][a-z0-9]+", text.lower()) if word not in STOP_WORDS}
+
+def section_name(heading):
+    """Short name for a section in the project outline"""
+    match = NAME_PATTERN.search(heading)
+    return (match.group(1) or match.group(2)) if match else heading[:30]
+
+def split_sections(code, language):
+    """Split code into top-level sections, returns a list of (start, end) 1-based line ranges.
+
+    Python is split on its syntax tree (imports, each function, each method
+    of a class); other languages on unindented lines that follow a blank
+    line or the end of a block.
+    """
+    lines = code.split("\n")
+    if language == "python":
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            tree = None
+        if tree is not None:
+            starts = []
+            for node in tree.body:
+                start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+                starts.append(start)
+                if isinstance(node, ast.ClassDef):
+                    # Big classes are offered method by method
+                    starts.extend(min([child.lineno] + [d.lineno for d in child.decorator_list])
+                                  for child in node.body
+                                  if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child is not node.body[0])
+            return _ranges(sorted(set([1] + starts)), len(lines))
+    starts = [1]
+    for number, line in enumerate(lines[1:], 2):
+        previous = lines[number - 2].rstrip()
+        if line[:1] not in ("", " ", "\t", "}", ")", "]") and not line.startswith("</") and \
+                (not previous or previous.endswith(("}", "};", ";", ">"))):
+            starts.append(number)
+    return _ranges(starts, len(lines))
+
+def _ranges(starts, line_count):
+    return [(start, (starts[i + 1] - 1) if i + 1 < len(starts) else line_count)
+            for i, start in enumerate(starts) if start <= line_count]
+
+def parse_patch(text):
+    """SEARCH/REPLACE blocks in a model reply, as a list of (path, search, replace)"""
+    blocks = []
+    for match in BLOCK_PATTERN.finditer(text):
+        path = match.group("path").strip().strip("`*#: ")
+        blocks.append((path, match.group("search"), match.group("replace")))
+    return blocks
+
+def apply_block(content, search, replace):
+    """content with search replaced by replace, or None if search is not found exactly once"""
+    if not search.strip():
+        return content.rstrip("\n") + "\n\n" + replace.rstrip("\n") + "\n" if content.strip() else replace
+    if content.count(search) == 1:
+        return content.replace(search, replace)
+    if content.count(search) > 1:
+        return None
+    # Tolerate differences in trailing whitespace and indentation
+    lines = content.split("\n")
+    wanted = [line.strip() for line in search.strip("\n").split("\n")]
+    found = [i for i in range(len(lines) - len(wanted) + 1)
+             if [line.strip() for line in lines[i:i + len(wanted)]] == wanted]
+    if len(found) != 1:
+        return None
+    start = found[0]
+    return "\n".join(lines[:start] + replace.rstrip("\n").split("\n") + lines[start + len(wanted):])
+
+class CodeEditor:
+    """Applies follow-up commands to the files of the current session as patches.
+
+    Instead of regenerating a program, the model gets an outline of the
+    project plus the few sections most related to the command (within
+    EDIT_CONTEXT_TOKENS) and answers with SEARCH/REPLACE blocks. All blocks
+    must apply cleanly or no file is touched.
+    """
+
+    def __init__(self, code_gen, session):
+        self.code_gen = code_gen
+        self.session = session
+        self.last_stats = None
+
+    def _load(self):
+        files = []
+        for filepath, language in self.session.existing_files():
+            with open(filepath, encoding="utf-8") as f:
+                code = f.read()
+            language = language or file_language(filepath)
+            files.append({"filepath": filepath, "path": os.path.relpath(filepath, self.session.project_path),
+                          "language": language, "code": code})
+        return files
+
+    def build_context(self, command, files):
+        """Outline of every file plus the most relevant sections, within the token budget"""
+        wanted = words(command)
+        sections = []
+        outline = []
+        for file in files:
+            lines = file["code"].split("\n")
+            names = []
+            for start, end in split_sections(file["code"], file["language"]):
+                text = "\n".join(lines[start - 1:end]).rstrip()
+                if not text.strip():
+                    continue
+                heading = lines[start - 1].strip()[:80]
+                names.append(section_name(heading))
+                overlap = len(wanted & words(text))
+                # Prefer sections whose own name matches, then the entry file
+                score = overlap + 2 * len(wanted & words(heading)) + (0.5 if file["filepath"] == self.session.entry else 0)
+                sections.append({"file": file, "start": start, "end": end, "text": text, "score": score})
+            # One line per file naming its sections, so the model knows what exists elsewhere
+            listing = ", ".join(names)
+            if len(listing) > Config.EDIT_OUTLINE_CHARS:
+                listing = listing[:Config.EDIT_OUTLINE_CHARS].rsplit(", ", 1)[0] + ", ..."
+            outline.append(f"- {file['path']} ({file['language']}, {len(lines)} lines): {listing}")
+
+        budget = Config.EDIT_CONTEXT_TOKENS - estimate_tokens("\n".join(outline))
+        chosen = []
+        for section in sorted(sections, key=lambda s: -s["score"]):
+            cost = estimate_tokens(section["text"]) + 10
+            if cost > budget:
+                continue
+            if section["score"] <= 0.5 and chosen:
+                break  # unrelated sections are only worth sending when nothing matched
+            chosen.append(section)
+            budget -= cost
+        chosen.sort(key=lambda s: (s["file"]["path"], s["start"]))
+
+        parts = [f"### {s['file']['path']} lines {s['start']}-{s['end']}\n```{s['file']['language']}\n{s['text']}\n```"
+                 for s in chosen]
+        return "Project files:\n" + "\n".join(outline) + "\n\nRelevant sections:\n" + "\n\n".join(parts), chosen
+
+    def _prompt(self, command, context):
+        return f"""You are editing an existing project. Change only what the request needs.
+
+Reply with one or more edit blocks and nothing else, in exactly this form:
+path/of/file
+<<<<<<< SEARCH
+lines copied exactly from the sections below
+=======
+the new lines
+>>>>>>> REPLACE
+
+Keep SEARCH short but unique in its file. Use an empty SEARCH to append to a file or to create a new one.
+
+{context}
+
+Request: {command}"""
+
+    def edit(self, command):
+        """Apply a follow-up command to the session's files.
+
+        Returns the list of changed file paths, or None if the edit could
+        not be made (no session, API unavailable, or a block that does not
+        match the files); files are left untouched in that case.
+        """
+        files = self._load()
+        if not files:
+            return None
+        started = time.perf_counter()
+        context, chosen = self.build_context(command, files)
+        prompt = self._prompt(command, context)
+        reply = self.code_gen.chat([{"role": "user", "content": prompt}],
+                                   max_tokens=Config.EDIT_MAX_TOKENS, temperature=0.1)
+        if not reply:
+            return None
+
+        blocks = parse_patch(reply)
+        if not blocks:
+            print(f"[Edit] No edit blocks in the reply: {reply[:200]}")
+            return None
+        by_path = {file["path"]: file for file in files}
+        contents = {file["path"]: file["code"] for file in files}
+        for path, search, replace in blocks:
+            if path not in by_path and search.strip():
+                # A missing or mangled path on a single-file project means that file
+                path = files[0]["path"] if len(files) == 1 else path
+            try:
+                inside_project(self.session.project_path, path)
+            except ValueError as e:
+                print(f"[Edit] {e}, no files changed")
+                return None
+            if path not in contents and not search.strip():
+                contents[path] = ""
+            patched = apply_block(contents.get(path, ""), search, replace) if path in contents else None
+            if patched is None:
+                print(f"[Edit] Could not apply an edit to {path or 'an unnamed file'}, no files changed")
+                return None
+            contents[path] = patched
+
+        changed = []
+        for path, code in contents.items():
+            original = by_path[path]["code"] if path in by_path else None
+            if code == original:
+                continue
+            filepath = inside_project(self.session.project_path, path)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath + ".part", "w", encoding="utf-8") as f:
+                f.write(code)
+            os.replace(filepath + ".part", filepath)
+            self.session.record_file(filepath, self.session.project_path, file_language(filepath))
+            changed.append(filepath)
+
+        usage = self.code_gen.last_usage or {}
+        sent = usage.get("prompt_tokens") or estimate_tokens(prompt)
+        received = usage.get("completion_tokens") or estimate_tokens(reply)
+        # What regenerating would have cost: system prompt and request in, every file back out
+        regenerate = 150 + estimate_tokens(command) + sum(estimate_tokens(file["code"]) for file in files)
+        self.last_stats = {"sections": len(chosen), "blocks": len(blocks), "tokens_sent": sent,
+                           "tokens_received": received, "regenerate_estimate": regenerate,
+                           "seconds": time.perf_counter() - started}
+        print(f"[Edit] {len(blocks)} edit(s) to {len(changed)} file(s) from {len(chosen)} section(s): "
+              f"{sent} tokens sent, {received} received (regenerating: ~{regenerate})")
+        return changed
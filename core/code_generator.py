@@ -1,432 +1,574 @@
-from groq import Groq
 from config.settings import Config
+from core.api_client import make_groq_client, ConnectionWarmer, HedgedCaller
+from core.api_transport import needs_api_key
+from core.generation_cache import GenerationCache
+from core.template_registry import TEMPLATES
+from core.model_router import ModelRouter, validate_code
+from core.circuit_breaker import CircuitBreaker
+from core.rate_limiter import RequestScheduler
+from core.prompt_builder import PromptBuilder, estimate_tokens
+from core.continuation import code_tail, OverlapTrimmer
+from core.code_blocks import CodeBlockExtractor, join_blocks, split_blocks
+from collections import deque
+import re
+import threading
+import time
 import requests
 
+# API errors that will not go away by retrying the next command
+FATAL_API_ERRORS = {"AuthenticationError", "PermissionDeniedError", "APIConnectionError"}
+# Errors that mean "too many requests", not "service down"
+RATE_LIMIT_ERRORS = {"RateLimitError", "RateLimitExceeded"}
+
 class CodeGenerator:
+    MODEL = "auto"  # chosen per request by the ModelRouter
+    TEMPERATURE = 0.3  # Lower temperature for more focused code generation
+    SYSTEM_PROMPT_VERSION = 2  # bump when PromptBuilder's prompts change, so cached answers are not reused
+    
     def __init__(self):
-        if not Config.GROQ_API_KEY or Config.GROQ_API_KEY == "your_groq_api_key_here":
+        if needs_api_key() and (not Config.GROQ_API_KEY or Config.GROQ_API_KEY == "your_groq_api_key_here"):
             raise ValueError("❌ Missing or invalid GROQ_API_KEY in .env")
-        self.client = Groq(api_key=Config.GROQ_API_KEY)
+        # Every request waits its turn for API budget; response headers keep the budget in sync
+        self.scheduler = RequestScheduler()
+        self.client, self.http_client = make_groq_client(on_response=self.scheduler.observe)
+        # Connect before the first command arrives and keep the connection alive
+        self.warmer = ConnectionWarmer(self.http_client)
+        if Config.API_PREWARM:
+            self.warmer.start()
+        # Skip the API entirely while it is known to be down
+        self.breaker = CircuitBreaker("groq", probe=self._probe)
+        # Outcome of the latest request, kept per thread so parallel callers each see their own
+        self._request_state = threading.local()
+        self.last_source = None  # "api", "cache" or "fallback" for the latest request
+        self.rate_limited = False  # the latest fallback was caused by rate limiting, not an outage
+        # Response-start latencies differ between full and streamed completions
+        self.hedger = HedgedCaller()
+        self.stream_hedger = HedgedCaller()
         self.api_working = None  # Cache API status
+        # Progress subscribers for streaming generation, called as listener(event, data)
+        # with event "start", "first_token", "code", "block", "done" or "error"
+        self.listeners = []
+        self.metrics = deque(maxlen=100)  # per-request timings of streaming generation
+        self.cache = GenerationCache() if Config.GENERATION_CACHE else None
+        self.router = ModelRouter()
+        self.prompts = PromptBuilder()
+        self.token_stats = {}  # request type -> requests, prompt and completion tokens so far
+        self._stats_lock = threading.Lock()
         
-    def generate_code(self, prompt, language="python"):
-        """Generate code based on natural language prompt"""
-        system_prompt = f"""You are Spectra, an expert AI coding assistant. Generate clean, well-commented, functional code based on the user's request.
-
-Rules:
-- Provide complete, runnable code
-- Include necessary imports and dependencies  
-- Add helpful comments for complex logic
-- Follow best practices for {language}
-- Make the code production-ready
-- If creating a GUI or visual application, make it functional and attractive
-
-Language: {language}
-User Request: {prompt}"""
-
-        try:
-            completion = self.client.chat.completions.create(
-                model="llama-3.1-70b-versatile",  # Using more capable model
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,  # Lower temperature for more focused code generation
-                max_tokens=8000,  # Increased token limit for complex code
-                top_p=0.9
+    @property
+    def last_source(self):
+        return getattr(self._request_state, "source", None)
+    
+    @last_source.setter
+    def last_source(self, source):
+        self._request_state.source = source
+    
+    @property
+    def last_usage(self):
+        """Token counts of this thread's latest request, or None"""
+        return getattr(self._request_state, "usage", None)
+    
+    @property
+    def rate_limited(self):
+        return getattr(self._request_state, "rate_limited", False)
+    
+    @rate_limited.setter
+    def rate_limited(self, value):
+        self._request_state.rate_limited = value
+    
+    def _probe(self):
+        """Background health check used by the circuit breaker"""
+        return self.warmer.ping() < 400
+    
+    def _api_failed(self, error):
+        if type(error).__name__ in RATE_LIMIT_ERRORS:
+            # The service is up, just busy: no reason to open the breaker
+            self.rate_limited = True
+            self.breaker.record_skipped()
+            return
+        self.api_working = False
+        self.breaker.record_failure(fatal=type(error).__name__ in FATAL_API_ERRORS, reason=str(error)[:120])
+    
+    def _api_call(self, hedger, create, messages, max_tokens, priority):
+        """Send create() once the scheduler has budget for it, hedged by `hedger` if there is budget for a copy"""
+        # Expected size for the tokens-per-minute budget; response headers correct it
+        tokens = sum(estimate_tokens(m["content"]) for m in messages) + min(max_tokens, Config.RATE_LIMIT_COMPLETION_TOKENS)
+        return self.scheduler.run(
+            lambda: hedger.call(create, may_hedge=lambda: self.scheduler.try_acquire(priority, tokens)),
+            priority=priority, tokens=tokens)
+    
+    def _record_tokens(self, kind, prompt_estimate, max_tokens, usage, completion_text):
+        """Note the prompt and completion tokens of a request, reported or estimated.
+        
+        A continuation's tokens are added to the request it continues, so
+        last_usage covers the whole answer.
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        counts = {
+            "type": kind,
+            "prompt_tokens": prompt_tokens or prompt_estimate,
+            "completion_tokens": completion_tokens or estimate_tokens(completion_text or ""),
+            "max_tokens": max_tokens,
+            "estimated": prompt_tokens is None,
+        }
+        current = self.last_usage
+        if kind == "continuation" and current is not None:
+            self._request_state.usage = dict(
+                current,
+                prompt_tokens=current["prompt_tokens"] + counts["prompt_tokens"],
+                completion_tokens=current["completion_tokens"] + counts["completion_tokens"],
+                estimated=current["estimated"] or counts["estimated"],
+                continuations=current.get("continuations", 0) + 1,
             )
+        else:
+            self._request_state.usage = counts
+        with self._stats_lock:
+            totals = self.token_stats.setdefault(kind, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            totals["requests"] += 1
+            totals["prompt_tokens"] += counts["prompt_tokens"]
+            totals["completion_tokens"] += counts["completion_tokens"]
+        print(f"[Tokens] {kind}: {counts['prompt_tokens']} prompt + {counts['completion_tokens']} completion "
+              f"(max {max_tokens}{', estimated' if counts['estimated'] else ''})")
+        return counts
+    
+    def _offline(self, prompt, language):
+        """Fallback path taken without touching the network while the breaker is open"""
+        print("[Circuit] Groq API unavailable, using offline templates")
+        self.api_working = False
+        self.last_source = "fallback"
+        return self._get_fallback_code(prompt, language)
+    
+    def _cache_key(self, prompt, language):
+        return self.cache.key(prompt, language, self.MODEL, self.TEMPERATURE, self.SYSTEM_PROMPT_VERSION)
+    
+    def _cached(self, prompt, language, generate, regenerate):
+        """Run generate() -> (code, from_api) through the cache, returns (code, source)"""
+        code, source = self.cache.get_or_generate(
+            self._cache_key(prompt, language), generate, bypass=regenerate,
+            prompt=prompt, language=language, model=self.MODEL,
+        )
+        print(f"[Codegen Cache] {source}")
+        if source in ("hit", "coalesced"):
+            self.last_source = "cache"
+        return code, source
+    
+    def generate_code(self, prompt, language="python", regenerate=False,
+                      priority=RequestScheduler.PRIORITY_INTERACTIVE, request_type=None):
+        """Generate code based on natural language prompt.
+        
+        Answers are served from the generation cache when possible;
+        `regenerate` skips the lookup and refreshes the stored answer.
+        `priority` orders the request against others waiting for API budget.
+        `request_type` ("one_liner", "script", "gui", "multi_file") sets the
+        completion budget; it is guessed from the prompt when not given.
+        Only the first code block of the answer is returned.
+        """
+        self.rate_limited = False
+        self._request_state.usage = None
+        request = self.prompts.build(prompt, language, request_type)
+        if self.cache is None:
+            return split_blocks(self._request_code(request, priority)[0])[0]
+        return split_blocks(self._cached(prompt, language, lambda: self._request_code(request, priority), regenerate)[0])[0]
+    
+    def _request_code(self, request, priority=RequestScheduler.PRIORITY_INTERACTIVE):
+        """Call the API, returns (answer, from_api); fallback code is not worth caching.
+        
+        The answer is the first code block, followed by any further blocks
+        in join_blocks() form.
+        """
+        prompt, language = request["prompt"], request["language"]
+        messages, max_tokens = request["messages"], request["max_tokens"]
+        model = self.router.route(prompt, language)
+        
+        while True:
+            if not self.breaker.allow():
+                return self._offline(prompt, language), False
+            started = time.perf_counter()
+            try:
+                completion = self._api_call(self.hedger, lambda: self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=self.TEMPERATURE,
+                    max_tokens=max_tokens,
+                    top_p=0.9
+                ), messages, max_tokens, priority)
+            except Exception as e:
+                print(f"Groq API Error: {e}")
+                self.router.record(model, time.perf_counter() - started, False)
+                self._api_failed(e)
+                self.last_source = "fallback"
+                return self._get_fallback_code(prompt, language), False
             
-            generated_code = completion.choices[0].message.content.strip()
+            text = completion.choices[0].message.content or ""
+            self._record_tokens(request["type"], request["prompt_tokens"], max_tokens,
+                                getattr(completion, "usage", None), text)
             
-            # Clean up the code (remove markdown formatting if present)
-            if generated_code.startswith("```"):
-                lines = generated_code.split('\n')
-                # Remove first line with ```language
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                # Remove last line with ```
-                if lines and lines[-1].strip() == "```":
-                    lines = lines[:-1]
-                generated_code = '\n'.join(lines)
+            # Clean up the code (remove markdown formatting and any text around it)
+            extractor = CodeBlockExtractor()
+            generated_code = extractor.feed(text)
+            # A cut-off answer keeps its complete lines (unless only a later block or chatter was cut off)
+            cut_off = getattr(completion.choices[0], "finish_reason", None) == "length"
+            truncated = cut_off and extractor.primary_open
+            generated_code = (generated_code + extractor.flush(keep_partial=not cut_off)).strip("\n")
+            blocks = extractor.blocks
             
-            self.api_working = True
-            return generated_code
+            if truncated:
+                # Keep the complete lines and ask only for the rest
+                try:
+                    generated_code = self._continue_text(request, model, generated_code + "\n", priority, blocks).rstrip()
+                except Exception as e:
+                    print(f"[Codegen] Continuation failed: {e}")
             
+            self.api_working = True
+            self.breaker.record_success(time.perf_counter() - started)
+            self.last_source = "api"
+            valid = validate_code(generated_code, language)
+            self.router.record(model, time.perf_counter() - started, valid)
+            larger = None if valid else self.router.escalate(model)
+            if larger is None:
+                return join_blocks(generated_code, blocks), True
+            print(f"[Router] {model} output failed validation, escalating to {larger}")
+            model = larger
+    
+    def chat(self, messages, model=None, max_tokens=1024, temperature=None,
+             priority=RequestScheduler.PRIORITY_INTERACTIVE):
+        """One plain completion through the scheduler, breaker and hedger, returns the text or None"""
+        self._request_state.usage = None
+        if not self.breaker.allow():
+            return None
+        started = time.perf_counter()
+        try:
+            completion = self._api_call(self.hedger, lambda: self.client.chat.completions.create(
+                model=model or self.router.models[-1],
+                messages=messages,
+                temperature=self.TEMPERATURE if temperature is None else temperature,
+                max_tokens=max_tokens
+            ), messages, max_tokens, priority)
         except Exception as e:
             print(f"Groq API Error: {e}")
-            self.api_working = False
-            return self._get_fallback_code(prompt, language)
+            self._api_failed(e)
+            return None
+        self.api_working = True
+        self.breaker.record_success(time.perf_counter() - started)
+        text = completion.choices[0].message.content
+        self._record_tokens("chat", sum(estimate_tokens(m["content"]) + 4 for m in messages), max_tokens,
+                            getattr(completion, "usage", None), text)
+        return text
     
-    def _get_fallback_code(self, prompt, language):
-        """Provide more sophisticated fallback code when API is unavailable"""
-        fallback_templates = {
-            "python": {
-                "web scraping": '''import requests
-from bs4 import BeautifulSoup
-
-def scrape_website(url):
-    """Scrape website content"""
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        return soup.get_text()
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return None
-
-# Example usage
-if __name__ == "__main__":
-    url = "https://example.com"
-    content = scrape_website(url)
-    print(content)''',
-                
-                "gui": '''import tkinter as tk
-from tkinter import ttk
-
-class Application:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("Spectra Application")
-        self.root.geometry("400x300")
-        self.setup_ui()
+    def _notify(self, event, data):
+        for listener in self.listeners:
+            try:
+                listener(event, data)
+            except Exception as e:
+                print(f"[Codegen] Progress listener failed: {e}")
     
-    def setup_ui(self):
-        # Main frame
-        main_frame = ttk.Frame(self.root, padding="10")
-        main_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Title
-        title_label = ttk.Label(main_frame, text="Welcome to Spectra", 
-                               font=("Arial", 16, "bold"))
-        title_label.pack(pady=10)
+    def generate_code_stream(self, prompt, language="python", sink=None, regenerate=False,
+                             priority=RequestScheduler.PRIORITY_INTERACTIVE, request_type=None):
+        """Generate code as a token stream, writing clean code to `sink` as it arrives.
         
-        # Input field
-        self.input_var = tk.StringVar()
-        input_entry = ttk.Entry(main_frame, textvariable=self.input_var, width=30)
-        input_entry.pack(pady=5)
+        `sink` is anything with write(text) and reset(), usually a
+        FileManager.open_stream() file. Returns the complete code, like
+        generate_code(). Cached answers are written to the sink in one go.
         
-        # Button
-        action_button = ttk.Button(main_frame, text="Execute", 
-                                  command=self.on_button_click)
-        action_button.pack(pady=10)
-        
-        # Output area
-        self.output_text = tk.Text(main_frame, height=10, width=50)
-        self.output_text.pack(pady=5, fill=tk.BOTH, expand=True)
-    
-    def on_button_click(self):
-        user_input = self.input_var.get()
-        self.output_text.insert(tk.END, f"Processed: {user_input}\\n")
-        self.input_var.set("")
-    
-    def run(self):
-        self.root.mainloop()
-
-if __name__ == "__main__":
-    app = Application()
-    app.run()''',
-                
-                "api": '''import flask
-from flask import Flask, request, jsonify
-import json
-
-app = Flask(__name__)
-
-# Sample data
-data_store = []
-
-@app.route('/', methods=['GET'])
-def home():
-    return jsonify({"message": "Welcome to Spectra API", "status": "active"})
-
-@app.route('/api/data', methods=['GET'])
-def get_data():
-    return jsonify({"data": data_store, "count": len(data_store)})
-
-@app.route('/api/data', methods=['POST'])
-def add_data():
-    try:
-        new_item = request.get_json()
-        if new_item:
-            data_store.append(new_item)
-            return jsonify({"message": "Data added successfully", "item": new_item}), 201
-        return jsonify({"error": "No data provided"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/data/<int:item_id>', methods=['DELETE'])
-def delete_data(item_id):
-    try:
-        if 0 <= item_id < len(data_store):
-            deleted_item = data_store.pop(item_id)
-            return jsonify({"message": "Data deleted", "item": deleted_item})
-        return jsonify({"error": "Item not found"}), 404
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)''',
-                
-                "default": '''# Python code generated by Spectra
-import os
-import sys
-from datetime import datetime
-
-def main():
-    """Main function"""
-    print("🌟 Code generated by Spectra")
-    print(f"📅 Generated at: {datetime.now()}")
-    print(f"💻 Python version: {sys.version}")
+        The first code block of the answer goes to write(); if the sink has
+        add_block(block), each further block (CSS next to HTML, say) is
+        passed to it as soon as its fence closes.
+        """
+        self.rate_limited = False
+        self._request_state.usage = None
+        request = self.prompts.build(prompt, language, request_type)
+        if self.cache is None:
+            return split_blocks(self._stream_code(request, sink, priority)[0])[0]
+        answer, source = self._cached(prompt, language, lambda: self._stream_code(request, sink, priority), regenerate)
+        code, blocks = split_blocks(answer)
+        if source in ("hit", "coalesced"):
+            self._notify("start", {"prompt": prompt, "language": language})
+            self._notify("first_token", {"ttft": 0.0, "cached": True})
+            if sink is not None:
+                sink.write(code)
+                for block in blocks:
+                    self._route_block(sink, block)
+            self._notify("code", {"text": code, "chars": len(code)})
+            self._notify("done", {"cached": True})
+        return code
     
-    # Your code logic here based on the prompt:
-    # ''' + prompt + '''
+    def _route_block(self, sink, block):
+        """Hand a finished block other than the first to the sink, if it takes them"""
+        add_block = getattr(sink, "add_block", None)
+        if add_block is None or block["primary"] or not block["complete"]:
+            return
+        try:
+            add_block(block)
+        except Exception as e:
+            print(f"[Codegen] Could not write block {block['index']}: {e}")
+        self._notify("block", block)
     
-    print("✅ Code execution completed!")
-
-if __name__ == "__main__":
-    main()'''
-            },
+    def _stream_code(self, request, sink, priority=RequestScheduler.PRIORITY_INTERACTIVE):
+        """Stream a completion into `sink`, returns (answer, from_api) like _request_code()"""
+        prompt, language = request["prompt"], request["language"]
+        model = self.router.route(prompt, language)
+        while True:
+            if not self.breaker.allow():
+                fallback = self._offline(prompt, language)
+                self._notify("error", {"error": "API unavailable", "offline": True})
+                if sink is not None:
+                    sink.reset()
+                    sink.write(fallback)
+                return fallback, False
+            started = time.perf_counter()
+            try:
+                code, blocks, ttft = self._stream_attempt(request, model, sink, priority)
+            except Exception as e:
+                print(f"Groq API Error: {e}")
+                self.router.record(model, time.perf_counter() - started, False)
+                self._api_failed(e)
+                self.last_source = "fallback"
+                self._notify("error", {"error": str(e)})
+                # Never leave a half-written answer behind; replace it with the fallback
+                if sink is not None:
+                    sink.reset()
+                fallback = self._get_fallback_code(prompt, language)
+                if sink is not None:
+                    sink.write(fallback)
+                return fallback, False
             
-            "javascript": {
-                "web": '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Spectra Web App</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background: #f0f2f5; }
-        .container { max-width: 800px; margin: 0 auto; background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
-        .header { text-align: center; color: #333; margin-bottom: 20px; }
-        .input-section { margin: 20px 0; }
-        .input-section input, .input-section button { padding: 10px; margin: 5px; border: 1px solid #ddd; border-radius: 5px; }
-        .input-section button { background: #007bff; color: white; cursor: pointer; }
-        .input-section button:hover { background: #0056b3; }
-        .output { background: #f8f9fa; padding: 15px; border-radius: 5px; margin-top: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🌟 Spectra JavaScript App</h1>
-            <p>Interactive web application</p>
-        </div>
+            self.api_working = True
+            self.last_source = "api"
+            # A stream is judged on how soon it started, not on how long the answer is
+            # (its own TTFT: the shared metrics may already hold another thread's request)
+            self.breaker.record_success(ttft if ttft is not None else time.perf_counter() - started)
+            valid = validate_code(code, language)
+            self.router.record(model, time.perf_counter() - started, valid)
+            larger = None if valid else self.router.escalate(model)
+            if larger is None:
+                return join_blocks(code, blocks), True
+            print(f"[Router] {model} output failed validation, escalating to {larger}")
+            self._notify("escalate", {"from": model, "to": larger})
+            if sink is not None:
+                sink.reset()
+            model = larger
+    
+    def _stream_attempt(self, request, model, sink, priority=RequestScheduler.PRIORITY_INTERACTIVE):
+        """One streamed completion from `model` into `sink`, returns (code, blocks, ttft)"""
+        prompt, language = request["prompt"], request["language"]
+        messages, max_tokens = request["messages"], request["max_tokens"]
+        extractor = CodeBlockExtractor(on_block=lambda block: self._route_block(sink, block))
+        parts = []
+        received = []
+        started = time.perf_counter()
+        first_token = None
+        chunks = 0
+        self._notify("start", {"prompt": prompt, "language": language})
         
-        <div class="input-section">
-            <input type="text" id="userInput" placeholder="Enter your input here...">
-            <button onclick="processInput()">Process</button>
-            <button onclick="clearOutput()">Clear</button>
-        </div>
+        def emit(code):
+            if code:
+                parts.append(code)
+                if sink is not None:
+                    sink.write(code)
+                self._notify("code", {"text": code, "chars": sum(len(part) for part in parts)})
         
-        <div class="output" id="output">
-            <p>Welcome! Enter something above and click Process.</p>
-        </div>
-    </div>
-
-    <script>
-        function processInput() {
-            const input = document.getElementById('userInput').value;
-            const output = document.getElementById('output');
-            
-            if (input.trim()) {
-                const timestamp = new Date().toLocaleTimeString();
-                output.innerHTML += `<p><strong>${timestamp}:</strong> Processed "${input}"</p>`;
-                document.getElementById('userInput').value = '';
-            }
-        }
+        # create() returns once the response has started, which is what hedging races on
+        stream = self._api_call(self.stream_hedger, lambda: self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=self.TEMPERATURE,
+            max_tokens=max_tokens,
+            top_p=0.9,
+            stream=True
+        ), messages, max_tokens, priority)
+        result = {}
+        for text in self._stream_text(stream, result):
+            chunks += 1
+            received.append(text)
+            if first_token is None:
+                first_token = time.perf_counter()
+                self._notify("first_token", {"ttft": first_token - started})
+            emit(extractor.feed(text))
+        # A cut-off answer keeps its complete lines; continuations write the rest
+        # (unless only a later block or the chatter after the code was cut off)
+        cut_off = result.get("finish_reason") == "length"
+        truncated = cut_off and extractor.primary_open
+        emit(extractor.flush(keep_partial=not cut_off))
+        blocks = extractor.blocks
+        self._record_tokens(request["type"], request["prompt_tokens"], max_tokens,
+                            result.get("usage"), "".join(received))
+        continuations = 0
+        while truncated and continuations < Config.CONTINUATION_MAX_CALLS:
+            continuations += 1
+            print(f"[Codegen] Answer hit max_tokens ({max_tokens}), requesting continuation {continuations}")
+            self._notify("continue", {"count": continuations})
+            try:
+                truncated = self._continue_stream(request, model, "".join(parts), emit, sink, blocks, priority)
+            except Exception as e:
+                # What was written is still the best answer available
+                print(f"[Codegen] Continuation failed: {e}")
+                break
+        if truncated:
+            print(f"[Codegen] Still cut off after {continuations} continuation(s)")
         
-        function clearOutput() {
-            document.getElementById('output').innerHTML = '<p>Output cleared.</p>';
+        finished = time.perf_counter()
+        # The answer and its continuations
+        counts = self.last_usage
+        tokens = counts["completion_tokens"]
+        generating = finished - first_token if first_token is not None else 0.0
+        metrics = {
+            "model": model,
+            "request_type": request["type"],
+            "ttft": first_token - started if first_token is not None else None,
+            "total": finished - started,
+            "prompt_tokens": counts["prompt_tokens"],
+            "tokens": tokens,
+            "max_tokens": max_tokens,
+            "continuations": continuations,
+            "tokens_per_second": tokens / generating if generating > 0 else None,
         }
-        
-        // Allow Enter key to process input
-        document.getElementById('userInput').addEventListener('keypress', function(e) {
-            if (e.key === 'Enter') {
-                processInput();
-            }
-        });
-        
-        console.log("🌟 Spectra JavaScript App loaded successfully!");
-    </script>
-</body>
-</html>''',
-                
-                "default": '''// JavaScript code generated by Spectra
-console.log("🌟 Spectra JavaScript Generator");
-console.log("📅 Generated at:", new Date().toISOString());
-
-// Main application logic
-class SpectraApp {
-    constructor() {
-        this.data = [];
-        this.initialize();
-    }
-    
-    initialize() {
-        console.log("🚀 Initializing Spectra App...");
-        // Your code logic here based on: ''' + prompt + '''
-        this.run();
-    }
+        self.metrics.append(metrics)
+        print(f"[Codegen] TTFT {metrics['ttft'] * 1000 if metrics['ttft'] is not None else 0:.0f} ms, "
+              f"{tokens} tokens at {metrics['tokens_per_second'] or 0:.0f} tok/s, total {metrics['total']:.1f} s")
+        self._notify("done", metrics)
+        return "".join(parts).strip(), blocks, metrics["ttft"]
     
-    run() {
-        console.log("▶️ Running application...");
-        // Add your main application logic here
-    }
+    def _stream_text(self, stream, result):
+        """Text pieces of a streamed completion; usage and finish_reason are stored in `result`"""
+        for chunk in stream:
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                result["usage"] = x_groq.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if getattr(choice, "finish_reason", None):
+                result["finish_reason"] = choice.finish_reason
+            if choice.delta.content:
+                yield choice.delta.content
     
-    processData(input) {
-        console.log("📊 Processing data:", input);
-        this.data.push({
-            timestamp: Date.now(),
-            input: input,
-            processed: true
-        });
-        return this.data;
-    }
-}
-
-// Initialize the application
-const app = new SpectraApp();
-console.log("✅ Spectra App initialized successfully!");'''
-            }
-        }
+    def _continue_stream(self, request, model, code, emit, sink, blocks, priority):
+        """Stream the rest of a cut-off answer through emit(), returns True if it was cut off again.
         
-        # Detect what type of code to generate based on keywords
-        prompt_lower = prompt.lower()
-        
-        if language == "python":
-            if any(keyword in prompt_lower for keyword in ["scrape", "web", "crawl", "beautifulsoup"]):
-                return fallback_templates["python"]["web scraping"]
-            elif any(keyword in prompt_lower for keyword in ["gui", "tkinter", "interface", "window"]):
-                return fallback_templates["python"]["gui"]
-            elif any(keyword in prompt_lower for keyword in ["api", "flask", "server", "endpoint"]):
-                return fallback_templates["python"]["api"]
-            else:
-                return fallback_templates["python"]["default"]
-        
-        elif language == "javascript":
-            if any(keyword in prompt_lower for keyword in ["web", "html", "browser", "frontend"]):
-                return fallback_templates["javascript"]["web"]
-            else:
-                return fallback_templates["javascript"]["default"]
-        
-        elif language == "html":
-            return '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Spectra Generated Page</title>
-    <style>
-        body { 
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
-            margin: 0; 
-            padding: 20px; 
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            color: white; 
-        }
-        .container { 
-            max-width: 1000px; 
-            margin: 0 auto; 
-            background: rgba(255,255,255,0.1); 
-            padding: 30px; 
-            border-radius: 15px; 
-            backdrop-filter: blur(10px); 
-        }
-        .header { 
-            text-align: center; 
-            margin-bottom: 30px; 
-        }
-        .content { 
-            background: rgba(255,255,255,0.05); 
-            padding: 20px; 
-            border-radius: 10px; 
-            margin: 20px 0; 
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🌟 Generated by Spectra</h1>
-            <p>Beautiful, modern web page</p>
-        </div>
-        <div class="content">
-            <h2>Your Content Here</h2>
-            <p>This page was generated based on: <em>''' + prompt + '''</em></p>
-            <p>Customize this template to match your specific requirements.</p>
-        </div>
-    </div>
-</body>
-</html>'''
-        
-        else:
-            return f"""# {language.upper()} code generated by Spectra
-# Generated for: {prompt}
-# 
-# This is a basic template. The AI service is currently unavailable,
-# but you can modify this code according to your requirements.
-
-def main():
-    print("Hello from Spectra!")
-    # Add your {language} code here
-
-if __name__ == "__main__":
-    main()"""
+        Blocks that follow the rest of the code are routed to `sink` and added to `blocks`.
+        """
+        tail = code_tail(code)
+        continuation = self.prompts.continuation(request, tail)
+        messages = continuation["messages"]
+        stream = self._api_call(self.stream_hedger, lambda: self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=self.TEMPERATURE,
+            max_tokens=continuation["max_tokens"],
+            top_p=0.9,
+            stream=True
+        ), messages, continuation["max_tokens"], priority)
+        extractor = CodeBlockExtractor(resume=True, on_block=lambda block: self._route_block(sink, block))
+        trimmer = OverlapTrimmer(tail)
+        result = {}
+        received = []
+        for text in self._stream_text(stream, result):
+            received.append(text)
+            emit(trimmer.feed(extractor.feed(text)))
+        cut_off = result.get("finish_reason") == "length"
+        truncated = cut_off and extractor.primary_open
+        emit(trimmer.feed(extractor.flush(keep_partial=not cut_off)))
+        emit(trimmer.flush())
+        blocks.extend(extractor.blocks)
+        if trimmer.trimmed_lines:
+            print(f"[Codegen] Dropped {trimmer.trimmed_lines} repeated line(s) from the continuation")
+        self._record_tokens("continuation", continuation["prompt_tokens"], continuation["max_tokens"],
+                            result.get("usage"), "".join(received))
+        return truncated
+    
+    def _continue_text(self, request, model, code, priority, blocks):
+        """Complete a cut-off non-streamed answer, returns the stitched code; later blocks go to `blocks`"""
+        for count in range(1, Config.CONTINUATION_MAX_CALLS + 1):
+            print(f"[Codegen] Answer hit max_tokens ({request['max_tokens']}), requesting continuation {count}")
+            tail = code_tail(code)
+            continuation = self.prompts.continuation(request, tail)
+            messages = continuation["messages"]
+            completion = self._api_call(self.hedger, lambda: self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=self.TEMPERATURE,
+                max_tokens=continuation["max_tokens"],
+                top_p=0.9
+            ), messages, continuation["max_tokens"], priority)
+            text = completion.choices[0].message.content or ""
+            self._record_tokens("continuation", continuation["prompt_tokens"], continuation["max_tokens"],
+                                getattr(completion, "usage", None), text)
+            cut_off = getattr(completion.choices[0], "finish_reason", None) == "length"
+            extractor = CodeBlockExtractor(resume=True)
+            trimmer = OverlapTrimmer(tail)
+            code += trimmer.feed(extractor.feed(text) + extractor.flush(keep_partial=not cut_off)) + trimmer.flush()
+            blocks.extend(extractor.blocks)
+            truncated = cut_off and extractor.primary_open
+            if not truncated:
+                return code
+        print(f"[Codegen] Still cut off after {Config.CONTINUATION_MAX_CALLS} continuation(s)")
+        return code
+    
+    def _get_fallback_code(self, prompt, language):
+        """Provide fallback code from the template registry when API is unavailable"""
+        return TEMPLATES.render(prompt, language)
     
     def detect_language(self, prompt):
         """Detect programming language from natural language request"""
-        # Simple keyword-based detection as fallback
+        # Simple keyword-based detection as fallback (whole words: "adjust" is not "js")
         prompt_lower = prompt.lower()
         
-        if any(word in prompt_lower for word in ["python", "django", "flask", "pandas", "numpy", "tkinter"]):
+        def mentions(words):
+            return any(re.search(rf"(?<!\w){re.escape(word)}(?!\w)", prompt_lower) for word in words)
+        
+        if mentions(["python", "django", "flask", "pandas", "numpy", "tkinter"]):
             return "python"
-        elif any(word in prompt_lower for word in ["javascript", "js", "react", "node", "vue", "angular"]):
+        elif mentions(["javascript", "js", "react", "node", "vue", "angular"]):
             return "javascript"  
-        elif any(word in prompt_lower for word in ["java", "spring", "android"]):
+        elif mentions(["java", "spring", "android"]):
             return "java"
-        elif any(word in prompt_lower for word in ["c++", "cpp", "cplusplus"]):
+        elif mentions(["c++", "cpp", "cplusplus"]):
             return "cpp"
-        elif any(word in prompt_lower for word in ["html", "web page", "website"]):
+        elif mentions(["html", "web page", "website"]):
             return "html"
-        elif any(word in prompt_lower for word in ["css", "stylesheet", "styling"]):
+        elif mentions(["css", "stylesheet", "styling"]):
             return "css"
-        elif any(word in prompt_lower for word in ["sql", "database", "query"]):
+        elif mentions(["sql", "database", "query"]):
             return "sql"
-        elif any(word in prompt_lower for word in ["bash", "shell", "script"]):
+        elif mentions(["bash", "shell"]):  # not "script": most scripts asked for are Python
             return "bash"
-        else:
-            return "python"  # Default fallback
         
-        # If API is available, use AI detection
-        if self.api_working:
+        # No keyword matched: ask the smallest model, unless the breaker says the API is down
+        if self.breaker.allow():
+            started = time.perf_counter()
+            detection_prompt = f"""Based on this request, return ONLY the programming language name (one word):
+            python, javascript, java, cpp, html, css, sql, bash
+            
+            Request: {prompt}"""
+            
+            messages = [{"role": "user", "content": detection_prompt}]
             try:
-                detection_prompt = f"""Based on this request, return ONLY the programming language name (one word):
-                python, javascript, java, cpp, html, css, sql, bash
-                
-                Request: {prompt}"""
-                
-                completion = self.client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[{"role": "user", "content": detection_prompt}],
+                completion = self._api_call(self.hedger, lambda: self.client.chat.completions.create(
+                    model=self.router.smallest,
+                    messages=messages,
                     temperature=0.1,
                     max_tokens=10
-                )
-                language = completion.choices[0].message.content.lower().strip()
-                
-                # Map variations to standard names
-                mapping = {
-                    "python": "python", "py": "python",
-                    "javascript": "javascript", "js": "javascript", "node": "javascript",
-                    "java": "java",
-                    "c++": "cpp", "cpp": "cpp", "cplusplus": "cpp",
-                    "html": "html", "web": "html",
-                    "css": "css",
-                    "sql": "sql",
-                    "bash": "bash", "shell": "bash"
-                }
-                return mapping.get(language, "python")
-            except:
-                pass
+                ), messages, 10, RequestScheduler.PRIORITY_INTERACTIVE)
+            except Exception as e:
+                self._api_failed(e)
+                return "python"
+            self.api_working = True
+            self.breaker.record_success(time.perf_counter() - started)
+            # An empty or unexpected answer is not an API failure, just no answer
+            language = (completion.choices[0].message.content or "").strip().lower()
+            
+            # Map variations to standard names
+            mapping = {
+                "python": "python", "py": "python",
+                "javascript": "javascript", "js": "javascript", "node": "javascript",
+                "java": "java",
+                "c++": "cpp", "cpp": "cpp", "cplusplus": "cpp",
+                "html": "html", "web": "html",
+                "css": "css",
+                "sql": "sql",
+                "bash": "bash", "shell": "bash"
+            }
+            return mapping.get(language, "python")
         
         return "python"  # Ultimate fallback
\ No newline at end of file
@@ -1,13 +1,28 @@
+import os
 import re
+from core.code_blocks import file_language
+
+# What joins two languages that are both asked for: "python and html", "html, css and javascript",
+# "an html page with a css file". Anything else between them ("a python script that generates
+# html reports") only mentions the second one
+LANGUAGE_JOINER = re.compile(r"(?:\s+(?:file|files|page|code|script|app))?"
+                             r"(?:\s*,\s*(?:and\s+)?|\s+(?:and|plus|with|&)\s+)(?:(?:an?|some|the)\s+)?")
 
 class CommandParser:
     @staticmethod
-    def parse_command(command):
-        """Extract intent and parameters from voice command"""
+    def parse_command(command, session=None):
+        """Extract intent and parameters from voice command.
+        
+        `session` (a SessionContext) lets a command refer back to the files
+        written last by name.
+        """
         if not command or "sorry" in command.lower() or "error" in command.lower():
             return {
                 "language": "python",
+                "language_named": False,
                 "project_name": None,
+                "multi_file": False,
+                "follow_up": False,
                 "raw_command": command
             }
             
@@ -20,7 +35,10 @@ class CommandParser:
         if any(cmd in command for cmd in website_commands):
             return {
                 "language": "website",
+                "language_named": True,
                 "project_name": None,
+                "multi_file": False,
+                "follow_up": False,
                 "raw_command": command
             }
         
@@ -34,12 +52,60 @@ class CommandParser:
             "css": ["css", "stylesheet"]
         }
         
-        detected_language = "python"  # default
+        # Keywords count as whole words only ("copy" is not "py", "javascript" is not "java"),
+        # and a keyword inside a longer matched one ("js" in "node.js") adds no language
+        matches = []
         for lang, keywords in language_keywords.items():
-            if any(keyword in command for keyword in keywords):
+            for keyword in keywords:
+                for match in re.finditer(rf"(?<!\w){re.escape(keyword)}(?!\w)", command):
+                    matches.append((match.start(), match.end(), lang))
+        mentioned = []
+        targets = []  # languages asked for, not just mentioned
+        previous_end = None
+        for start, end, lang in sorted(matches):
+            inside = any(s <= start and end <= e and (e - s) > (end - start) for s, e, _ in matches)
+            if inside:
+                continue
+            if previous_end is None or LANGUAGE_JOINER.fullmatch(command[previous_end:start]):
+                if lang not in targets:
+                    targets.append(lang)
+            if lang not in mentioned:
+                mentioned.append(lang)
+            previous_end = end
+        
+        detected_language = "python"  # default
+        for lang in language_keywords:
+            if lang in mentioned:
                 detected_language = lang
                 break
         
+        # Several languages or parts asked for means a multi-file project
+        project_words = ["frontend", "front end", "backend", "back end", "multiple files",
+                         "multi file", "full stack", "full-stack"]
+        multi_file = len(targets) > 1 or any(word in command for word in project_words)
+        
+        # Changing "it" rather than asking for something new means editing the last project
+        edit_words = ["add ", "change ", "modify", "update", "fix ", "remove ", "delete ", "rename",
+                      "replace", "refactor", "make it", "make the", "edit "]
+        new_words = ["create", "write", "generate", "build", "make a", "make an", "new "]
+        first_words = " ".join(command.split()[:3]) + " "
+        # "the" is no back-reference ("add the numbers from one to ten"); the name of a file
+        # written last is, and so is a pronoun once there is such a file ("fix that bug in the
+        # login page" with nothing written yet is a new request)
+        session_files = session.existing_files() if session is not None else []
+        refers_back = bool(session_files) and re.search(r"\b(it|its|that|this)\b", command) is not None
+        session_languages = set()
+        for path, language in session_files:
+            name = os.path.basename(path).lower()
+            stem = os.path.splitext(name)[0]
+            if re.search(rf"(?<!\w)({re.escape(name)}|{re.escape(stem)})(?!\w)", command):
+                refers_back = True
+            session_languages.add(language or file_language(path))
+        # Naming a language the last project is not written in asks for something new
+        new_language = session is not None and any(lang not in session_languages for lang in mentioned)
+        follow_up = any(word in first_words for word in edit_words) and refers_back and \
+            not new_language and not any(word in command for word in new_words)
+        
         # Extract project name if specified
         project_name = None
         name_match = re.search(r'(?:named|called|as) (\w+)', command)
@@ -48,6 +114,9 @@ class CommandParser:
         
         return {
             "language": detected_language,
+            "language_named": bool(mentioned),  # False: "python" is only the default
             "project_name": project_name,
+            "multi_file": multi_file,
+            "follow_up": follow_up,
             "raw_command": command
         }
\ No newline at end of file
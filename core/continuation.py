@@ -0,0 +1,53 @@
+from config.settings import Config
+
+def code_tail(code, max_chars=None):
+    """The last whole lines of code, at most max_chars long, to seed a continuation with"""
+    max_chars = max_chars or Config.CONTINUATION_TAIL_CHARS
+    if len(code) <= max_chars:
+        return code
+    tail = code[-max_chars:]
+    start = tail.find("\n")
+    return tail[start + 1:] if start >= 0 else tail
+
+class OverlapTrimmer:
+    """Drops the lines a continuation repeats from the end of the code it continues.
+
+    Models often restart a few lines before where they were asked to; the
+    first lines of the continuation are held back until they can be
+    compared with the tail, then everything passes straight through.
+    """
+
+    WINDOW_LINES = 20
+
+    def __init__(self, tail):
+        lines = tail.split("\n")
+        if lines and not lines[-1]:
+            lines.pop()  # the tail ends with a complete line
+        self.tail = [line.strip() for line in lines][-self.WINDOW_LINES:]
+        self._held = ""
+        self._checked = False
+        self.trimmed_lines = 0
+
+    def feed(self, text):
+        if self._checked:
+            return text
+        self._held += text
+        if self._held.count("\n") < self.WINDOW_LINES:
+            return ""
+        return self._release()
+
+    def flush(self):
+        return "" if self._checked else self._release()
+
+    def _release(self):
+        self._checked = True
+        lines = self._held.split("\n")
+        complete = [line.strip() for line in lines[:-1]]
+        # Longest run of leading lines that equals the last lines of the tail
+        for count in range(min(len(complete), len(self.tail)), 0, -1):
+            # (a lone "}" or blank line matching is a coincidence, not a repeat)
+            if complete[:count] == self.tail[-count:] and sum(len(line) for line in complete[:count]) >= 8:
+                self.trimmed_lines = count
+                break
+        held, self._held = "\n".join(lines[self.trimmed_lines:]), ""
+        return held
@@ -0,0 +1,162 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from config.settings import Config
+from core.audio_utils import resample
+
+class PlaybackMonitor:
+    """Published by VoiceOutput: when Spectra is talking and what it is saying.
+
+    Each utterance is recorded as a (start, end, reference) interval on the
+    time.monotonic() clock, where `reference` is the mono float signal that
+    was sent to the speakers (None when the engine does not expose it).
+    """
+
+    def __init__(self, history_seconds=60):
+        self.history_seconds = history_seconds
+        self._intervals = deque()
+        self._lock = threading.Lock()
+        self._resampled = {}
+        self.listeners = []  # callables(event, interval), e.g. to mirror playback into the audio worker
+
+    def begin(self, reference=None, sample_rate=None, start=None):
+        """Mark the start of playback (now, or at a scheduled `start`), returns a handle for end()"""
+        interval = {"start": start if start is not None else time.monotonic(), "end": None, "reference": reference,
+                    "sample_rate": sample_rate}
+        with self._lock:
+            self._intervals.append(interval)
+            cutoff = time.monotonic() - self.history_seconds
+            while self._intervals and self._intervals[0]["end"] is not None and self._intervals[0]["end"] < cutoff:
+                self._intervals.popleft()
+        for listener in self.listeners:
+            listener("begin", interval)
+        return interval
+
+    def end(self, interval, at=None):
+        interval["end"] = at if at is not None else time.monotonic()
+        for listener in self.listeners:
+            listener("end", interval)
+
+    def apply(self, event, interval):
+        """Replay a begin/end event published by another process's monitor"""
+        with self._lock:
+            for existing in self._intervals:
+                if existing["start"] == interval["start"]:
+                    existing.update(interval)
+                    return
+            if event == "begin":
+                self._intervals.append(dict(interval))
+
+    def is_playing(self):
+        with self._lock:
+            return any(interval["end"] is None for interval in self._intervals)
+
+    def _find(self, start, end):
+        tail = Config.ECHO_TAIL_SECONDS
+        with self._lock:
+            for interval in reversed(self._intervals):
+                stopped = interval["end"] if interval["end"] is not None else float("inf")
+                if interval["start"] <= end and start <= stopped + tail:
+                    return interval
+        return None
+
+    def overlaps(self, start, end):
+        """True if Spectra was talking (or its echo was decaying) between start and end"""
+        return self._find(start, end) is not None
+
+    def reference(self, start, end, sample_rate):
+        """Reference signal for [start, end] at `sample_rate`, or None if unknown"""
+        interval = self._find(start, end)
+        if interval is None or interval["reference"] is None:
+            return None
+        key = (id(interval), sample_rate)
+        if key not in self._resampled:
+            self._resampled = {key: resample(interval["reference"], interval["sample_rate"], sample_rate)}
+        signal = self._resampled[key]
+        first = int(round((start - interval["start"]) * sample_rate))
+        count = int(round((end - start) * sample_rate))
+        out = np.zeros(count, dtype=np.float32)
+        lo, hi = max(first, 0), min(first + count, len(signal))
+        if hi > lo:
+            out[lo - first:hi - first] = signal[lo:hi]
+        return out
+
+class EchoCanceller:
+    """Streaming frequency-domain echo suppressor.
+
+    The echo path is modelled per frequency bin as H = E[M R*] / E[|R|^2]
+    from smoothed cross/auto spectra of the microphone (M) and the delayed
+    reference (R); the estimated echo |H R| is then removed with a Wiener
+    style gain. Frames use 50% overlap with sqrt-Hann windows so the output
+    overlap-adds back to a continuous signal, delayed by half a frame.
+    """
+
+    def __init__(self, frame_length=512):
+        self.frame_length = frame_length
+        self.hop = frame_length // 2
+        self.window = np.sqrt(np.hanning(frame_length + 1)[:-1]).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        self.delay = None
+        self._delays = deque(maxlen=9)
+        self._mic = np.zeros(self.hop, dtype=np.float32)
+        self._ref = np.zeros(self.hop, dtype=np.float32)
+        self._carry = np.zeros(self.hop, dtype=np.float32)
+        self._cross = None
+        self._auto = None
+
+    def _estimate_delay(self, mic, ref_window, max_delay):
+        """Cross-correlate the chunk against the reference window to find the acoustic delay"""
+        n = len(mic) + len(ref_window)
+        size = 1 << (n - 1).bit_length()
+        corr = np.fft.irfft(np.fft.rfft(ref_window, size) * np.conj(np.fft.rfft(mic, size)), size)
+        # corr[k] compares mic[t] with ref_window[t + k]; the echo of reference sample
+        # (max_delay + t - d) shows up at mic[t], i.e. k = max_delay - d
+        lags = corr[:max_delay + 1]
+        peak = int(np.argmax(np.abs(lags)))
+        energy = np.sqrt((mic ** 2).sum() * (ref_window ** 2).sum()) + 1e-9
+        if abs(lags[peak]) / energy > 0.2:
+            self._delays.append(max_delay - peak)
+            self.delay = int(np.median(self._delays))
+
+    def process(self, mic, ref_window, max_delay):
+        """Remove the echo of `ref_window` from the float chunk `mic`.
+
+        `ref_window` covers the chunk plus `max_delay` samples before it.
+        Returns the cleaned samples completed so far (about len(mic)).
+        """
+        self._estimate_delay(mic, ref_window, max_delay)
+        delay = self.delay if self.delay is not None else 0
+        ref = ref_window[max_delay - delay:max_delay - delay + len(mic)]
+
+        mic_buf = np.concatenate([self._mic, mic])
+        ref_buf = np.concatenate([self._ref, ref])
+        count = 1 + (len(mic_buf) - self.frame_length) // self.hop if len(mic_buf) >= self.frame_length else 0
+        if not count:
+            self._mic, self._ref = mic_buf, ref_buf
+            return np.zeros(0, dtype=np.float32)
+
+        view = np.lib.stride_tricks.sliding_window_view
+        mic_spec = np.fft.rfft(view(mic_buf, self.frame_length)[::self.hop][:count] * self.window, axis=1)
+        ref_spec = np.fft.rfft(view(ref_buf, self.frame_length)[::self.hop][:count] * self.window, axis=1)
+
+        cross = (mic_spec * np.conj(ref_spec)).mean(axis=0)
+        auto = (np.abs(ref_spec) ** 2).mean(axis=0)
+        alpha = Config.ECHO_ADAPT
+        self._cross = cross if self._cross is None else (1 - alpha) * self._cross + alpha * cross
+        self._auto = auto if self._auto is None else (1 - alpha) * self._auto + alpha * auto
+
+        echo = np.abs(self._cross / (self._auto + 1e-9)) ** 2 * np.abs(ref_spec) ** 2
+        power = np.abs(mic_spec) ** 2 + 1e-12
+        gain = np.sqrt(np.clip(1.0 - Config.ECHO_OVERSUBTRACT * echo / power, Config.ECHO_GAIN_FLOOR, 1.0))
+        frames = np.fft.irfft(mic_spec * gain, self.frame_length, axis=1) * self.window
+
+        # Overlap-add: first halves plus the second halves of the previous frames
+        previous = np.concatenate([self._carry[None, :], frames[:-1, self.hop:]])
+        output = (frames[:, :self.hop] + previous).reshape(-1).astype(np.float32)
+        self._carry = frames[-1, self.hop:]
+        consumed = count * self.hop
+        self._mic, self._ref = mic_buf[consumed:], ref_buf[consumed:]
+        return output
@@ -1,21 +1,47 @@
 import os
-import re
 from datetime import datetime
 from config.settings import Config
+from core.session_context import SessionContext
+from core.code_blocks import EXTENSION_LANGUAGES, split_blocks
+
+# File names for extra code blocks that do not name their own file; web pages conventionally
+# load their styles and scripts from these
+BLOCK_FILENAMES = {"html": "index.html", "css": "style.css", "javascript": "script.js", "python": "main.py"}
+
+def inside_project(project_path, relative_path):
+    """Absolute path of relative_path within project_path; ValueError if it would escape the project"""
+    relative_path = relative_path.replace("\\", "/").lstrip("/")
+    filepath = os.path.normpath(os.path.join(project_path, relative_path))
+    if os.path.commonpath([filepath, os.path.normpath(project_path)]) != os.path.normpath(project_path):
+        raise ValueError(f"File path outside the project: {relative_path}")
+    return filepath
 
 class FileManager:
     def __init__(self):
         self.base_dir = Config.CODE_DIRECTORY
         os.makedirs(self.base_dir, exist_ok=True)
+        # Files written most recently, for follow-up edits
+        self.session = SessionContext()
     
-    def create_file(self, code, language, project_name=None):
-        """Create a file with the generated code"""
+    def create_project(self, project_name=None):
+        """Create (or reuse) a project directory and return its path"""
         if not project_name:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             project_name = f"project_{timestamp}"
         
         project_path = os.path.join(self.base_dir, project_name)
         os.makedirs(project_path, exist_ok=True)
+        return project_path
+    
+    def project_file(self, project_path, relative_path):
+        """Absolute path of a file inside the project, refusing paths that escape it"""
+        filepath = inside_project(project_path, relative_path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        return filepath
+    
+    def _target(self, language, project_name=None):
+        """Return (filepath, project_path) for a new file, creating the project directory"""
+        project_path = self.create_project(project_name)
         
         # Determine file extension
         extensions = {
@@ -24,19 +50,119 @@ class FileManager:
             "java": "java",
             "cpp": "cpp",
             "html": "html",
-            "css": "css"
+            "css": "css",
+            "sql": "sql",
+            "bash": "sh"
         }
         
         extension = extensions.get(language, "txt")
         filename = f"main.{extension}" if language not in ["html", "css"] else f"index.{extension}"
         filepath = os.path.join(project_path, filename)
+        self.session.record_file(filepath, project_path, language)
+        return filepath, project_path
+    
+    def create_file(self, code, language, project_name=None):
+        """Create a file with the generated code.
+        
+        The first code block goes to the main file; further blocks (CSS or
+        JavaScript next to HTML) each get a file of their own.
+        """
+        filepath, project_path = self._target(language, project_name)
         
         # Clean up code (remove markdown code blocks if present)
-        clean_code = re.sub(r"```(?:\w+)?\s*(.*?)\s*```", r"\1", code, flags=re.DOTALL)
-        clean_code = clean_code.strip()
+        clean_code, blocks = split_blocks(code)
         
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(clean_code)
         
         print(f"File created at: {filepath}")
-        return filepath, project_path
\ No newline at end of file
+        taken = {filepath}
+        for block in blocks:
+            self.write_block(project_path, block, taken)
+        return filepath, project_path
+    
+    def write_block(self, project_path, block, taken):
+        """Write an extra code block to its own file in the project, returns the file path.
+        
+        The block's filename hint is used when it has one, otherwise a name
+        from its language; `taken` holds paths already written for this
+        answer and gets the new one added.
+        """
+        language = block["language"]
+        filepath = None
+        if block["filename"]:
+            try:
+                filepath = self.project_file(project_path, block["filename"])
+            except ValueError as e:
+                print(f"[Files] {e}")
+        if filepath is None:
+            extension = next((ext for ext, name in EXTENSION_LANGUAGES.items() if name == language), "txt")
+            filepath = os.path.join(project_path, BLOCK_FILENAMES.get(language, f"block_{block['index']}.{extension}"))
+        base, extension = os.path.splitext(filepath)
+        number = 2
+        while filepath in taken:
+            filepath = f"{base}_{number}{extension}"
+            number += 1
+        taken.add(filepath)
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(block["code"] + "\n")
+        self.session.record_file(filepath, project_path, language)
+        print(f"File created at: {filepath}")
+        return filepath
+    
+    def open_stream(self, language, project_name=None):
+        """Create an empty file that generated code is appended to as it arrives"""
+        filepath, project_path = self._target(language, project_name)
+        print(f"Streaming code to: {filepath}")
+        return StreamingFile(filepath, project_path, self)
+    
+    def open_project_stream(self, project_path, relative_path):
+        """Like open_stream(), for a named file of a multi-file project"""
+        filepath = self.project_file(project_path, relative_path)
+        self.session.record_file(filepath, project_path)
+        print(f"Streaming code to: {filepath}")
+        return StreamingFile(filepath, project_path)
+
+class StreamingFile:
+    """Target file of a streaming generation, flushed after every write so editors see progress.
+    
+    Opened by open_stream(), it also takes the answer's other code blocks
+    through add_block() and writes each to its own file. Files of a
+    multi-file project are written one at a time, so there it does not.
+    """
+    
+    def __init__(self, filepath, project_path, file_mgr=None):
+        self.filepath = filepath
+        self.project_path = project_path
+        self.chars_written = 0
+        self.extra_files = []  # files written from the answer's other code blocks
+        self._file_mgr = file_mgr
+        self._file = open(filepath, "w", encoding="utf-8")
+    
+    def write(self, text):
+        if text:
+            self._file.write(text)
+            self._file.flush()
+            self.chars_written += len(text)
+    
+    def add_block(self, block):
+        if self._file_mgr is None:
+            return
+        taken = {self.filepath, *self.extra_files}
+        self.extra_files.append(self._file_mgr.write_block(self.project_path, block, taken))
+    
+    def reset(self):
+        """Discard what has been written so far"""
+        self._file.seek(0)
+        self._file.truncate()
+        self.chars_written = 0
+        for filepath in self.extra_files:
+            if os.path.isfile(filepath):
+                os.remove(filepath)
+        self.extra_files = []
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            print(f"File created at: {self.filepath}")
+        return self.filepath, self.project_path
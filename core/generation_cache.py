@@ -0,0 +1,137 @@
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+from config.settings import Config
+
+# Words that do not change what code is asked for
+FILLER_WORDS = {
+    "please", "hey", "ok", "okay", "spectra", "can", "could", "would", "you", "for", "me",
+    "regenerate", "again", "now", "just", "the", "a", "an",
+}
+
+def normalize_prompt(prompt):
+    """Reduce a spoken request to the words that matter, so rewordings share a cache entry"""
+    words = re.sub(r"[^\w+#]+", " ", prompt.lower()).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+class GenerationCache:
+    """SQLite cache of generated code with TTL, LRU eviction and single-flight requests.
+
+    Entries are keyed by the normalized prompt plus everything that changes
+    the answer (language, model, temperature, system prompt version).
+    Concurrent requests for the same key wait for the one already in
+    flight instead of calling the API again.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or Config.GENERATION_CACHE_PATH
+        self.ttl = ttl if ttl is not None else Config.GENERATION_CACHE_TTL_HOURS * 3600
+        self.max_entries = max_entries if max_entries is not None else Config.GENERATION_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0, "expired": 0, "evicted": 0}
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                prompt TEXT,
+                language TEXT,
+                model TEXT,
+                code TEXT,
+                created REAL,
+                accessed REAL,
+                hits INTEGER DEFAULT 0
+            )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS generations_accessed ON generations (accessed)")
+
+    @staticmethod
+    def key(prompt, language, model, temperature, prompt_version):
+        parts = [normalize_prompt(prompt), language, model, f"{temperature:.3f}", str(prompt_version)]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Cached code for `key`, or None if missing or expired"""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT code, created FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            code, created = row
+            if self.ttl and now - created > self.ttl:
+                self._db.execute("DELETE FROM generations WHERE key = ?", (key,))
+                self.stats["expired"] += 1
+                return None
+            self._db.execute("UPDATE generations SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            return code
+
+    def put(self, key, code, prompt="", language="", model=""):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO generations (key, prompt, language, model, code, created, accessed, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, normalize_prompt(prompt), language, model, code, now, now),
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+            if count > self.max_entries:
+                # Least recently used entries go first
+                excess = count - self.max_entries
+                self._db.execute(
+                    "DELETE FROM generations WHERE key IN "
+                    "(SELECT key FROM generations ORDER BY accessed LIMIT ?)", (excess,))
+                self.stats["evicted"] += excess
+
+    def get_or_generate(self, key, generate, bypass=False, **meta):
+        """Return (code, source), calling generate() -> (code, cacheable) at most once per key at a time.
+
+        `source` is "hit", "miss", "coalesced" (shared another caller's
+        request) or "bypass" (cache read skipped, e.g. "regenerate").
+        """
+        if not bypass:
+            code = self.get(key)
+            if code is not None:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return code, "hit"
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result(), "coalesced"
+
+        with self._lock:
+            self.stats["bypassed" if bypass else "misses"] += 1
+        try:
+            code, cacheable = generate()
+            if cacheable:
+                self.put(key, code, **meta)
+            future.set_result(code)
+            return code, "bypass" if bypass else "miss"
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def summary(self):
+        """Counters plus the number of stored entries and the hit rate"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["entries"] = entries
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else None
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
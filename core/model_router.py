@@ -0,0 +1,114 @@
+import re
+import ast
+import threading
+from config.settings import Config
+
+# Words that hint at a bigger program (more files, state, UI, I/O)
+HEAVY_WORDS = {
+    "gui", "interface", "window", "game", "api", "server", "endpoint", "database", "sql", "login",
+    "authentication", "class", "classes", "algorithm", "scrape", "crawl", "dashboard", "crud", "rest",
+    "async", "thread", "threads", "animation", "multiplayer", "application", "app", "website", "chat",
+    "machine", "learning", "neural", "parser", "compiler", "editor", "todo", "calculator", "tests",
+}
+# Words typical of one-liners and textbook exercises
+LIGHT_WORDS = {
+    "hello", "print", "prints", "simple", "basic", "sum", "add", "factorial", "fibonacci", "reverse",
+    "even", "odd", "prime", "swap", "square", "count",
+}
+
+def estimate_complexity(prompt, language="python"):
+    """Rough 0..1 estimate of how much code a request needs"""
+    words = re.findall(r"[a-z+#]+", prompt.lower())
+    score = min(len(words) / 40.0, 0.4)
+    score += 0.2 * sum(1 for word in words if word in HEAVY_WORDS)
+    score -= 0.15 * sum(1 for word in words if word in LIGHT_WORDS)
+    if language in ("java", "cpp"):
+        score += 0.1  # more boilerplate for the same program
+    return max(0.0, min(1.0, score))
+
+def validate_code(code, language):
+    """Cheap sanity check of generated code, False means ask a bigger model"""
+    if not code or len(code.strip()) < 10:
+        return False
+    if language == "python":
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            return False
+        return True
+    if language == "html":
+        return "<" in code and ">" in code
+    if language in ("javascript", "java", "cpp", "css"):
+        # Unbalanced braces usually mean the answer was cut off or garbled
+        depth = 0
+        for char in re.sub(r"(\"(\\.|[^\"\\])*\"|'(\\.|[^'\\])*'|`[^`]*`)", "", code):
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth < 0:
+                    return False
+        return depth == 0
+    return True
+
+class ModelRouter:
+    """Picks the smallest model likely to handle a request.
+
+    Models are ordered from smallest to largest; ROUTER_COMPLEXITY_LIMITS
+    gives the highest estimated complexity each model except the last is
+    trusted with. Rolling latency and error rates per model keep routing
+    within the latency budget and away from a model that keeps failing.
+    """
+
+    def __init__(self, models=None, limits=None, latency_budget=None):
+        self.models = models or Config.ROUTER_MODELS
+        self.limits = limits or Config.ROUTER_COMPLEXITY_LIMITS
+        self.latency_budget = latency_budget if latency_budget is not None else Config.ROUTER_LATENCY_BUDGET
+        self.stats = {model: {"calls": 0, "errors": 0, "escalations": 0, "latency": None, "error_rate": 0.0}
+                      for model in self.models}
+        self._lock = threading.Lock()
+
+    @property
+    def smallest(self):
+        return self.models[0]
+
+    def _healthy(self, model):
+        stats = self.stats[model]
+        return stats["calls"] < 3 or stats["error_rate"] <= Config.ROUTER_MAX_ERROR_RATE
+
+    def route(self, prompt, language="python", budget=None):
+        """Model to try first for this request"""
+        complexity = estimate_complexity(prompt, language)
+        index = next((i for i, limit in enumerate(self.limits) if complexity <= limit), len(self.models) - 1)
+        index = min(index, len(self.models) - 1)
+        # Skip models that keep failing, if a larger one is available
+        while index < len(self.models) - 1 and not self._healthy(self.models[index]):
+            index += 1
+        # Step down while the chosen model is expected to blow the latency budget
+        budget = budget if budget is not None else self.latency_budget
+        while index > 0 and budget:
+            latency = self.stats[self.models[index]]["latency"]
+            if latency is None or latency <= budget or not self._healthy(self.models[index - 1]):
+                break
+            index -= 1
+        model = self.models[index]
+        print(f"[Router] complexity {complexity:.2f} -> {model}")
+        return model
+
+    def escalate(self, model):
+        """Next larger model after `model` failed validation, or None"""
+        index = self.models.index(model) if model in self.models else len(self.models) - 1
+        with self._lock:
+            self.stats[model]["escalations"] += 1
+        return self.models[index + 1] if index + 1 < len(self.models) else None
+
+    def record(self, model, latency, ok):
+        alpha = Config.ROUTER_STATS_ALPHA
+        with self._lock:
+            stats = self.stats.setdefault(model, {"calls": 0, "errors": 0, "escalations": 0,
+                                                  "latency": None, "error_rate": 0.0})
+            stats["calls"] += 1
+            if not ok:
+                stats["errors"] += 1
+            stats["latency"] = latency if stats["latency"] is None else stats["latency"] + alpha * (latency - stats["latency"])
+            stats["error_rate"] += alpha * ((0.0 if ok else 1.0) - stats["error_rate"])
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import asyncio
+from config.settings import Config
+from core.code_blocks import file_language
+
+class ProjectGenerator:
+    """Generates multi-file projects: plan a manifest first, then write the files in parallel.
+
+    The manifest (paths, roles and the interfaces files share) comes from
+    one short completion. Every file is then generated from the request
+    plus that manifest, up to PROJECT_MAX_CONCURRENCY at a time, and
+    streamed to disk as it arrives, so the whole project takes about as
+    long as its slowest file.
+    """
+
+    def __init__(self, code_gen, file_mgr):
+        self.code_gen = code_gen
+        self.file_mgr = file_mgr
+        self.last_timings = None
+
+    def plan(self, prompt, language):
+        """Ask for the project manifest, returns a list of file dicts or None"""
+        planning_prompt = f"""Plan the files for this project. Reply with JSON only, in this form:
+{{"files": [{{"path": "app.py", "role": "what this file does", "interface": "names other files rely on", "entry": true}}]}}
+
+Keep it small: at most {Config.PROJECT_MAX_FILES} files, text files only, paths relative to the project root.
+Mark the file that starts the program with "entry": true.
+
+Main language: {language}
+Request: {prompt}"""
+        text = self.code_gen.chat([{"role": "user", "content": planning_prompt}],
+                                  max_tokens=Config.PROJECT_PLAN_MAX_TOKENS, temperature=0.2)
+        if not text:
+            return None
+        try:
+            manifest = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        except ValueError:
+            print(f"[Project] Could not parse the manifest: {text[:200]}")
+            return None
+
+        files, seen = [], set()
+        for entry in manifest.get("files", []):
+            path = str(entry.get("path", "")).strip()
+            if not path or path in seen:
+                continue
+            seen.add(path)
+            files.append({
+                "path": path,
+                "language": file_language(path, language),
+                "role": str(entry.get("role", "")).strip(),
+                "interface": str(entry.get("interface", "")).strip(),
+                "entry": bool(entry.get("entry")),
+            })
+        return files[:Config.PROJECT_MAX_FILES] or None
+
+    def _file_prompt(self, prompt, files, target):
+        listing = "\n".join(
+            f"- {f['path']}: {f['role']}" + (f" (interface: {f['interface']})" if f["interface"] else "")
+            for f in files
+        )
+        return f"""{prompt}
+
+This is one file of a multi-file project. Write only `{target['path']}`: {target['role']}.
+Project files:
+{listing}
+
+Use exactly these file names and interfaces so the files work together. Return only the contents of `{target['path']}`."""
+
+    def _generate_file(self, prompt, files, target, project_path, regenerate):
+        started = time.perf_counter()
+        sink = self.file_mgr.open_project_stream(project_path, target["path"])
+        try:
+            code = self.code_gen.generate_code_stream(
+                self._file_prompt(prompt, files, target), target["language"], sink=sink, regenerate=regenerate,
+                request_type="multi_file")
+        finally:
+            filepath, _ = sink.close()
+        return {"path": target["path"], "filepath": filepath, "language": target["language"],
+                "entry": target["entry"], "code": code, "seconds": time.perf_counter() - started,
+                "source": self.code_gen.last_source, "rate_limited": self.code_gen.rate_limited}
+
+    async def _generate_all(self, prompt, files, project_path, regenerate):
+        # The generation stack is synchronous (hedging, breaker, cache), so files run in worker
+        # threads; the semaphore bounds how many are in flight at once
+        semaphore = asyncio.Semaphore(Config.PROJECT_MAX_CONCURRENCY)
+
+        async def one(target):
+            async with semaphore:
+                result = await asyncio.to_thread(
+                    self._generate_file, prompt, files, target, project_path, regenerate)
+                print(f"[Project] {result['path']} done in {result['seconds']:.1f} s")
+                return result
+
+        return await asyncio.gather(*(one(target) for target in files))
+
+    def generate(self, prompt, language, project_path, regenerate=False):
+        """Generate a project into project_path, returns the list of written files or None.
+
+        None means no usable manifest (e.g. the API is down); the caller
+        should fall back to single-file generation.
+        """
+        started = time.perf_counter()
+        files = self.plan(prompt, language)
+        planned = time.perf_counter()
+        if not files:
+            return None
+        print(f"[Project] Plan: {', '.join(f['path'] for f in files)} ({planned - started:.1f} s)")
+
+        results = asyncio.run(self._generate_all(prompt, files, project_path, regenerate))
+        finished = time.perf_counter()
+        # Files were generated on worker threads; report the project's outcome to this one
+        sources = {r["source"] for r in results}
+        if "fallback" in sources:
+            self.code_gen.last_source = "fallback"
+        else:
+            self.code_gen.last_source = "api" if "api" in sources else "cache"
+        self.code_gen.rate_limited = any(r["rate_limited"] for r in results)
+        self.last_timings = {
+            "plan": planned - started,
+            "files": finished - planned,
+            "sum_of_files": sum(r["seconds"] for r in results),
+            "slowest_file": max(r["seconds"] for r in results),
+            "total": finished - started,
+        }
+        print(f"[Project] {len(results)} files in {self.last_timings['files']:.1f} s "
+              f"(slowest {self.last_timings['slowest_file']:.1f} s, sequential would be "
+              f"{self.last_timings['sum_of_files']:.1f} s)")
+        return results
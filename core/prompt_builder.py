@@ -0,0 +1,108 @@
+import re
+import threading
+from config.settings import Config
+from core.model_router import estimate_complexity
+
+# Pieces a BPE tokenizer usually keeps whole: words, short digit runs, symbol pairs, whitespace runs
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\w\s]+|\s+|_|\w")
+
+# Words that mean a windowed or browser UI, which needs much more code than a script
+GUI_WORDS = {
+    "gui", "window", "tkinter", "pyqt", "qt", "pygame", "game", "interface", "button", "buttons",
+    "dashboard", "website", "webpage", "page", "form", "canvas", "animation", "menu",
+}
+
+def estimate_tokens(text):
+    """Local estimate of the tokens in text, close to Llama's tokenizer for English and code"""
+    count = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        if piece[0].isalpha():
+            count += 1 + (len(piece) - 1) // 8  # long identifiers split into a few tokens
+        elif piece[0].isspace():
+            count += 0 if piece == " " else 1 + len(piece) // 17  # a single space joins the next word
+        else:
+            count += (len(piece) + 1) // 2
+    return count
+
+def classify_request(prompt, language="python", multi_file=False):
+    """Kind of answer a request needs: "one_liner", "script", "gui" or "multi_file" """
+    if multi_file:
+        return "multi_file"
+    words = set(re.findall(r"[a-z]+", prompt.lower()))
+    if words & GUI_WORDS or language in ("html", "css"):
+        return "gui"
+    if estimate_complexity(prompt, language) <= 0.1 and len(words) <= 12:
+        return "one_liner"
+    return "script"
+
+class PromptBuilder:
+    """Assembles the messages and completion budget of a code generation request.
+
+    The system prompt depends only on the language, so it is an identical
+    prefix for every request in that language (cacheable by the API); the
+    request itself is sent once, as the user message. max_tokens follows
+    the kind of request instead of always allowing 8000.
+    """
+
+    def __init__(self):
+        self._system = {}
+        self._lock = threading.Lock()
+
+    def max_tokens(self, request_type):
+        return {
+            "one_liner": Config.PROMPT_MAX_TOKENS_ONE_LINER,
+            "script": Config.PROMPT_MAX_TOKENS_SCRIPT,
+            "gui": Config.PROMPT_MAX_TOKENS_GUI,
+            "multi_file": Config.PROMPT_MAX_TOKENS_MULTI_FILE,
+        }.get(request_type, Config.PROMPT_MAX_TOKENS_SCRIPT)
+
+    def system_prompt(self, language):
+        with self._lock:
+            if language not in self._system:
+                self._system[language] = f"""You are Spectra, an expert AI coding assistant. Generate clean, well-commented, functional code based on the user's request.
+
+Rules:
+- Provide complete, runnable code
+- Include necessary imports and dependencies
+- Add helpful comments for complex logic
+- Follow best practices for {language}
+- Make the code production-ready
+- If creating a GUI or visual application, make it functional and attractive
+
+Language: {language}"""
+            return self._system[language]
+
+    def build(self, prompt, language="python", request_type=None):
+        """Request dict: prompt, language, type, messages, max_tokens and prompt_tokens (estimated)"""
+        request_type = request_type or classify_request(prompt, language)
+        messages = [
+            {"role": "system", "content": self.system_prompt(language)},
+            {"role": "user", "content": prompt},
+        ]
+        return {
+            "prompt": prompt,
+            "language": language,
+            "type": request_type,
+            "messages": messages,
+            "max_tokens": self.max_tokens(request_type),
+            # a few tokens of chat formatting per message
+            "prompt_tokens": sum(estimate_tokens(m["content"]) + 4 for m in messages),
+        }
+
+    def continuation(self, request, tail):
+        """Request for the rest of a completion that hit max_tokens, seeded with only its tail"""
+        messages = [
+            {"role": "system", "content": self.system_prompt(request["language"])},
+            {"role": "user", "content": request["prompt"]},
+            {"role": "assistant", "content": f"```{request['language']}\n{tail}"},
+            {"role": "user", "content": "Your answer was cut off. Continue the code from the line after the last one "
+                                        "above. Do not repeat earlier lines or add explanations."},
+        ]
+        return {
+            "prompt": request["prompt"],
+            "language": request["language"],
+            "type": "continuation",
+            "messages": messages,
+            "max_tokens": Config.CONTINUATION_MAX_TOKENS,
+            "prompt_tokens": sum(estimate_tokens(m["content"]) + 4 for m in messages),
+        }
@@ -0,0 +1,223 @@
+import re
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from config.settings import Config
+
+# Groq reports reset times like "2m59.56s", "7.66s" or "120ms"
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+# SDK errors worth another attempt: the request may well succeed if sent again
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+def parse_duration(value):
+    """Seconds in a rate-limit header value, None if it cannot be read"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)  # retry-after is plain seconds
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+class RateLimitExceeded(Exception):
+    """A request waited longer than its priority allows for API budget"""
+
+class TokenBucket:
+    """Budget that refills continuously at `capacity` per minute"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount, now):
+        """Seconds until `amount` is available; never more than a full refill"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount or self.rate <= 0:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, remaining, now):
+        """Trust the server's count of what is left"""
+        self._refill(now)
+        self.level = min(self.capacity, float(remaining))
+
+class RequestScheduler:
+    """Client-side rate limiting and ordering for every API request.
+
+    Requests take one unit from a requests-per-minute bucket and their
+    estimated size from a tokens-per-minute bucket. When the budget is
+    short they wait in a queue ordered by priority (interactive commands
+    before batch work), then by arrival. Rate-limit headers on every
+    response resync the buckets, and a 429's retry-after holds the whole
+    queue, so work is delayed instead of failing. Connection errors and
+    5xx answers are retried up to API_MAX_RETRIES times, each attempt
+    taking its own budget.
+    """
+
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BACKGROUND = 1
+    PRIORITY_BATCH = 2
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute or Config.RATE_LIMIT_RPM)
+        self.tokens = TokenBucket(tokens_per_minute or Config.RATE_LIMIT_TPM)
+        self.waits = deque(maxlen=200)  # (priority, seconds waited) of recent requests
+        self.stats = {"requests": 0, "delayed": 0, "rate_limited": 0, "timeouts": 0, "retries": 0}
+        self._hold_until = 0.0
+        self._held_response = None  # the last 429 observe() already held the queue for
+        self._waiters = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def max_wait(self, priority):
+        return Config.RATE_LIMIT_MAX_WAIT if priority <= self.PRIORITY_INTERACTIVE else Config.RATE_LIMIT_BATCH_MAX_WAIT
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, tokens=1):
+        """Block until the request may be sent, returns the seconds waited"""
+        started = time.monotonic()
+        deadline = started + self.max_wait(priority)
+        entry = (priority, next(self._order))
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiters[0] == entry:
+                        delay = max(self._hold_until - now, self.requests.delay(1, now),
+                                    self.tokens.delay(tokens, now))
+                        if delay <= 0:
+                            self.requests.take(1, now)
+                            self.tokens.take(tokens, now)
+                            break
+                    else:
+                        delay = None  # woken when the queue moves
+                    if now >= deadline:
+                        self.stats["timeouts"] += 1
+                        raise RateLimitExceeded(f"no API budget after {now - started:.1f} s")
+                    self._condition.wait(min(delay, deadline - now) if delay is not None else deadline - now)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+            waited = time.monotonic() - started
+            self.stats["requests"] += 1
+            if waited > 0.01:
+                self.stats["delayed"] += 1
+            self.waits.append((priority, waited))
+        if waited > 0.1:
+            print(f"[RateLimit] Waited {waited:.1f} s for API budget ({self.queue_depth()} still queued)")
+        return waited
+
+    def try_acquire(self, priority=PRIORITY_INTERACTIVE, tokens=1):
+        """Take the budget for a request only if it is there now and nobody is queued for it"""
+        with self._condition:
+            now = time.monotonic()
+            if self._waiters or self._hold_until > now or \
+                    self.requests.delay(1, now) > 0 or self.tokens.delay(tokens, now) > 0:
+                return False
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self.stats["requests"] += 1
+            self.waits.append((priority, 0.0))
+        return True
+
+    def run(self, call, priority=PRIORITY_INTERACTIVE, tokens=1):
+        """Return call() once budget allows, waiting out 429s within the priority's max wait
+        and retrying connection errors and 5xx answers up to API_MAX_RETRIES times"""
+        deadline = time.monotonic() + self.max_wait(priority)
+        retries = 0
+        while True:
+            self.acquire(priority, tokens)
+            try:
+                return call()
+            except Exception as e:
+                name = type(e).__name__
+                if name == "RateLimitError" and time.monotonic() < deadline:
+                    # The response hook has usually held the queue for this 429 already
+                    if getattr(e, "response", None) is not self._held_response:
+                        self.hold(self._retry_after(e), reason="429 from the API")
+                elif name in RETRYABLE_ERRORS and retries < Config.API_MAX_RETRIES:
+                    retries += 1
+                    with self._condition:
+                        self.stats["retries"] += 1
+                    backoff = min(0.5 * 2 ** (retries - 1), 8.0)
+                    print(f"[RateLimit] {name}, retrying in {backoff:.1f} s ({retries}/{Config.API_MAX_RETRIES})")
+                    time.sleep(backoff)
+                else:
+                    raise
+
+    def _retry_after(self, error):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        return parse_duration(headers.get("retry-after")) or 1.0
+
+    def hold(self, seconds, reason="rate limited"):
+        """Send nothing for `seconds`"""
+        with self._condition:
+            self.stats["rate_limited"] += 1
+            self._hold_until = max(self._hold_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+        print(f"[RateLimit] Holding requests for {seconds:.1f} s ({reason})")
+
+    def observe(self, response):
+        """httpx response hook: resync budgets from the x-ratelimit-* headers"""
+        headers = response.headers
+        now = time.monotonic()
+        with self._condition:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                bucket.sync(remaining, now)
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining < 1 and reset:
+                    self._hold_until = max(self._hold_until, now + reset)
+            self._condition.notify_all()
+        if response.status_code == 429:
+            self._held_response = response
+            self.hold(parse_duration(headers.get("retry-after")) or 1.0, reason="429 from the API")
+
+    def queue_depth(self):
+        with self._condition:
+            return len(self._waiters)
+
+    def summary(self):
+        """Queue depth, remaining budgets and wait times per priority"""
+        with self._condition:
+            waits = list(self.waits)
+            now = time.monotonic()
+            summary = dict(self.stats, queue_depth=len(self._waiters),
+                           requests_available=round(self.requests.level, 1),
+                           tokens_available=round(self.tokens.level),
+                           held_for=round(max(0.0, self._hold_until - now), 1))
+        for priority in sorted({p for p, _ in waits}):
+            seconds = sorted(w for p, w in waits if p == priority)
+            summary[f"wait_p{priority}"] = {
+                "count": len(seconds),
+                "mean": sum(seconds) / len(seconds),
+                "p95": seconds[min(len(seconds) - 1, int(0.95 * (len(seconds) - 1) + 0.5))],
+                "max": seconds[-1],
+            }
+        return summary
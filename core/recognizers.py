@@ -0,0 +1,171 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import speech_recognition as sr
+from config.settings import Config
+
+# name -> {"func": callable(recognizer, audio) -> (text, confidence or None), "local": bool}
+RECOGNIZER_BACKENDS = {}
+
+def register_backend(name, local=False):
+    """Register a speech recognizer backend under `name`"""
+    def decorator(func):
+        RECOGNIZER_BACKENDS[name] = {"func": func, "local": local}
+        return func
+    return decorator
+
+@register_backend("google")
+def _recognize_google(recognizer, audio):
+    result = recognizer.recognize_google(audio, show_all=True)
+    alternatives = result.get("alternative") if isinstance(result, dict) else None
+    if not alternatives:
+        raise sr.UnknownValueError()
+    best = max(alternatives, key=lambda alt: alt.get("confidence", 0.0))
+    return best["transcript"], best.get("confidence")
+
+@register_backend("sphinx", local=True)
+def _recognize_sphinx(recognizer, audio):
+    return recognizer.recognize_sphinx(audio), None
+
+@register_backend("whisper", local=True)
+def _recognize_whisper(recognizer, audio):
+    text = recognizer.recognize_whisper(audio, model=Config.WHISPER_MODEL, language="english")
+    return text.strip(), None
+
+@register_backend("vosk", local=True)
+def _recognize_vosk(recognizer, audio):
+    result = recognizer.recognize_vosk(audio)
+    if isinstance(result, str) and result.lstrip().startswith("{"):
+        result = json.loads(result).get("text", "")
+    if not result:
+        raise sr.UnknownValueError()
+    return result, None
+
+class RecognizerPool:
+    """Runs audio through the configured backends, sequentially or as a race.
+
+    Per-backend latency and win rate are tracked so the order in which
+    backends are tried (or raced, when RECOGNIZER_RACE_WIDTH limits it)
+    adapts to whichever answers fastest and most often.
+    """
+
+    def __init__(self, recognizer, backends=None, race=None):
+        self.recognizer = recognizer
+        names = backends or Config.RECOGNIZER_BACKENDS
+        self.backends = [name for name in names if name in RECOGNIZER_BACKENDS]
+        for name in names:
+            if name not in RECOGNIZER_BACKENDS:
+                print(f"[ASR] Unknown recognizer backend '{name}', ignoring")
+        if not self.backends:
+            self.backends = ["google"]
+        self.race = Config.RECOGNIZER_RACE if race is None else race
+        self.stats = {
+            name: {"calls": 0, "wins": 0, "errors": 0, "latency": None}
+            for name in self.backends
+        }
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.backends), thread_name_prefix="asr")
+
+    def ordered(self):
+        """Backends sorted by expected time to a usable transcript"""
+        def score(item):
+            index, name = item
+            stats = self.stats[name]
+            if not stats["calls"] or stats["latency"] is None:
+                return (0, index)  # untried backends keep their configured position
+            win_rate = stats["wins"] / stats["calls"]
+            return (stats["latency"] / max(win_rate, 0.05), index)
+        return [name for _, name in sorted(enumerate(self.backends), key=score)]
+
+    def _run(self, name, audio):
+        started = time.perf_counter()
+        try:
+            text, confidence = RECOGNIZER_BACKENDS[name]["func"](self.recognizer, audio)
+            error = None
+        except Exception as e:
+            text, confidence, error = None, None, e
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            stats = self.stats[name]
+            stats["calls"] += 1
+            if error is not None and not isinstance(error, sr.UnknownValueError):
+                stats["errors"] += 1
+            if stats["latency"] is None:
+                stats["latency"] = elapsed
+            else:
+                stats["latency"] += Config.RECOGNIZER_STATS_ALPHA * (elapsed - stats["latency"])
+        if error is not None:
+            raise error
+        return name, text, confidence, elapsed
+
+    def _confident(self, text, confidence):
+        return bool(text) and (confidence is None or confidence >= Config.RECOGNIZER_MIN_CONFIDENCE)
+
+    def _win(self, name, text, elapsed):
+        with self._lock:
+            self.stats[name]["wins"] += 1
+        print(f"[ASR] {name} answered in {elapsed * 1000:.0f} ms")
+        return text
+
+    def recognize(self, audio):
+        """Return the first confident transcript, raising sr.UnknownValueError if there is none"""
+        if self.race and len(self.backends) > 1:
+            return self._recognize_race(audio)
+        return self._recognize_sequential(audio)
+
+    def _recognize_sequential(self, audio):
+        fallback = None
+        last_error = None
+        for name in self.ordered():
+            try:
+                _, text, confidence, elapsed = self._run(name, audio)
+            except sr.UnknownValueError:
+                continue
+            except Exception as e:
+                print(f"[ASR] {name} failed: {e}")
+                last_error = e
+                continue
+            if self._confident(text, confidence):
+                return self._win(name, text, elapsed)
+            fallback = fallback or (name, text, elapsed)
+        if fallback:
+            return self._win(*fallback)
+        if last_error is not None:
+            raise last_error
+        raise sr.UnknownValueError()
+
+    def _recognize_race(self, audio):
+        contenders = self.ordered()[:Config.RECOGNIZER_RACE_WIDTH or None]
+        pending = {self._executor.submit(self._run, name, audio) for name in contenders}
+        fallback = None
+        last_error = None
+        deadline = time.monotonic() + Config.RECOGNIZER_TIMEOUT
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    print("[ASR] Race timed out")
+                    break
+                for future in done:
+                    try:
+                        name, text, confidence, elapsed = future.result()
+                    except sr.UnknownValueError:
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if self._confident(text, confidence):
+                        return self._win(name, text, elapsed)
+                    fallback = fallback or (name, text, elapsed)
+        finally:
+            # Losers that have not started are dropped; running ones finish in the background
+            for future in pending:
+                future.cancel()
+        if fallback:
+            return self._win(*fallback)
+        if last_error is not None:
+            raise last_error
+        raise sr.UnknownValueError()
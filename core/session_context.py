@@ -0,0 +1,47 @@
+import os
+import threading
+
+class SessionContext:
+    """What Spectra wrote most recently, so follow-up commands can edit it.
+
+    FileManager records every file it writes. Writing into a different
+    project starts a new session; files are kept most recent last.
+    """
+
+    def __init__(self):
+        self.project_path = None
+        self.files = {}  # filepath -> language, in the order first written
+        self.entry = None  # file to run after an edit
+        self._lock = threading.Lock()
+
+    def record_file(self, filepath, project_path, language=None):
+        with self._lock:
+            if project_path != self.project_path:
+                self.project_path = project_path
+                self.files = {}
+                self.entry = None
+            self.files.pop(filepath, None)
+            self.files[filepath] = language
+            if self.entry is None:
+                self.entry = filepath
+
+    def set_entry(self, filepath):
+        with self._lock:
+            if filepath in self.files:
+                self.entry = filepath
+
+    def existing_files(self):
+        """(filepath, language) of the session's files that are still on disk"""
+        with self._lock:
+            files = list(self.files.items())
+        return [(path, language) for path, language in files if os.path.isfile(path)]
+
+    @property
+    def active(self):
+        return self.project_path is not None and bool(self.existing_files())
+
+    def clear(self):
+        with self._lock:
+            self.project_path = None
+            self.files = {}
+            self.entry = None
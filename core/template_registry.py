@@ -0,0 +1,134 @@
+import os
+import re
+from config.settings import Config
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+class Template:
+    """A fallback template split once into literal text and placeholder names.
+
+    Placeholders are written {{prompt}}, {{language}} or {{LANGUAGE}};
+    rendering only joins the pieces, so braces in CSS or JS need no escaping.
+    """
+
+    def __init__(self, name, language, body, triggers=(), priority=100):
+        self.name = name
+        self.language = language
+        self.triggers = tuple(triggers)
+        self.priority = priority
+        self._parts = []  # (is_placeholder, text)
+        position = 0
+        for match in PLACEHOLDER.finditer(body):
+            self._parts.append((False, body[position:match.start()]))
+            self._parts.append((True, match.group(1)))
+            position = match.end()
+        self._parts.append((False, body[position:]))
+
+    def render(self, **values):
+        return "".join(values.get(text, "") if is_placeholder else text for is_placeholder, text in self._parts)
+
+def _parse(path):
+    """Split a template file into its front matter and body"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    meta = {}
+    if text.startswith("---\n"):
+        header, _, text = text[4:].partition("\n---\n")
+        for line in header.splitlines():
+            key, _, value = line.partition(":")
+            meta[key.strip()] = value.strip()
+    if text.endswith("\n"):
+        text = text[:-1]
+    return meta, text
+
+class TemplateRegistry:
+    """Fallback templates per language, loaded from a directory once.
+
+    Layout: <directory>/<language>/<name>.tmpl plus <directory>/default.tmpl
+    for languages without templates. Each file may start with front matter:
+
+        ---
+        triggers: gui, tkinter, window
+        priority: 20
+        ---
+
+    The trigger keywords of each language are compiled into one regex
+    alternation, so choosing a template is a single scan of the prompt;
+    among matching templates the lowest priority wins, and a template
+    without triggers is the language default.
+    """
+
+    def __init__(self):
+        self.templates = {}  # language -> [Template] sorted by priority
+        self.generic = None
+        self._matchers = {}  # language -> (compiled regex, {keyword: [Template]})
+
+    @classmethod
+    def load(cls, *directories):
+        registry = cls()
+        for directory in directories:
+            if directory and os.path.isdir(directory):
+                registry._load_directory(directory)
+        registry._compile()
+        return registry
+
+    def _load_directory(self, directory):
+        generic = os.path.join(directory, "default.tmpl")
+        if os.path.isfile(generic):
+            meta, body = _parse(generic)
+            self.generic = Template("default", None, body)
+        for language in sorted(os.listdir(directory)):
+            folder = os.path.join(directory, language)
+            if not os.path.isdir(folder):
+                continue
+            for filename in sorted(os.listdir(folder)):
+                if filename.endswith(".tmpl"):
+                    self.add(language, filename[:-len(".tmpl")], *_parse(os.path.join(folder, filename)))
+
+    def add(self, language, name, meta, body):
+        triggers = [word.strip().lower() for word in meta.get("triggers", "").split(",") if word.strip()]
+        template = Template(name, language, body, triggers, int(meta.get("priority", 100)))
+        # A later directory overrides a template of the same name
+        existing = [t for t in self.templates.get(language, []) if t.name != name]
+        self.templates[language] = sorted(existing + [template], key=lambda t: t.priority)
+
+    def _compile(self):
+        self._matchers = {}
+        for language, templates in self.templates.items():
+            by_keyword = {}
+            for template in templates:
+                for keyword in template.triggers:
+                    by_keyword.setdefault(keyword, []).append(template)
+            if by_keyword:
+                # Longest keywords first so "web page" wins over "web"
+                pattern = "|".join(re.escape(k) for k in sorted(by_keyword, key=len, reverse=True))
+                self._matchers[language] = (re.compile(pattern), by_keyword)
+
+    def select(self, prompt, language):
+        """Best template for the prompt, or None if the language has none"""
+        templates = self.templates.get(language)
+        if not templates:
+            return self.generic
+        best = None
+        matcher = self._matchers.get(language)
+        if matcher:
+            pattern, by_keyword = matcher
+            for match in pattern.finditer(prompt.lower()):
+                for template in by_keyword[match.group(0)]:
+                    if best is None or template.priority < best.priority:
+                        best = template
+        if best is None:
+            best = next((t for t in templates if not t.triggers), None)
+        return best or self.generic
+
+    def render(self, prompt, language):
+        template = self.select(prompt, language)
+        if template is None:
+            return ""
+        return template.render(prompt=prompt, language=language, LANGUAGE=language.upper())
+
+# Loaded once at import; FALLBACK_TEMPLATES_DIR can add or override templates
+TEMPLATES = TemplateRegistry.load(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates"),
+    Config.FALLBACK_TEMPLATES_DIR,
+)
@@ -0,0 +1,110 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from config.settings import Config
+
+class TTSCache:
+    """Content-addressed cache of synthesized speech.
+
+    Rendered audio files live on disk under a hash of everything that
+    changes the output (text, engine, lang, tld, voice), so identical
+    phrases are synthesized once and survive restarts. The directory is
+    capped at `max_bytes`, evicting least recently played files first
+    (file mtime is bumped on every hit). A small in-memory tier keeps the
+    decoded audio of recently played phrases so they skip decoding too.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, memory_items=None, extension=".mp3"):
+        self.directory = directory or Config.TTS_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else int(Config.TTS_CACHE_MAX_MB * 1024 * 1024)
+        self.memory_items = memory_items if memory_items is not None else Config.TTS_MEMORY_ITEMS
+        self.extension = extension
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, engine, lang=None, tld=None, voice=None):
+        """Cache key for one rendering of `text`"""
+        parts = [" ".join(text.split()), engine, lang or "", tld or "", voice or ""]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def decoded(self, key):
+        """Decoded audio kept in memory for `key`, or None"""
+        with self._lock:
+            if key not in self._memory:
+                return None
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self._memory[key]
+
+    def keep(self, key, audio):
+        """Remember decoded audio for `key`, dropping the least recently used entries"""
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._memory[key] = audio
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def data(self, key, render):
+        """Rendered audio bytes for `key`, calling render() to produce them on a miss"""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        if data is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            return data
+
+        with self._lock:
+            self.stats["misses"] += 1
+        data = render()
+        # Write next to the final name and rename, so readers never see partial files
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+        except OSError as e:
+            print(f"[TTS Cache] Could not store audio: {e}")
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self._evict()
+        return data
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.extension):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats["evictions"] += 1
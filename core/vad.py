@@ -0,0 +1,74 @@
+import numpy as np
+import speech_recognition as sr
+from config.settings import Config
+from core.audio_utils import pcm_to_float
+
+class VoiceActivityDetector:
+    """Frame-level speech detector with an adaptive noise floor"""
+
+    def __init__(self, frame_ms=20):
+        self.frame_ms = frame_ms
+        self.noise_floor = None  # background level in dB, learned from non-speech frames
+        self.stats = {"segments": 0, "dropped": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def frame_features(self, samples, sample_rate):
+        """Return per-frame energy (dB), zero-crossing rate and spectral flatness"""
+        frame_length = int(sample_rate * self.frame_ms / 1000)
+        count = len(samples) // frame_length
+        frames = samples[:count * frame_length].reshape(count, frame_length)
+        energy = 10.0 * np.log10((frames ** 2).mean(axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = (signs[:, 1:] != signs[:, :-1]).mean(axis=1)
+        power = np.abs(np.fft.rfft(frames * np.hanning(frame_length), axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)
+        return energy, zcr, flatness
+
+    def speech_mask(self, pcm, sample_rate, sample_width=2):
+        """Classify each frame of a PCM buffer as speech (True) or not"""
+        samples = pcm_to_float(pcm, sample_width)
+        energy, zcr, flatness = self.frame_features(samples, sample_rate)
+        if not len(energy):
+            return np.zeros(0, dtype=bool)
+
+        # Quiet stretches of this buffer are an estimate of the current noise floor
+        estimate = float(np.percentile(energy, 10))
+        floor = estimate if self.noise_floor is None else min(self.noise_floor, estimate)
+
+        loud = energy > floor + Config.VAD_ENERGY_MARGIN_DB
+        # Broadband noise is both spectrally flat and crosses zero often; voiced speech is neither
+        speech = loud & ((flatness < Config.VAD_FLATNESS_MAX) | (zcr < Config.VAD_ZCR_MAX))
+
+        # Let the floor follow the room, but only from frames we believe are not speech
+        if not speech.all():
+            background = float(energy[~speech].mean())
+            if self.noise_floor is None:
+                self.noise_floor = background
+            else:
+                self.noise_floor += Config.VAD_NOISE_ADAPT * (background - self.noise_floor)
+        return speech
+
+    def trim(self, audio):
+        """Return `audio` with leading/trailing silence removed, or None if it holds no speech"""
+        raw = audio.get_raw_data()
+        self.stats["segments"] += 1
+        self.stats["bytes_in"] += len(raw)
+
+        speech = self.speech_mask(raw, audio.sample_rate, audio.sample_width)
+        frames_per_second = 1000.0 / self.frame_ms
+        if speech.sum() < Config.VAD_MIN_SPEECH_MS / self.frame_ms:
+            self.stats["dropped"] += 1
+            return None
+
+        # Bridge short pauses between words, then keep a little padding around the speech
+        hangover = max(1, int(Config.VAD_HANGOVER_MS / self.frame_ms))
+        speech = np.convolve(speech, np.ones(hangover), mode="same") > 0
+        voiced = np.flatnonzero(speech)
+        padding = int(Config.VAD_PADDING_MS / self.frame_ms)
+        first = max(0, voiced[0] - padding)
+        last = min(len(speech), voiced[-1] + 1 + padding)
+
+        bytes_per_frame = int(audio.sample_rate / frames_per_second) * audio.sample_width
+        end = len(raw) if last == len(speech) else last * bytes_per_frame
+        trimmed = raw[first * bytes_per_frame:end]
+        self.stats["bytes_out"] += len(trimmed)
+        return sr.AudioData(trimmed, audio.sample_rate, audio.sample_width)
@@ -1,11 +1,119 @@
+import time
+from collections import deque
 import speech_recognition as sr
 from config.settings import Config
+from core.audio_stream import AudioStream
+from core.audio_utils import rms, peak_level, pcm_to_float, float_to_pcm, mixdown, resample
+from core.wake_word import WakeWordDetector
+from core.vad import VoiceActivityDetector
+from core.recognizers import RecognizerPool
+from core.echo import EchoCanceller
+
+class EncodedAudioData(sr.AudioData):
+    """AudioData that remembers its FLAC encoding, so recognizers do not re-encode it"""
+
+    def __init__(self, frame_data, sample_rate, sample_width, flac_data=None):
+        super().__init__(frame_data, sample_rate, sample_width)
+        self.flac_data = flac_data
+
+    def get_flac_data(self, convert_rate=None, convert_width=None):
+        unchanged = convert_rate in (None, self.sample_rate) and convert_width in (None, self.sample_width)
+        if self.flac_data is not None and unchanged:
+            return self.flac_data
+        return super().get_flac_data(convert_rate, convert_width)
+
+class AudioPreprocessor:
+    """Shrinks captured audio before it is uploaded to a recognizer.
+
+    Silence is trimmed by the VAD, the rest is mixed down to mono,
+    resampled to RECOGNIZER_SAMPLE_RATE as 16-bit PCM and FLAC-encoded
+    once up front. Per-utterance sizes and timings are kept in `history`.
+    """
+
+    def __init__(self, vad, sample_rate=None):
+        self.vad = vad
+        self.sample_rate = sample_rate or Config.RECOGNIZER_SAMPLE_RATE
+        self.history = []
+        self.totals = {"utterances": 0, "bytes_captured": 0, "bytes_on_wire": 0, "encode_time": 0.0}
+
+    def process(self, audio, channels=1):
+        """Return upload-ready audio, or None if it contains no speech"""
+        started = time.perf_counter()
+        captured = len(audio.get_raw_data())
+        speech = self.vad.trim(audio)
+        if speech is None:
+            return None
+
+        samples = mixdown(pcm_to_float(speech.get_raw_data(), speech.sample_width), channels)
+        samples = resample(samples, speech.sample_rate, self.sample_rate)
+        prepared = EncodedAudioData(float_to_pcm(samples, 2), self.sample_rate, 2)
+        resample_time = time.perf_counter() - started
+
+        encode_started = time.perf_counter()
+        if Config.RECOGNIZER_COMPRESS:
+            try:
+                prepared.flac_data = prepared.get_flac_data()
+            except Exception as e:
+                print(f"[Audio Prep] FLAC encoding unavailable: {e}")
+        encode_time = time.perf_counter() - encode_started
+        on_wire = len(prepared.flac_data) if prepared.flac_data is not None else len(prepared.get_wav_data())
+
+        record = {
+            "bytes_captured": captured,
+            "bytes_on_wire": on_wire,
+            "prepare_time": resample_time,
+            "encode_time": encode_time,
+        }
+        self.history.append(record)
+        self.totals["utterances"] += 1
+        self.totals["bytes_captured"] += captured
+        self.totals["bytes_on_wire"] += on_wire
+        self.totals["encode_time"] += encode_time
+        print(f"[Audio Prep] {captured / 1024:.0f} KB captured -> {on_wire / 1024:.0f} KB on the wire "
+              f"(prepare {resample_time * 1000:.0f} ms, encode {encode_time * 1000:.0f} ms)")
+        return prepared
 
 class VoiceInput:
-    def __init__(self, device_index=None):
-        self.recognizer = sr.Recognizer()
+    # Transcripts accepted as the wake word by the cloud fallback
+    wake_variants = [Config.WAKE_WORD.lower(), "spectra", "specter", "spektra", "spectro"]
+
+    def __init__(self, device_index=None, microphone=None, recognizer=None, playback=None):
+        """`microphone` and `recognizer` can be replaced, e.g. by the replay harness in core.audio_replay.
+
+        `playback` is VoiceOutput.playback; with it, Spectra's own voice is
+        gated out of (or cancelled from) the microphone signal.
+        """
+        self.playback = playback
+        self.recognizer = recognizer or sr.Recognizer()
+        self.recognizers = RecognizerPool(self.recognizer)
         self.microphone = None
+        self.stream = None
+        self.wake_detector = None
+        self.vad = VoiceActivityDetector()
+        self.preprocessor = AudioPreprocessor(self.vad)
+        self._wake_cursor = None
+        self._command_cursor = None
+        self._level_cursor = None
+        self._wake_echo = EchoCanceller()
+        self.echo_stats = {"gated_chunks": 0, "cancelled_chunks": 0, "suppressed_requests": 0}
+        # Stream time (seconds since the shared stream opened) of the latest events
+        self.last_wake_at = None
+        self.last_phrase_end = None
         
+        if microphone is not None:
+            self.microphone = microphone
+            self.adjust_for_ambient_noise()
+        else:
+            self._open_microphone(device_index)
+
+        if self.microphone:
+            self.stream = AudioStream(self.microphone)
+            self.wake_detector = WakeWordDetector(self.microphone.SAMPLE_RATE, self.microphone.SAMPLE_WIDTH)
+            if not self.wake_detector.has_templates():
+                print("[Wake Word] No enrolled samples, falling back to cloud recognition. "
+                      "Run 'python main.py --enroll' to enable local wake word spotting.")
+
+    def _open_microphone(self, device_index):
         try:
             # List available microphones
             print("Available microphones:")
@@ -13,13 +121,13 @@ class VoiceInput:
                 print(f"{index}: {name}")
             
             # Try to use the default microphone
-            self.microphone = sr.Microphone(device_index=device_index)
+            self.microphone = sr.Microphone(device_index=device_index, chunk_size=Config.AUDIO_CHUNK)
             self.adjust_for_ambient_noise()
         except Exception as e:
             print(f"[Microphone Error] {e}")
             # Try to use any available microphone
             try:
-                self.microphone = sr.Microphone()
+                self.microphone = sr.Microphone(chunk_size=Config.AUDIO_CHUNK)
                 self.adjust_for_ambient_noise()
             except Exception as e2:
                 print(f"[Fallback Microphone Error] {e2}")
@@ -34,24 +142,220 @@ class VoiceInput:
         except Exception as e:
             print(f"[Ambient Noise Error] {e}")
 
-    def listen_for_wake_word(self):
-        """Listen once for wake word, return True if detected"""
+    def close(self):
+        """Release the shared microphone stream"""
+        if self.stream:
+            self.stream.stop()
+
+    @property
+    def error(self):
+        """Why voice input cannot work, or None"""
+        return None if self.microphone else "no microphone available"
+
+    def input_level(self):
+        """Loudest chunk since the last call, as RMS over full scale (0 to 1)"""
+        if not self.stream or not self.stream.is_running():
+            return 0.0
+        if self._level_cursor is None:
+            self._level_cursor = self.stream.position()
+        try:
+            start, chunks = self.stream.read(self._level_cursor, timeout=0)
+        except OSError:
+            return 0.0
+        self._level_cursor = start + len(chunks)
+        return peak_level(chunks, self.stream.sample_width)
+
+    def open_stream(self):
+        """Start the shared stream, or restart it if the device dropped.
+
+        A replayed recording that ran out is left as it is, so the audio it
+        already buffered (and the cursors into it) can still be read.
+        """
+        if not self.stream.is_running() and not self.stream.finished:
+            self.stream.start()
+            self._wake_cursor = self.stream.opened_at
+            self._command_cursor = None
+
+    def _remove_echo(self, index, chunk, canceller, cancel=None):
+        """Strip Spectra's own voice from chunk `index`, returns None if the chunk is gated.
+
+        The echo is subtracted when `cancel` is set (by default, when
+        ECHO_MODE is "cancel") and the played signal is known; otherwise
+        the whole chunk is gated.
+        """
+        if self.playback is None or Config.ECHO_MODE == "off":
+            return chunk
+        stream = self.stream
+        ended = stream.chunk_time(index)
+        if ended is None:
+            return chunk
+        started = ended - stream.seconds_per_chunk
+        if not self.playback.overlaps(started, ended):
+            return chunk
+
+        if Config.ECHO_MODE == "cancel" if cancel is None else cancel:
+            max_delay = int(Config.ECHO_MAX_DELAY * stream.sample_rate)
+            reference = self.playback.reference(started - Config.ECHO_MAX_DELAY, ended, stream.sample_rate)
+            if reference is not None:
+                samples = pcm_to_float(chunk, stream.sample_width)
+                reference = reference[:max_delay + len(samples)]
+                if len(reference) == max_delay + len(samples):
+                    self.echo_stats["cancelled_chunks"] += 1
+                    return float_to_pcm(canceller.process(samples, reference, max_delay), stream.sample_width)
+
+        self.echo_stats["gated_chunks"] += 1
+        return None
+
+    def _capture_phrase(self, cursor, timeout=None, phrase_time_limit=None, cancel_echo=None):
+        """Collect one phrase from the shared stream starting at `cursor`.
+
+        Mirrors sr.Recognizer.listen: wait for audio above the energy
+        threshold, then record until `pause_threshold` seconds of quiet.
+        `cancel_echo` is passed to _remove_echo().
+        Returns (AudioData, cursor after the phrase).
+        """
+        stream = self.stream
+        seconds_per_chunk = stream.seconds_per_chunk
+        pause_chunks = stream.seconds_to_chunks(self.recognizer.pause_threshold)
+        lead_in = deque(maxlen=stream.seconds_to_chunks(Config.AUDIO_PREROLL_SECONDS) + 1)
+        frames = []
+        waited = silent = 0
+        canceller = EchoCanceller()
+        echo_started = False
+
+        while True:
+            try:
+                start, chunks = stream.read(cursor, timeout=0.5)
+            except OSError:
+                if not stream.finished:
+                    raise
+                if not frames:
+                    raise sr.WaitTimeoutError("recording ended while waiting for phrase to start")
+                # A replayed recording ended mid-phrase: what was heard is the phrase
+                return self._phrase(frames, cursor), cursor
+            for offset, chunk in enumerate(chunks):
+                cursor = start + offset + 1
+                raw = chunk
+                chunk = self._remove_echo(cursor - 1, chunk, canceller, cancel_echo)
+                if chunk is None:
+                    # Our own voice: count the phrase it would have started, then treat it as silence
+                    own_voice = rms(raw, stream.sample_width) > self.recognizer.energy_threshold
+                    if own_voice and not frames and not echo_started:
+                        echo_started = True
+                        self.echo_stats["suppressed_requests"] += 1
+                        print(f"[Echo] Ignoring Spectra's own voice "
+                              f"({self.echo_stats['suppressed_requests']} recognition request(s) avoided)")
+                    chunk = b"\0" * len(raw)
+                else:
+                    echo_started = False
+                loud = rms(chunk, stream.sample_width) > self.recognizer.energy_threshold
+                if not frames:
+                    lead_in.append(chunk)
+                    waited += 1
+                    if loud:
+                        frames.extend(lead_in)
+                    elif timeout is not None and waited * seconds_per_chunk > timeout:
+                        raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                    continue
+
+                frames.append(chunk)
+                silent = 0 if loud else silent + 1
+                too_long = phrase_time_limit is not None and len(frames) * seconds_per_chunk >= phrase_time_limit
+                if silent >= pause_chunks or too_long:
+                    return self._phrase(frames, cursor), cursor
+
+    def _phrase(self, frames, cursor):
+        self.last_phrase_end = self.stream.seconds_since_open(cursor)
+        return sr.AudioData(b"".join(frames), self.stream.sample_rate, self.stream.sample_width)
+
+    def enroll_wake_word(self, count=3):
+        """Record a few spoken samples of the wake word for the local spotter"""
+        if not self.microphone:
+            print("[Enroll] No microphone available.")
+            return 0
+
+        self.open_stream()
+        enrolled = 0
+        while enrolled < count:
+            print(f"[Enroll] Say '{Config.WAKE_WORD}' ({enrolled + 1}/{count})...")
+            try:
+                audio, self._wake_cursor = self._capture_phrase(
+                    self.stream.position(), timeout=5, phrase_time_limit=2
+                )
+            except sr.WaitTimeoutError:
+                print("[Enroll] Timeout")
+                continue
+            speech = self.vad.trim(audio) or audio
+            path = self.wake_detector.enroll(speech.get_raw_data(), speech.sample_rate, speech.sample_width)
+            print(f"[Enroll] Saved {path}")
+            enrolled += 1
+        print(f"[Enroll] Threshold set to {self.wake_detector.threshold:.2f}")
+        return enrolled
+
+    def listen_for_wake_word(self, timeout=None):
+        """Read the shared stream until the wake word is spotted, return True if detected"""
         if not self.microphone:
             print("[Wake Word] No microphone available.")
             return False
 
         try:
-            with self.microphone as source:
-                print(f"[Wake Word] Listening for '{Config.WAKE_WORD}'...")
-                audio = self.recognizer.listen(source, timeout=3, phrase_time_limit=2)
-                text = self.recognizer.recognize_google(audio).lower()
-                print(f"[Heard] {text}")
-
-                # Accept variants
-                wake_variants = [Config.WAKE_WORD.lower(), "spectra", "specter", "spektra", "spectro"]
-                if any(word in text for word in wake_variants):
-                    print("[Wake Word Detected ✅]")
-                    return True
+            self.open_stream()
+            if not self.wake_detector.has_templates():
+                return self._listen_for_wake_word_cloud()
+
+            print(f"[Wake Word] Listening for '{Config.WAKE_WORD}'...")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            # Resume where the last call stopped, so nothing said in between is lost
+            cursor = self._wake_cursor
+            while deadline is None or time.monotonic() < deadline:
+                start, chunks = self.stream.read(cursor, timeout=0.5)
+                for offset, chunk in enumerate(chunks):
+                    # While Spectra talks the wake word interrupts it (barge-in), so its voice is
+                    # cancelled rather than gated; if it cannot be, the match must be closer
+                    threshold = None
+                    cleaned = self._remove_echo(start + offset, chunk, self._wake_echo, cancel=True)
+                    if cleaned is None:
+                        threshold = self.wake_detector.threshold * Config.WAKE_WORD_BARGE_IN_MARGIN
+                    else:
+                        chunk = cleaned
+                    if self.wake_detector.process(chunk, self.recognizer.energy_threshold, threshold):
+                        print(f"[Wake Word Detected ✅] score {self.wake_detector.last_score:.2f}")
+                        self.mark_command_start(start + offset + 1, self.wake_detector.last_word_end)
+                        return True
+                cursor = start + len(chunks)
+                self._wake_cursor = cursor
+        except Exception as e:
+            print(f"[Wake Word Error] {e}")
+
+        return False
+
+    def mark_command_start(self, index, word_end=None):
+        """Start the next command capture at chunk `index`, keeping a little pre-roll before it.
+
+        `word_end` is how many seconds before `index` the wake word ended;
+        the pre-roll never reaches back past it, so the command audio does
+        not start with the tail of the wake word.
+        """
+        preroll = self.stream.seconds_to_chunks(Config.AUDIO_PREROLL_SECONDS)
+        if word_end is not None:
+            preroll = min(preroll, int(word_end / self.stream.seconds_per_chunk))
+        self._wake_cursor = index
+        self.last_wake_at = self.stream.seconds_since_open(index)
+        self._command_cursor = max(index - preroll, self.stream.oldest())
+
+    def _listen_for_wake_word_cloud(self):
+        """Legacy wake word check through the cloud recognizer, used until samples are enrolled"""
+        try:
+            print(f"[Wake Word] Listening for '{Config.WAKE_WORD}'...")
+            audio, self._wake_cursor = self._capture_phrase(self._wake_cursor, timeout=3, phrase_time_limit=2)
+            text = self._recognize(audio).lower()
+            print(f"[Heard] {text}")
+
+            # Accept variants
+            if any(word in text for word in self.wake_variants):
+                print("[Wake Word Detected ✅]")
+                self.mark_command_start(self._wake_cursor)
+                return True
         except sr.WaitTimeoutError:
             print("[Wake Word] Timeout")
         except sr.UnknownValueError:
@@ -61,21 +365,42 @@ class VoiceInput:
 
         return False
 
+    def _recognize(self, audio):
+        """Trim and compress the audio, then send the remaining speech to the recognizer"""
+        speech = self.preprocessor.process(audio)
+        if speech is None:
+            stats = self.vad.stats
+            print(f"[VAD] No speech, skipped recognition ({stats['dropped']}/{stats['segments']} segments dropped)")
+            raise sr.UnknownValueError()
+        return self.recognizers.recognize(speech)
+
     def get_audio_input(self):
         """Capture full command after wake word"""
         if not self.microphone:
             return "Error: No microphone available."
 
         try:
-            with self.microphone as source:
-                print("[Command] Listening...")
-                audio = self.recognizer.listen(source, phrase_time_limit=8)
-                text = self.recognizer.recognize_google(audio)
-                print(f"[Command Heard] {text}")
-                return text
+            self.open_stream()
+            # Start right after the wake word, so speech during the acknowledgement is kept
+            cursor = self._command_cursor
+            if cursor is None:
+                cursor = max(self.stream.position() - self.stream.seconds_to_chunks(Config.AUDIO_PREROLL_SECONDS),
+                             self.stream.oldest())
+            self._command_cursor = None
+            print("[Command] Listening...")
+            # The acknowledgement is cancelled rather than gated where its signal is known,
+            # so an answer that starts while Spectra is still talking is not cut
+            audio, self._wake_cursor = self._capture_phrase(cursor, timeout=10, phrase_time_limit=8,
+                                                            cancel_echo=True)
+            text = self._recognize(audio)
+            print(f"[Command Heard] {text}")
+            return text
+        except sr.WaitTimeoutError:
+            print("[Command] Timeout")
+            return "Sorry, I didn't catch that."
         except sr.UnknownValueError:
             print("[Command] Could not understand")
             return "Sorry, I didn't catch that."
         except Exception as e:
             print(f"[Command Error] {e}")
-            return f"Error: {str(e)}"
\ No newline at end of file
+            return f"Error: {str(e)}"
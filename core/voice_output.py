@@ -1,15 +1,55 @@
 from gtts import gTTS
+import numpy as np
 import pygame
 import pyttsx3
 import threading
-import tempfile
-import os
+import itertools
+import queue
+import time
+import io
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from config.settings import Config
+from core.echo import PlaybackMonitor
+from core.tts_cache import TTSCache
+
+def split_speech(text, max_chars=None):
+    """Split text into sentence (or, for long sentences, clause) sized chunks"""
+    max_chars = max_chars or Config.TTS_CHUNK_CHARS
+    chunks = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        if len(sentence) <= max_chars:
+            if sentence:
+                chunks.append(sentence)
+            continue
+        # Prefer clause boundaries, and words when a clause is still too long
+        pieces = []
+        for clause in re.split(r'(?<=[,;:])\s+', sentence):
+            pieces.extend([clause] if len(clause) <= max_chars else clause.split())
+        current = ""
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        if current:
+            chunks.append(current)
+    return chunks
 
 class VoiceOutput:
+    PRIORITY_HIGH = 0  # errors and answers the user is waiting for
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2  # progress chatter, dropped when stale or when more speech is waiting
+    
     def __init__(self):
         pygame.mixer.init()
         self.use_gtts = Config.USE_INTERNET_TTS
+        # Lets VoiceInput know when (and what) Spectra is saying
+        self.playback = PlaybackMonitor()
+        # Rendered phrases on disk plus decoded audio in memory
+        self.cache = TTSCache()
         
         # Initialize pyttsx3 as fallback
         self.engine = None
@@ -27,61 +67,222 @@ class VoiceOutput:
                     break
         except Exception as e:
             print(f"Failed to initialize pyttsx3: {e}")
+        
+        # One long-lived worker owns the mixer and the pyttsx3 engine
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._generation = 0  # bumped by cancel(), stale utterances are skipped
+        self._speaking = False
+        self._stop = threading.Event()  # set by cancel() to wake the worker mid-utterance
+        
+        # Chunks of an utterance are synthesized in parallel and played back-to-back
+        # on a reserved mixer channel
+        self._synth = ThreadPoolExecutor(max_workers=Config.TTS_SYNTH_WORKERS, thread_name_prefix="tts")
+        pygame.mixer.set_reserved(1)
+        self._channel = pygame.mixer.Channel(0)
+        self.timings = {
+            "time_to_first_audio": deque(maxlen=100),  # seconds from start of an utterance to first sound
+            "gaps": deque(maxlen=500),  # silence between consecutive chunks
+        }
+        self._worker = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._worker.start()
+    
+    def speak(self, text, priority=PRIORITY_NORMAL):
+        """Queue text to be spoken with Indian accent.
+        
+        Returns a Future that resolves to True once the text has been
+        spoken, or False if it was dropped or interrupted by cancel().
+        """
+        future = Future()
+        self._queue.put((priority, next(self._order), time.monotonic(), self._generation, text, future))
+        return future
+    
+    def cancel(self):
+        """Barge-in: drop everything queued and stop the current utterance"""
+        self._generation += 1
+        while True:
+            try:
+                *_, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_result(False)
+        self._stop.set()
+        if self._speaking:
+            self._channel.stop()
+        if self._speaking and self.engine:
+            try:
+                self.engine.stop()
+            except Exception:
+                pass
     
-    def speak(self, text):
-        """Convert text to speech with Indian accent"""
-        def _speak():
-            if self.use_gtts:
-                success = self._speak_gtts(text)
-                if not success and self.engine:
-                    self._speak_pyttsx3(text)
-            elif self.engine:
-                self._speak_pyttsx3(text)
+    def is_busy(self):
+        return self._speaking or not self._queue.empty()
+    
+    def timing_stats(self):
+        """Averages of the recorded time-to-first-audio and inter-chunk gaps, in seconds"""
+        first, gaps = list(self.timings["time_to_first_audio"]), list(self.timings["gaps"])
+        return {
+            "utterances": len(first),
+            "time_to_first_audio": sum(first) / len(first) if first else None,
+            "max_time_to_first_audio": max(first) if first else None,
+            "gap": sum(gaps) / len(gaps) if gaps else None,
+            "max_gap": max(gaps) if gaps else None,
+        }
+    
+    def _run(self):
+        """Speech worker: plays queued utterances one at a time, by priority"""
+        while True:
+            priority, _, queued_at, generation, text, future = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if generation != self._generation:
+                future.set_result(False)
+                continue
+            # Chatter is only worth saying if nothing else is waiting and it is still current
+            if priority >= self.PRIORITY_LOW and (
+                    not self._queue.empty() or time.monotonic() - queued_at > Config.SPEECH_LOW_PRIORITY_TTL):
+                print(f"[Speech] Dropped: {text}")
+                future.set_result(False)
+                continue
+            
+            self._speaking = True
+            self._stop.clear()
+            try:
+                self._say(text, generation)
+                future.set_result(generation == self._generation)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._speaking = False
+    
+    def _say(self, text, generation):
+        chunks = split_speech(text)
+        spoken = 0
+        if self.use_gtts:
+            spoken = self._speak_gtts(chunks, generation)
+        if spoken < len(chunks) and generation == self._generation:
+            if self.engine:
+                self._speak_pyttsx3(" ".join(chunks[spoken:]))
             else:
                 print(f"TTS not available: {text}")
+    
+    def _reference_signal(self, sound):
+        """Mono float copy of what the mixer is about to play, for echo cancellation"""
+        try:
+            frequency, size, channels = pygame.mixer.get_init()
+            samples = pygame.sndarray.array(sound).astype(np.float32) / float(1 << (abs(size) - 1))
+            if samples.ndim > 1:
+                samples = samples.mean(axis=1)
+            return samples, frequency
+        except Exception as e:
+            print(f"Reference signal unavailable: {e}")
+            return None, None
+    
+    def _gtts_key(self, text):
+        return self.cache.key(text, "gtts", Config.TTS_LANG, Config.TTS_TLD)
+    
+    def _render_gtts(self, text):
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=Config.TTS_LANG, tld=Config.TTS_TLD).write_to_fp(buffer)
+        return buffer.getvalue()
+    
+    def _load_gtts(self, text):
+        """Decoded (sound, reference, sample_rate) for text, synthesizing only on a cache miss"""
+        key = self._gtts_key(text)
+        audio = self.cache.decoded(key)
+        if audio is None:
+            data = self.cache.data(key, lambda: self._render_gtts(text))
+            sound = pygame.mixer.Sound(io.BytesIO(data))
+            reference, sample_rate = self._reference_signal(sound)
+            audio = (sound, reference, sample_rate)
+            self.cache.keep(key, audio)
+        return audio
+    
+    def prewarm(self, phrases):
+        """Render and decode fixed phrases in the background so they play instantly"""
+        def _prewarm():
+            for text in phrases:
+                for chunk in split_speech(text):
+                    try:
+                        self._load_gtts(chunk)
+                    except Exception as e:
+                        print(f"[TTS Cache] Could not pre-render '{chunk}': {e}")
+                        return
+            print(f"[TTS Cache] {len(phrases)} phrases ready")
         
-        # Run in a thread to avoid blocking
-        thread = threading.Thread(target=_speak)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=10)  # Wait for speech to complete with timeout
+        if self.use_gtts:
+            threading.Thread(target=_prewarm, daemon=True).start()
     
-    def _speak_gtts(self, text):
-        """Use gTTS for speech with Indian accent"""
+    def _speak_gtts(self, chunks, generation):
+        """Use gTTS for speech with Indian accent, returns how many chunks were played.
+        
+        All chunks are synthesized concurrently; each one is queued on the
+        reserved channel behind the one playing, so playback is gapless
+        whenever synthesis keeps ahead. The worker sleeps on the stop event
+        for the known length of each sound instead of polling the mixer.
+        """
+        started = time.monotonic()
+        pending = [self._synth.submit(self._load_gtts, chunk) for chunk in chunks]
+        intervals = []
+        played = 0
+        ends = None  # when the sound currently on the channel finishes
         try:
-            # Ensure temp directory exists
-            temp_dir = tempfile.gettempdir()
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir)
-            temp_file = os.path.join(temp_dir, "spectra_tts.mp3")
-            
-            # Create gTTS with Indian English accent
-            tts = gTTS(text=text, lang='en', tld='co.in')
-            tts.save(temp_file)
-            
-            # Play audio with pygame
-            pygame.mixer.music.load(temp_file)
-            pygame.mixer.music.play()
-            
-            # Wait for playback to complete
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            
-            # Clean up
-            pygame.mixer.music.unload()
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+            for future in pending:
+                try:
+                    sound, reference, sample_rate = future.result()
+                except Exception as e:
+                    print(f"gTTS failed: {e}, falling back to pyttsx3")
+                    self.use_gtts = False  # Disable gTTS for future requests
+                    break
+                if generation != self._generation:
+                    break
                 
-            return True
-        except Exception as e:
-            print(f"gTTS failed: {e}, falling back to pyttsx3")
-            self.use_gtts = False  # Disable gTTS for future requests
-            return False
+                now = time.monotonic()
+                if ends is not None and now < ends:
+                    self._channel.queue(sound)
+                    start = ends
+                else:
+                    self._channel.play(sound)
+                    start = now
+                    if ends is None:
+                        self.timings["time_to_first_audio"].append(now - started)
+                        print(f"[TTS] First audio after {(now - started) * 1000:.0f} ms ({len(chunks)} chunks)")
+                    else:
+                        self.timings["gaps"].append(now - ends)
+                
+                # Publish what is played, with its scheduled start
+                if intervals:
+                    self.playback.end(intervals[-1], at=start)
+                intervals.append(self.playback.begin(reference, sample_rate, start=start))
+                played += 1
+                
+                # Wait until the previous sound is done, so this one owns the channel
+                # and the next can be queued behind it
+                if ends is not None:
+                    self._stop.wait(max(0.0, ends - time.monotonic()))
+                ends = start + sound.get_length()
+                if generation != self._generation:
+                    break
+            
+            if ends is not None and generation == self._generation:
+                self._stop.wait(max(0.0, ends - time.monotonic()))
+        finally:
+            if generation != self._generation:
+                self._channel.stop()
+            for future in pending:
+                future.cancel()
+            if intervals:
+                self.playback.end(intervals[-1])
+        return played
     
     def _speak_pyttsx3(self, text):
         """Use pyttsx3 as fallback"""
+        interval = self.playback.begin()
         try:
             self.engine.say(text)
             self.engine.runAndWait()
         except Exception as e:
-            print(f"pyttsx3 also failed: {e}")
\ No newline at end of file
+            print(f"pyttsx3 also failed: {e}")
+        finally:
+            self.playback.end(interval)
@@ -0,0 +1,212 @@
+import os
+import wave
+import numpy as np
+from config.settings import Config
+from core.audio_utils import pcm_to_float, read_wav
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+class MFCC:
+    """Vectorized MFCC front end (25 ms frames, 10 ms hop)"""
+
+    def __init__(self, sample_rate, num_coeffs=13, num_filters=26, frame_ms=25, hop_ms=10):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.hop_length = int(sample_rate * hop_ms / 1000)
+        self.n_fft = 1 << (self.frame_length - 1).bit_length()
+        self.window = np.hamming(self.frame_length).astype(np.float32)
+        self.filterbank = self._mel_filterbank(num_filters, min(8000.0, sample_rate / 2.0))
+        # DCT-II basis, dropping c0 (overall loudness) so matching is level independent
+        n = np.arange(num_filters)
+        k = np.arange(1, num_coeffs + 1)[:, None]
+        self.dct = np.cos(np.pi * k * (2 * n + 1) / (2.0 * num_filters)).astype(np.float32)
+
+    def _mel_filterbank(self, num_filters, fmax):
+        mel_points = np.linspace(_hz_to_mel(0.0), _hz_to_mel(fmax), num_filters + 2)
+        bins = np.floor((self.n_fft + 1) * _mel_to_hz(mel_points) / self.sample_rate).astype(int)
+        fft_bins = np.arange(self.n_fft // 2 + 1)[None, :]
+        left, center, right = bins[:-2, None], bins[1:-1, None], bins[2:, None]
+        rising = (fft_bins - left) / np.maximum(center - left, 1)
+        falling = (right - fft_bins) / np.maximum(right - center, 1)
+        return np.clip(np.minimum(rising, falling), 0.0, None).astype(np.float32)
+
+    def frames(self, samples):
+        """Split samples into overlapping frames (a strided view, no copy)"""
+        if len(samples) < self.frame_length:
+            return np.empty((0, self.frame_length), dtype=np.float32)
+        return np.lib.stride_tricks.sliding_window_view(samples, self.frame_length)[::self.hop_length]
+
+    def features(self, samples):
+        """Return an (n_frames, num_coeffs) feature matrix"""
+        samples = np.asarray(samples, dtype=np.float32)
+        emphasized = np.append(samples[:1], samples[1:] - 0.97 * samples[:-1])
+        frames = self.frames(emphasized)
+        if not len(frames):
+            return np.empty((0, self.dct.shape[0]), dtype=np.float32)
+        power = np.abs(np.fft.rfft(frames * self.window, n=self.n_fft)) ** 2
+        mel_energy = np.log(power @ self.filterbank.T + 1e-10)
+        return mel_energy @ self.dct.T
+
+def subsequence_dtw(template, window, with_end=False):
+    """Best normalized DTW cost of `template` against any span of `window`.
+
+    The cost matrix is computed with one broadcast and the recursion is
+    evaluated one anti-diagonal at a time, so the Python loop runs
+    len(template) + len(window) times instead of their product.
+    With `with_end`, returns (cost, index of the window frame the best span ends on).
+    """
+    n, m = len(template), len(window)
+    if not n or not m:
+        return (np.inf, m - 1) if with_end else np.inf
+    cost = np.sqrt(((template[:, None, :] - window[None, :, :]) ** 2).sum(axis=2))
+    acc = np.full((n + 1, m + 1), np.inf, dtype=np.float32)
+    acc[0, :] = 0.0  # the match may start anywhere in the window
+    for k in range(2, n + m + 1):
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+        best = np.minimum(np.minimum(acc[i - 1, j - 1], acc[i - 1, j]), acc[i, j - 1])
+        acc[i, j] = cost[i - 1, j - 1] + best
+    # ...and end anywhere
+    end = int(np.argmin(acc[n, 1:]))
+    cost = float(acc[n, end + 1] / n)
+    return (cost, end) if with_end else cost
+
+class WakeWordDetector:
+    """Streaming keyword spotter matching MFCC frames against enrolled templates"""
+
+    def __init__(self, sample_rate, sample_width=2, samples_dir=None):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.samples_dir = samples_dir or Config.WAKE_WORD_SAMPLES_DIR
+        self.mfcc = MFCC(sample_rate)
+        self.templates = []
+        self.threshold = Config.WAKE_WORD_THRESHOLD
+        self.last_score = np.inf
+        self.last_word_end = None  # seconds between the end of the detected word and the end of the audio fed
+        self.load_templates()
+        self.reset()
+
+    def has_templates(self):
+        return bool(self.templates)
+
+    def load_templates(self):
+        """Load enrolled WAV samples of the wake word from disk"""
+        self.templates = []
+        if not os.path.isdir(self.samples_dir):
+            return
+        for name in sorted(os.listdir(self.samples_dir)):
+            if name.lower().endswith(".wav"):
+                samples, rate = read_wav(os.path.join(self.samples_dir, name))
+                self._add_template(samples, rate)
+        self._calibrate()
+        if self.templates:
+            print(f"[Wake Word] Loaded {len(self.templates)} template(s), threshold {self.threshold:.2f}")
+
+    def enroll(self, pcm, sample_rate, sample_width=2):
+        """Add a spoken sample of the wake word and persist it as a WAV file"""
+        os.makedirs(self.samples_dir, exist_ok=True)
+        path = os.path.join(self.samples_dir, f"{Config.WAKE_WORD.lower()}_{len(self.templates) + 1:02d}.wav")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(sample_width)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+        self._add_template(pcm_to_float(pcm, sample_width), sample_rate)
+        self._calibrate()
+        return path
+
+    def _add_template(self, samples, sample_rate):
+        mfcc = self.mfcc if sample_rate == self.sample_rate else MFCC(sample_rate)
+        features = mfcc.features(samples)
+        # Trim leading/trailing low-energy frames so templates hold only the word
+        energy = np.log((mfcc.frames(samples) ** 2).mean(axis=1) + 1e-10)
+        voiced = np.flatnonzero(energy > energy.max() - 4.0)
+        if len(voiced):
+            features = features[voiced[0]:voiced[-1] + 1]
+        if len(features) >= 10:
+            self.templates.append(features)
+
+    def _calibrate(self):
+        """Derive the accept threshold from the spread between enrolled samples"""
+        if len(self.templates) < 2:
+            self.threshold = Config.WAKE_WORD_THRESHOLD
+            return
+        spread = max(
+            subsequence_dtw(a, b)
+            for i, a in enumerate(self.templates)
+            for j, b in enumerate(self.templates) if i != j
+        )
+        self.threshold = spread * Config.WAKE_WORD_SENSITIVITY
+
+    def reset(self):
+        """Forget buffered audio, e.g. after a detection"""
+        longest = max((len(t) for t in self.templates), default=100)
+        self._max_frames = int(longest * 1.5)
+        self._features = np.empty((0, self.mfcc.dct.shape[0]), dtype=np.float32)
+        self._energy = np.empty(0, dtype=np.float32)
+        self._pending = np.empty(0, dtype=np.float32)
+        self._since_match = 0
+        # Best match so far while its score is still improving, and the samples heard since it ended
+        self._held = None
+        self._held_score = np.inf
+        self._holds = 0
+        self._max_holds = longest // Config.WAKE_WORD_HOP_FRAMES + 1
+
+    def process(self, pcm, energy_threshold=None, threshold=None):
+        """Feed a chunk of PCM audio, return True when the wake word is spotted.
+
+        `threshold` replaces the calibrated one for this chunk, e.g. a
+        stricter one while the audio also holds Spectra's own voice.
+        """
+        if not self.templates:
+            return False
+        chunk = pcm_to_float(pcm, self.sample_width)
+        if self._held is not None:
+            self._held += len(chunk)
+        samples = np.concatenate([self._pending, chunk])
+        frames = self.mfcc.frames(samples)
+        if not len(frames):
+            self._pending = samples
+            return False
+        # The next frame starts right after the last hop we consumed
+        self._pending = samples[len(frames) * self.mfcc.hop_length:]
+
+        new_features = self.mfcc.features(samples)
+        rms = np.sqrt((frames ** 2).mean(axis=1))
+        self._features = np.concatenate([self._features, new_features])[-self._max_frames:]
+        self._energy = np.concatenate([self._energy, rms])[-self._max_frames:]
+        self._since_match += len(frames)
+
+        if self._since_match < Config.WAKE_WORD_HOP_FRAMES:
+            return False
+        self._since_match = 0
+
+        # Cheap gate: skip matching while the buffer holds nothing louder than the noise floor
+        if energy_threshold is not None and self._held is None:
+            full_scale = float(1 << (8 * self.sample_width - 1))
+            if self._energy.max() * full_scale < energy_threshold:
+                return False
+
+        self.last_score, end = min(subsequence_dtw(t, self._features, with_end=True) for t in self.templates)
+        threshold = self.threshold if threshold is None else threshold
+        if self.last_score <= threshold and self.last_score < self._held_score:
+            # The first match is often just the start of the word warped onto the whole
+            # template; hold it while more of the word keeps improving the score
+            hop, length = self.mfcc.hop_length, self.mfcc.frame_length
+            # The matched span ends with frame `end`; later frames and the pending samples came after it
+            self._held = max(0, (len(self._features) - end) * hop + len(self._pending) - length)
+            self._held_score = self.last_score
+            if self._holds < self._max_holds:
+                self._holds += 1
+                return False
+        elif self._held is None:
+            return False
+        # Accept the best match, now that the score has stopped improving
+        self.last_score = self._held_score
+        self.last_word_end = self._held / float(self.sample_rate)
+        self.reset()
+        return True
@@ -0,0 +1,201 @@
+"""Local stand-in for the Groq chat completions API.
+
+Serves the OpenAI-compatible endpoints CodeGenerator uses, with injected
+latency and errors, so connection pre-warming, hedged requests, timeouts
+and the rate limiter can be exercised without network access or an API key:
+
+    GET  /openai/v1/models
+    POST /openai/v1/chat/completions   (plain and stream=true)
+
+Every completion returns the same canned answer (a fenced hello world,
+or the contents of --answer). A fraction of requests (--slow-rate) is
+delayed by --slow-latency instead of --latency, to produce the long tail
+that hedging is meant to cut. --tokens-per-second paces streamed answers
+like a real model. --error-rate of the completions fail with
+--error-status (a 429 carries retry-after and rate-limit headers), and
+--stream-error-rate of the streams break off halfway.
+
+Usage:
+    python fake_api_server.py [--port 8765] [--latency 0.2] [--slow-rate 0.1] [--slow-latency 5]
+                              [--tokens-per-second 300] [--error-rate 0.05] [--error-status 429]
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=test python main.py
+    API_TRANSPORT=fake python main.py   (runs this server inside the app)
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = "```python\n# Generated by the fake API server\nprint(\"Hello, world!\")\n```"
+
+ERROR_TYPES = {429: "rate_limit_exceeded", 500: "internal_server_error", 503: "service_unavailable"}
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """The HTTP server; settings are attributes so tests can change them between requests"""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8765), latency=0.2, jitter=0.0, slow_rate=0.0,
+                 slow_latency=5.0, answer=DEFAULT_ANSWER, chunk_chars=8, tokens_per_second=0.0,
+                 error_rate=0.0, error_status=500, stream_error_rate=0.0):
+        super().__init__(address, FakeAPIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.answer = answer
+        self.chunk_chars = chunk_chars
+        self.tokens_per_second = tokens_per_second  # 0 = send chunks as fast as possible
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_error_rate = stream_error_rate
+        self.stats = {"requests": 0, "completions": 0, "slow": 0, "errors": 0, "broken_streams": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a background thread, returns self"""
+        threading.Thread(target=self.serve_forever, name="fake-api", daemon=True).start()
+        return self
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def response_delay(self):
+        if self.slow_rate and random.random() < self.slow_rate:
+            self.count("slow")
+            return self.slow_latency
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def inject(self, key, rate):
+        """True for a `rate` fraction of calls, counted under `key`"""
+        if rate and random.random() < rate:
+            self.count(key)
+            return True
+        return False
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count("requests")
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": "llama-3.1-8b-instant", "object": "model"},
+                {"id": "llama-3.1-70b-versatile", "object": "model"},
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_POST(self):
+        self.server.count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        self.server.count("completions")
+        time.sleep(self.server.response_delay())
+        if self.server.inject("errors", self.server.error_rate):
+            status = self.server.error_status
+            headers = {"retry-after": "1", "x-ratelimit-remaining-requests": "0",
+                       "x-ratelimit-reset-requests": "1s"} if status == 429 else None
+            self._send_json(status, {"error": {"message": f"Injected error {status}",
+                                               "type": ERROR_TYPES.get(status, "api_error")}}, headers)
+            return
+
+        model = request.get("model", "fake")
+        answer = self.server.answer
+        usage = {"prompt_tokens": 100, "completion_tokens": max(1, len(answer) // 4),
+                 "total_tokens": 100 + max(1, len(answer) // 4)}
+        created = int(time.time())
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = self.server.chunk_chars
+        pieces = [answer[i:i + step] for i in range(0, len(answer), step)]
+        # A broken stream stops halfway without the closing chunk, like a dropped connection
+        break_at = len(pieces) // 2 if self.server.inject("broken_streams", self.server.stream_error_rate) else None
+        for index, piece in enumerate(pieces):
+            if index == break_at:
+                self.close_connection = True
+                return
+            if self.server.tokens_per_second:
+                time.sleep(max(1, len(piece) // 4) / self.server.tokens_per_second)
+            last = index == len(pieces) - 1
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": "stop" if last else None}]}
+            if last:
+                chunk["x_groq"] = {"id": "req-fake", "usage": usage}
+            self._write_event(json.dumps(chunk))
+        self._write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_event(self, data):
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before a completion starts")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- jitter on --latency")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of completions that are slow")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="delay of the slow completions")
+    parser.add_argument("--answer", help="file whose contents are returned as every completion")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="pace of streamed answers, 0 = no limit")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of the failed completions")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="fraction of streams cut off halfway")
+    args = parser.parse_args()
+
+    answer = DEFAULT_ANSWER
+    if args.answer:
+        with open(args.answer, encoding="utf-8") as f:
+            answer = f.read()
+    server = FakeAPIServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                           slow_rate=args.slow_rate, slow_latency=args.slow_latency, answer=answer,
+                           tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+                           error_status=args.error_status, stream_error_rate=args.stream_error_rate)
+    print(f"Fake API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served: {server.stats}")
+
+if __name__ == "__main__":
+    main()
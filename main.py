@@ -9,13 +9,38 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config.settings import Config
 from core.voice_input import VoiceInput
+from core.audio_worker import AudioWorkerClient
 from core.voice_output import VoiceOutput
 from core.code_generator import CodeGenerator
 from core.file_manager import FileManager
+from core.project_generator import ProjectGenerator
+from core.code_blocks import file_language
+from core.code_editor import CodeEditor
 from core.ide_controller import IDEController
 from core.command_parser import CommandParser
 from ui.orb_ui import AnimatedOrb
 
+# Fixed phrases, rendered ahead of time so acknowledgements play without a network round trip
+STATIC_PHRASES = (
+    "Spectra activated. Waiting for your command.",
+    "Yes, Tony?",
+    "Let's try that again.",
+    "Generating code now.",
+    "Updating the code now.",
+    "I couldn't apply that change.",
+    "Code updated.",
+    "I couldn't reach the code service, so I used an offline template.",
+    "The code service is busy, so I used an offline template.",
+    "Opening Visual Studio Code.",
+    "Running the program now.",
+    "There was an error running the program.",
+    "Code generated successfully.",
+    "Opening YouTube",
+    "Opening ChatGPT",
+    "Opening Google",
+    "Opening GitHub",
+)
+
 def check_pyaudio():
     try:
         import pyaudio
@@ -33,17 +58,33 @@ class Spectra:
                 "PyAudio is not installed.\nPlease install it with:\n\npip install pyaudio")
             sys.exit(1)
         
-        self.voice_input = VoiceInput()
         self.voice_output = VoiceOutput()
+        self.voice_output.prewarm(STATIC_PHRASES)
+        # Share playback state so Spectra does not transcribe its own voice
+        if Config.AUDIO_WORKER_PROCESS:
+            self.voice_input = AudioWorkerClient(playback=self.voice_output.playback)
+        else:
+            self.voice_input = VoiceInput(playback=self.voice_output.playback)
         self.code_gen = CodeGenerator()
         self.file_mgr = FileManager()
         self.ide_ctrl = IDEController()
         self.parser = CommandParser()
+        self.project_gen = ProjectGenerator(self.code_gen, self.file_mgr)
+        self.editor = CodeEditor(self.code_gen, self.file_mgr.session)
+        # Open the editor as soon as code starts arriving
+        self._editor_project = None
+        self._editor_opened = False
+        self.code_gen.listeners.append(self._on_generation_progress)
         
         # Create UI
         self.app = QApplication(sys.argv)
         self.orb = AnimatedOrb()
         self.orb.show()
+        # Show when the API is down and commands are answered from offline templates
+        self.orb.set_api_state(self.code_gen.breaker.state)
+        self.code_gen.breaker.listeners.append(lambda old, new, reason: self.orb.set_api_state(new))
+        # Pulse with the user's voice while listening for a command
+        self.orb.level_source = self.voice_input.input_level
         
     def run(self):
         """Main execution loop"""
@@ -55,20 +96,32 @@ class Spectra:
         wake_word_thread.daemon = True
         wake_word_thread.start()
         
-        sys.exit(self.app.exec_())
+        exit_code = self.app.exec_()
+        self.voice_input.close()
+        sys.exit(exit_code)
     
     def _wake_word_listener(self):
         """Listen for wake word in background thread"""
         while True:
             if self.voice_input.listen_for_wake_word():
-                # Wake word detected
+                # Wake word detected: the user is barging in, stop talking
+                self.voice_output.cancel()
                 self.orb.set_listening_state(True)
                 self._process_command()
                 self.orb.set_listening_state(False)
+            elif self.voice_input.error:
+                print(f"[Spectra] Voice input unavailable: {self.voice_input.error}")
+                self.voice_output.speak("I can't hear you, no microphone is available.")
+                return
     
     def _process_command(self):
         """Process user command after wake word"""
-        self.voice_output.speak("Yes, Tony?")
+        # Let the acknowledgement finish before capturing the command
+        ack = self.voice_output.speak("Yes, Tony?", VoiceOutput.PRIORITY_HIGH)
+        try:
+            ack.result(timeout=Config.SPEECH_ACK_TIMEOUT)
+        except Exception:
+            pass
         command = self.voice_input.get_audio_input()
         
         if not command or "sorry" in command.lower() or "error" in command.lower():
@@ -82,33 +135,54 @@ class Spectra:
             return
             
         # Parse command
-        parsed = self.parser.parse_command(command)
-        
-        # Generate code
-        self.voice_output.speak("Generating code now.")
-        code = self.code_gen.generate_code(command, parsed["language"])
+        parsed = self.parser.parse_command(command, self.file_mgr.session)
         
-        if code.startswith("⚠️") or code.startswith("Error") or "groq" in code.lower():
-            self.voice_output.speak("I encountered an error generating the code. Please check your API key.")
-            print(f"Code generation error: {code}")
+        # Follow-ups like "add a reset button to it" patch the last project in place
+        if parsed.get("follow_up") and self.file_mgr.session.active:
+            self._edit_project(command)
             return
         
-        # Create file
-        filepath, project_path = self.file_mgr.create_file(
-            code, parsed["language"], parsed["project_name"]
-        )
+        # Generate code, announcing it while the request is already in flight,
+        # and stream it into the project as it arrives
+        self.voice_output.speak("Generating code now.", VoiceOutput.PRIORITY_LOW)
+        # "regenerate" asks for a fresh answer instead of the cached one
+        regenerate = "regenerate" in command.lower()
+        self._editor_opened = False
+        project_path = self.file_mgr.create_project(parsed["project_name"])
+        if not parsed["language_named"]:
+            # "make a todo app with react": frameworks, or else the model, decide the language
+            parsed["language"] = self.code_gen.detect_language(command)
+        generated = None
+        if parsed.get("multi_file"):
+            generated = self._generate_project(command, parsed["language"], project_path, regenerate)
+        if generated is None:
+            generated = self._generate_single(command, parsed["language"], project_path, regenerate)
+        filepath, language = generated
         
-        # Open VS Code
-        self.voice_output.speak("Opening Visual Studio Code.")
-        self.ide_ctrl.open_vscode(project_path)
+        if self.code_gen.last_source == "fallback":
+            # The file holds an offline template instead of generated code
+            if self.code_gen.rate_limited:
+                self.voice_output.speak("The code service is busy, so I used an offline template.",
+                                        VoiceOutput.PRIORITY_HIGH)
+            else:
+                self.voice_output.speak("I couldn't reach the code service, so I used an offline template.",
+                                        VoiceOutput.PRIORITY_HIGH)
+        
+        # Open VS Code, unless it was already opened when the first tokens arrived
+        if not self._editor_opened:
+            self.voice_output.speak("Opening Visual Studio Code.", VoiceOutput.PRIORITY_LOW)
+            self.ide_ctrl.open_vscode(project_path)
         
-        # Run code if it's executable
-        if parsed["language"] in ["python", "javascript"]:
-            self.voice_output.speak("Running the program now.")
-            stdout, stderr = self.ide_ctrl.run_code(filepath, parsed["language"])
+        self._run_and_report(filepath, language, "Code generated successfully.")
+    
+    def _run_and_report(self, filepath, language, done_message):
+        """Run code if it's executable and speak the outcome"""
+        if language in ["python", "javascript"]:
+            self.voice_output.speak("Running the program now.", VoiceOutput.PRIORITY_LOW)
+            stdout, stderr = self.ide_ctrl.run_code(filepath, language)
             
             if stderr:
-                self.voice_output.speak("There was an error running the program.")
+                self.voice_output.speak("There was an error running the program.", VoiceOutput.PRIORITY_HIGH)
                 print(f"Error: {stderr}")
             else:
                 output_msg = stdout if stdout else "Program executed successfully."
@@ -117,7 +191,51 @@ class Spectra:
                     output_msg = output_msg[:100] + "..."
                 self.voice_output.speak(f"Program output: {output_msg}")
         else:
-            self.voice_output.speak("Code generated successfully.")
+            self.voice_output.speak(done_message)
+    
+    def _edit_project(self, command):
+        """Apply a follow-up command to the files written last"""
+        self.voice_output.speak("Updating the code now.", VoiceOutput.PRIORITY_LOW)
+        changed = self.editor.edit(command)
+        if not changed:
+            self.voice_output.speak("I couldn't apply that change.", VoiceOutput.PRIORITY_HIGH)
+            return
+        entry = self.file_mgr.session.entry
+        self._run_and_report(entry, file_language(entry), "Code updated.")
+    
+    def _generate_single(self, command, language, project_path, regenerate):
+        """Stream one file into the project, returns (filepath, language)"""
+        target = self.file_mgr.open_stream(language, os.path.basename(project_path))
+        self._editor_project = project_path
+        try:
+            self.code_gen.generate_code_stream(command, language, sink=target, regenerate=regenerate)
+        finally:
+            self._editor_project = None
+            filepath, _ = target.close()
+        return filepath, language
+    
+    def _generate_project(self, command, language, project_path, regenerate):
+        """Plan and generate a multi-file project, returns (entry filepath, language) or None"""
+        self._editor_project = project_path
+        try:
+            files = self.project_gen.generate(command, language, project_path, regenerate=regenerate)
+        finally:
+            self._editor_project = None
+        if not files:
+            print("[Project] No manifest, generating a single file instead")
+            return None
+        entry = next((f for f in files if f["entry"]), files[0])
+        self.file_mgr.session.set_entry(entry["filepath"])
+        self.voice_output.speak(f"Created {len(files)} files.", VoiceOutput.PRIORITY_LOW)
+        return entry["filepath"], entry["language"]
+    
+    def _on_generation_progress(self, event, data):
+        """Code generation progress: open the project being written once code starts flowing"""
+        project_path = self._editor_project
+        if event == "first_token" and project_path is not None and not self._editor_opened:
+            self._editor_opened = True
+            self.voice_output.speak("Opening Visual Studio Code.", VoiceOutput.PRIORITY_LOW)
+            self.ide_ctrl.open_vscode(project_path)
     
     def _handle_website_commands(self, command):
         """Handle website opening commands"""
@@ -146,5 +264,10 @@ class Spectra:
         return False
 
 if __name__ == "__main__":
+    if "--enroll" in sys.argv:
+        # Record samples of the wake word for the local spotter, then exit
+        VoiceInput().enroll_wake_word()
+        sys.exit(0)
+    
     spectra = Spectra()
     spectra.run()
\ No newline at end of file
@@ -1 +1,190 @@
-zz
\ No newline at end of file
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import httpx
+from config.settings import Config
+from core import api_client
+from core.code_generator import CodeGenerator
+from core.file_manager import FileManager
+from fake_api_server import FakeAPIServer
+
+def sse_body(text, finish_reason="stop", chunk_chars=7, usage=None):
+    """A streamed completion of `text`, the way the API sends it"""
+    pieces = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+    events = []
+    for index, piece in enumerate(pieces):
+        last = index == len(pieces) - 1
+        chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "test",
+                 "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": finish_reason if last else None}]}
+        if last and usage:
+            chunk["x_groq"] = {"id": "req-test", "usage": usage}
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode("utf-8")
+
+class ScriptedAPI:
+    """httpx transport answering completions with `answers`, (text, finish_reason) in order"""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def handle(self, request):
+        if request.method == "GET":
+            return httpx.Response(200, json={"object": "list", "data": []})
+        body = json.loads(request.read())
+        self.requests.append(body)
+        text, finish_reason = self.answers.pop(0)
+        usage = {"prompt_tokens": 100, "completion_tokens": len(text or "") // 4, "total_tokens": 100 + len(text or "") // 4}
+        if body.get("stream"):
+            return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                  content=sse_body(text, finish_reason, usage=usage))
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+class RecordingSink:
+    """Stand-in for a StreamingFile that remembers what it was given"""
+
+    def __init__(self):
+        self.writes = []
+        self.blocks = []
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def reset(self):
+        self.writes = []
+
+    def add_block(self, block):
+        self.blocks.append(block)
+
+    @property
+    def text(self):
+        return "".join(self.writes)
+
+class APITestCase(unittest.TestCase):
+    """Runs against a local API: no key, no cache, no warm-up, hedging or rate limiting"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        settings = {
+            "GROQ_API_KEY": "test", "API_TRANSPORT": "live", "API_PREWARM": False, "API_HEDGE": False,
+            "GENERATION_CACHE": False, "RATE_LIMIT_TPM": 1000000, "RATE_LIMIT_RPM": 1000,
+            "CODE_DIRECTORY": os.path.join(self.tmp, "generated_code"),
+        }
+        for name, value in settings.items():
+            patcher = mock.patch.object(Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def scripted(self, *answers):
+        """CodeGenerator whose requests are answered by a ScriptedAPI"""
+        api = ScriptedAPI(answers)
+        with mock.patch.object(api_client, "make_transport", return_value=httpx.MockTransport(api.handle)):
+            generator = CodeGenerator()
+        return generator, api
+
+class StreamingGenerationTest(APITestCase):
+    def test_code_is_streamed_to_the_sink(self):
+        generator, api = self.scripted(("Here you go:\n```python\nfor i in range(3):\n    print(i)\n```\nDone.", "stop"))
+        sink = RecordingSink()
+        code = generator.generate_code_stream("print the numbers 0 to 2", "python", sink=sink)
+        self.assertEqual(code, "for i in range(3):\n    print(i)")
+        self.assertEqual(sink.text.strip(), code)
+        self.assertGreater(len(sink.writes), 1)
+        self.assertEqual(generator.last_source, "api")
+        self.assertTrue(api.requests[0]["stream"])
+
+    def test_cut_off_answer_is_continued(self):
+        generator, api = self.scripted(
+            ("```python\ndef add(a, b):\n    return a + b\n\ndef sub(a, b):\n    ret", "length"),
+            # Models restart a little before the cut; the repeated line is dropped
+            ("```python\ndef sub(a, b):\n    return a - b\n```", "stop"),
+        )
+        sink = RecordingSink()
+        code = generator.generate_code_stream("write add and sub functions", "python", sink=sink)
+        self.assertEqual(code, "def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b")
+        self.assertEqual(sink.text.strip(), code)
+        self.assertEqual(len(api.requests), 2)
+        self.assertIn("def sub(a, b):", api.requests[1]["messages"][-2]["content"])  # the tail to continue
+        self.assertEqual(generator.last_usage["continuations"], 1)
+
+    def test_extra_blocks_are_written_to_their_own_files(self):
+        answer = ("A counter page.\n\n```html\n<button id=\"b\">0</button>\n<script src=\"app.js\"></script>\n```\n\n"
+                  "**style.css**\n```css\nbutton { font-size: 2em; }\n```\n\n"
+                  "```javascript\n// app.js\ndocument.getElementById('b').onclick = e => e.target.textContent++;\n```\n")
+        generator, _ = self.scripted((answer, "stop"))
+        sink = FileManager().open_stream("html", "counter")
+        code = generator.generate_code_stream("make a counter web page", "html", sink=sink)
+        filepath, project_path = sink.close()
+        self.assertTrue(code.startswith("<button"))
+        self.assertEqual([os.path.basename(path) for path in sink.extra_files], ["style.css", "app.js"])
+        self.assertEqual(sorted(os.listdir(project_path)), ["app.js", "index.html", "style.css"])
+        with open(os.path.join(project_path, "style.css"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "button { font-size: 2em; }\n")
+        with open(filepath, encoding="utf-8") as f:
+            self.assertNotIn("font-size", f.read())
+
+class LanguageDetectionTest(APITestCase):
+    def test_model_is_asked_before_any_request_succeeded(self):
+        generator, api = self.scripted(("javascript", "stop"))
+        self.assertIsNone(generator.api_working)
+        self.assertEqual(generator.detect_language("make a countdown timer"), "javascript")
+        self.assertEqual(api.requests[0]["model"], generator.router.smallest)
+
+    def test_model_is_asked_after_a_failure(self):
+        generator, api = self.scripted(("Bash", "stop"))
+        generator.api_working = False
+        self.assertEqual(generator.detect_language("list the biggest files here"), "bash")
+        self.assertEqual(len(api.requests), 1)
+
+    def test_empty_answer_is_not_an_api_failure(self):
+        generator, _ = self.scripted((None, "stop"))
+        self.assertEqual(generator.detect_language("make a countdown timer"), "python")
+        self.assertEqual(generator.breaker.stats["failures"], 0)
+
+class RecordReplayTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = FakeAPIServer(("127.0.0.1", 0), latency=0.0,
+                                    answer="```python\nprint('recorded')\n```").start()
+        self.addCleanup(self.server.server_close)
+        for name, value in (("GROQ_BASE_URL", self.server.base_url),
+                            ("API_CASSETTE", os.path.join(self.tmp, "cassette.jsonl.gz")),
+                            ("API_REPLAY_TIMING", 0)):
+            patcher = mock.patch.object(Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_recorded_answers_replay_without_the_api(self):
+        Config.API_TRANSPORT = "record"
+        recorder = CodeGenerator()
+        streamed = recorder.generate_code_stream("print recorded", "python", sink=RecordingSink())
+        whole = recorder.generate_code("print recorded twice", "python")
+        self.assertEqual((streamed, whole), ("print('recorded')", "print('recorded')"))
+        self.server.shutdown()
+        served = self.server.stats["completions"]
+
+        Config.API_TRANSPORT = "replay"
+        Config.GROQ_API_KEY = ""
+        player = CodeGenerator()
+        sink = RecordingSink()
+        self.assertEqual(player.generate_code_stream("print recorded", "python", sink=sink), streamed)
+        self.assertEqual(sink.text.strip(), streamed)
+        self.assertEqual(player.generate_code("print recorded twice", "python"), whole)
+        self.assertEqual(player.last_source, "api")
+        self.assertEqual(self.server.stats["completions"], served)
+
+        # Something never recorded falls back like any other API failure
+        player.generate_code("print something new", "python")
+        self.assertEqual(player.last_source, "fallback")
+
+if __name__ == "__main__":
+    unittest.main()
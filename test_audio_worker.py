@@ -0,0 +1,110 @@
+import os
+import time
+import queue
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from config.settings import Config
+from core import audio_worker
+from core.audio_worker import SharedFrameRing, AudioWorkerClient, _follow_commands
+
+def tone_chunk(chunk, amplitude):
+    t = np.arange(chunk) / 16000
+    return (np.sin(2 * np.pi * 440 * t) * amplitude * 32767).astype("<i2").tobytes()
+
+def fake_worker(events, commands, device_index=None):
+    """Stands in for audio_worker_main: reports a 16 kHz stream, then fills the ring it is given"""
+    events.put(("ready", os.getpid(), 16000, 2, 160))
+    message = commands.get(timeout=10)
+    ring = SharedFrameRing.attach(message[1])
+    try:
+        for _ in range(20):
+            ring.write(tone_chunk(160, 0.5))
+        while True:
+            try:
+                if commands.get(timeout=0.05)[0] == "stop":
+                    return
+            except queue.Empty:
+                ring.write(tone_chunk(160, 0.5))
+    finally:
+        ring.close()
+
+def failing_worker(events, commands, device_index=None):
+    events.put(("error", "no microphone available"))
+
+def wait_for(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+class SharedFrameRingTest(unittest.TestCase):
+    def test_ring_is_sized_from_the_stream_format(self):
+        ring = SharedFrameRing.create(16000, 2, 1024, seconds=2)
+        self.addCleanup(ring.close)
+        self.assertEqual(ring.slots, 32)
+        self.assertEqual(ring.chunk_bytes, 2048)
+        self.assertEqual((ring.sample_rate, ring.sample_width), (16000, 2))
+
+    def test_reader_sees_the_writer_without_copies(self):
+        ring = SharedFrameRing.create(16000, 2, 4, seconds=0.001)  # 4 slots of 4 samples
+        self.addCleanup(ring.close)
+        reader = SharedFrameRing.attach(ring.name)
+        for n in range(6):
+            ring.write(bytes([n]) * 8)
+        start, views = reader.read(0)
+        # The two oldest chunks were overwritten, the current head slot is never handed out
+        self.assertEqual(start, 3)
+        self.assertEqual([bytes(view) for view in views], [bytes([n]) * 8 for n in (3, 4, 5)])
+        for view in views:
+            view.release()
+        reader.close()
+
+class FollowCommandsTest(unittest.TestCase):
+    def test_ring_sent_to_an_earlier_worker_is_ignored(self):
+        commands = queue.Queue()
+        stop = threading.Event()
+        attached = []
+        commands.put(("ring", "psm_old", os.getpid() + 1))
+        commands.put(("ring", "psm_new", os.getpid()))
+        commands.put(("stop",))
+        _follow_commands(commands, playback=None, stop=stop, on_ring=attached.append)
+        self.assertEqual(attached, ["psm_new"])
+
+class AudioWorkerClientTest(unittest.TestCase):
+    def setUp(self):
+        settings = {"AUDIO_WORKER_RESTART_DELAY": 0.05, "AUDIO_WORKER_MAX_RESTART_DELAY": 0.2,
+                    "AUDIO_WORKER_MAX_RESTARTS": 2, "AUDIO_BUFFER_SECONDS": 1.0}
+        for name, value in settings.items():
+            patcher = mock.patch.object(Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def client(self, worker):
+        # Kept patched for the whole test, restarts by the supervisor use it too
+        patcher = mock.patch.object(audio_worker, "audio_worker_main", worker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = AudioWorkerClient()
+        self.addCleanup(client.close)
+        return client
+
+    def test_input_level_is_read_from_the_ring(self):
+        client = self.client(fake_worker)
+        wait_for(lambda: client.ring is not None)
+        self.assertEqual(client.ring.slots, 100)  # 1 s of 160-sample chunks at 16 kHz
+        client.input_level()
+        wait_for(lambda: client.input_level() > 0.3)
+
+    def test_missing_microphone_backs_off_then_gives_up(self):
+        client = self.client(failing_worker)
+        self.assertFalse(client.listen_for_wake_word(timeout=30))
+        self.assertIn("no microphone available", client.error)
+        self.assertEqual(client.restarts, 2)
+        self.assertEqual(client.get_audio_input(), "Error: No microphone available.")
+        self.assertFalse(client.listen_for_wake_word(timeout=30))
+
+if __name__ == "__main__":
+    unittest.main()
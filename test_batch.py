@@ -0,0 +1,26 @@
+import unittest
+from batch_generate import BatchRunner
+
+class ProjectNameTest(unittest.TestCase):
+    def setUp(self):
+        self.runner = BatchRunner(code_gen=None, file_mgr=None, concurrency=2)
+
+    def name(self, item_id, prompt, project_name=None):
+        item = {"id": item_id, "prompt": prompt, "language": "python", "project_name": project_name}
+        return self.runner._project_name(item, self.runner.parser.parse_command(prompt))
+
+    def test_items_with_the_same_name_get_their_own_directories(self):
+        names = {self.name("1", "write a todo api", "todo_api"), self.name("2", "write a todo api", "todo_api")}
+        self.assertEqual(names, {"todo_api_1", "todo_api_2"})
+
+    def test_parsed_names_are_kept_apart_too(self):
+        first = self.name("a", "create a python script named scraper")
+        second = self.name("b", "create a python script named scraper")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("scraper"))
+
+    def test_unnamed_items_are_named_after_their_id(self):
+        self.assertEqual(self.name("line-3", "print hello world"), "batch_line-3")
+
+if __name__ == "__main__":
+    unittest.main()
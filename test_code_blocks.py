@@ -0,0 +1,93 @@
+import unittest
+from core.code_blocks import CodeBlockExtractor, join_blocks, split_blocks, file_language
+
+def extract(text, step=5, **kwargs):
+    """Feed `text` in `step`-character pieces, like a stream; returns (primary code, extractor)"""
+    extractor = CodeBlockExtractor(**kwargs)
+    code = "".join(extractor.feed(text[i:i + step]) for i in range(0, len(text), step))
+    return code + extractor.flush(), extractor
+
+class CodeBlockExtractorTest(unittest.TestCase):
+    def test_preamble_and_chatter_are_dropped(self):
+        code, extractor = extract("Here is the code:\n```python\nprint('hi')\n```\nIt prints hi.\n")
+        self.assertEqual(code, "print('hi')\n")
+        self.assertEqual(len(extractor.blocks), 1)
+        self.assertEqual(extractor.blocks[0]["language"], "python")
+        self.assertFalse(extractor.primary_open)
+
+    def test_unfenced_answer_is_all_code(self):
+        code, extractor = extract("x = 1\ny = 2\n")
+        self.assertEqual(code, "x = 1\ny = 2\n")
+        self.assertTrue(extractor.blocks[0]["primary"])
+
+    def test_long_unfenced_answer_streams_after_the_preamble_window(self):
+        lines = "".join(f"line{i} = {i}\n" for i in range(8))
+        extractor = CodeBlockExtractor()
+        self.assertEqual(extractor.feed(lines[:20]), "")
+        self.assertEqual(extractor.feed(lines[20:]) + extractor.flush(), lines)
+
+    def test_filename_hints(self):
+        answer = ("```html title=\"index.html\"\n<p>hi</p>\n```\n"
+                  "**style.css**\n```css\np { color: red; }\n```\n"
+                  "```\n// app.js\nconsole.log(1);\n```\n"
+                  "```py\nprint(1)\n```\n")
+        _, extractor = extract(answer)
+        names = [(block["filename"], block["language"]) for block in extractor.blocks]
+        self.assertEqual(names, [("index.html", "html"), ("style.css", "css"), ("app.js", "javascript"),
+                                 (None, "python")])
+        self.assertEqual([block["primary"] for block in extractor.blocks], [True, False, False, False])
+
+    def test_blocks_are_reported_as_their_fences_close(self):
+        seen = []
+        extractor = CodeBlockExtractor(on_block=lambda block: seen.append(block["language"]))
+        extractor.feed("```html\n<p></p>\n```\n```css\np {}\n")
+        self.assertEqual(seen, ["html"])
+        extractor.feed("```\n")
+        self.assertEqual(seen, ["html", "css"])
+
+    def test_missing_closing_fence_starts_the_next_block(self):
+        code, extractor = extract("```html\n<p></p>\n```css\np {}\n```\n")
+        self.assertEqual(code, "<p></p>\n")
+        self.assertEqual([block["language"] for block in extractor.blocks], ["html", "css"])
+
+    def test_cut_off_answer(self):
+        extractor = CodeBlockExtractor()
+        code = extractor.feed("```python\ndef f():\n    ret")
+        self.assertTrue(extractor.primary_open)
+        code += extractor.flush(keep_partial=False)
+        self.assertEqual(code, "def f():\n")
+        self.assertTrue(extractor.blocks[0]["complete"])
+
+    def test_cut_off_later_block_is_incomplete(self):
+        extractor = CodeBlockExtractor()
+        extractor.feed("```html\n<p></p>\n```\n```css\np { col")
+        self.assertFalse(extractor.primary_open)
+        extractor.flush(keep_partial=False)
+        self.assertFalse(extractor.blocks[1]["complete"])
+
+    def test_resume_skips_a_reopened_fence(self):
+        code, _ = extract("```python\n    return 1\n```\n", resume=True)
+        self.assertEqual(code, "    return 1\n")
+        code, _ = extract("    return 1\n", resume=True)
+        self.assertEqual(code, "    return 1\n")
+
+class BlockTextTest(unittest.TestCase):
+    def test_join_and_split_round_trip(self):
+        _, extractor = extract("```html\n<p></p>\n```\n**style.css**\n```css\np {}\n```\n")
+        text = join_blocks("<p></p>", extractor.blocks)
+        code, blocks = split_blocks(text)
+        self.assertEqual(code, "<p></p>")
+        self.assertEqual([(block["language"], block["filename"], block["code"]) for block in blocks],
+                         [("css", "style.css", "p {}")])
+
+    def test_single_block_joins_to_plain_code(self):
+        self.assertEqual(join_blocks("print(1)", []), "print(1)")
+        self.assertEqual(split_blocks("print(1)"), ("print(1)", []))
+
+    def test_file_language(self):
+        self.assertEqual(file_language("src/App.JSX"), "javascript")
+        self.assertEqual(file_language("notes"), "text")
+        self.assertIsNone(file_language("data.xyz", None))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from core.code_editor import apply_block, parse_patch
+
+class ApplyBlockTest(unittest.TestCase):
+    CONTENT = "def f():\n    return 1\n\ndef g():\n    return 2\n"
+
+    def test_exact_match_is_replaced(self):
+        self.assertEqual(apply_block(self.CONTENT, "    return 2\n", "    return 3\n"),
+                         "def f():\n    return 1\n\ndef g():\n    return 3\n")
+
+    def test_ambiguous_search_is_refused(self):
+        self.assertIsNone(apply_block("x = 1\nx = 1\n", "x = 1\n", "x = 2\n"))
+
+    def test_missing_search_is_refused(self):
+        self.assertIsNone(apply_block(self.CONTENT, "return 4", "return 5"))
+
+    def test_whitespace_differences_are_tolerated(self):
+        edited = apply_block(self.CONTENT, "def g():\n  return 2  \n", "def g():\n    return 22\n")
+        self.assertEqual(edited, "def f():\n    return 1\n\ndef g():\n    return 22\n")
+
+    def test_empty_search_appends(self):
+        self.assertEqual(apply_block("a = 1\n", "", "b = 2\n"), "a = 1\n\nb = 2\n")
+        self.assertEqual(apply_block("", "", "b = 2\n"), "b = 2\n")
+
+class ParsePatchTest(unittest.TestCase):
+    def test_blocks_are_read_with_their_paths(self):
+        reply = ("main.py\n<<<<<<< SEARCH\n    return 1\n=======\n    return 2\n>>>>>>> REPLACE\n\n"
+                 "`util.py`\n<<<<<<< SEARCH\n=======\nX = 1\n>>>>>>> REPLACE\n")
+        self.assertEqual(parse_patch(reply), [("main.py", "    return 1", "    return 2"),
+                                              ("util.py", "", "X = 1")])
+
+if __name__ == "__main__":
+    unittest.main()
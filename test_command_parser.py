@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+from core.command_parser import CommandParser
+from core.session_context import SessionContext
+
+def parse(command, session=None):
+    return CommandParser.parse_command(command, session)
+
+class MultiFileTest(unittest.TestCase):
+    def test_script_that_mentions_another_language_is_one_file(self):
+        parsed = parse("write a python script that generates html reports")
+        self.assertFalse(parsed["multi_file"])
+        self.assertEqual(parsed["language"], "python")
+
+    def test_languages_asked_for_together_make_a_project(self):
+        for command in ("make a login form in html and css",
+                        "create a web page with html, css and javascript",
+                        "build an html page with a css file",
+                        "write a python and html app for notes"):
+            with self.subTest(command=command):
+                self.assertTrue(parse(command)["multi_file"])
+
+    def test_project_words_make_a_project(self):
+        self.assertTrue(parse("build a todo app with a frontend and a backend")["multi_file"])
+        self.assertFalse(parse("write a python function that sorts a list")["multi_file"])
+
+class FollowUpTest(unittest.TestCase):
+    def session_with(self, *names):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        session = SessionContext()
+        for name in names:
+            path = os.path.join(tmp, name)
+            with open(path, "w") as f:
+                f.write("")
+            session.record_file(path, tmp)
+        return session
+
+    def test_pronoun_with_nothing_written_is_a_new_request(self):
+        self.assertFalse(parse("fix that bug in the login page", SessionContext())["follow_up"])
+        self.assertFalse(parse("fix that bug in the login page")["follow_up"])
+
+    def test_pronoun_refers_to_the_last_files(self):
+        session = self.session_with("index.html")
+        self.assertTrue(parse("fix that bug in the login page", session)["follow_up"])
+        self.assertTrue(parse("add a reset button to it", session)["follow_up"])
+
+    def test_naming_a_written_file_is_a_follow_up(self):
+        session = self.session_with("main.py", "utils.py")
+        self.assertTrue(parse("rename the helpers in utils.py", session)["follow_up"])
+        self.assertFalse(parse("add the numbers from one to ten", session)["follow_up"])
+
+if __name__ == "__main__":
+    unittest.main()
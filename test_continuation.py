@@ -0,0 +1,49 @@
+import unittest
+from core.continuation import OverlapTrimmer, code_tail
+
+def trim(tail, text, step=4):
+    trimmer = OverlapTrimmer(tail)
+    out = "".join(trimmer.feed(text[i:i + step]) for i in range(0, len(text), step))
+    return out + trimmer.flush(), trimmer
+
+class OverlapTrimmerTest(unittest.TestCase):
+    TAIL = "def add(a, b):\n    return a + b\n\ndef sub(a, b):\n"
+
+    def test_repeated_lines_are_dropped(self):
+        out, trimmer = trim(self.TAIL, "def sub(a, b):\n    return a - b\n")
+        self.assertEqual(out, "    return a - b\n")
+        self.assertEqual(trimmer.trimmed_lines, 1)
+
+    def test_longest_repeat_wins(self):
+        out, trimmer = trim(self.TAIL, "    return a + b\n\ndef sub(a, b):\n    return a - b\n")
+        self.assertEqual(out, "    return a - b\n")
+        self.assertEqual(trimmer.trimmed_lines, 3)
+
+    def test_indentation_differences_still_match(self):
+        out, _ = trim(self.TAIL, "  def sub(a, b):\n    return a - b\n")
+        self.assertEqual(out, "    return a - b\n")
+
+    def test_new_code_passes_through(self):
+        out, trimmer = trim(self.TAIL, "    return a - b\n")
+        self.assertEqual(out, "    return a - b\n")
+        self.assertEqual(trimmer.trimmed_lines, 0)
+
+    def test_short_coincidental_match_is_kept(self):
+        out, _ = trim("if x:\n    y()\n}\n", "}\nz()\n")
+        self.assertEqual(out, "}\nz()\n")
+
+    def test_text_passes_straight_through_once_checked(self):
+        trimmer = OverlapTrimmer(self.TAIL)
+        body = "".join(f"x{i} = {i}\n" for i in range(OverlapTrimmer.WINDOW_LINES))
+        self.assertEqual(trimmer.feed(body), body)
+        self.assertEqual(trimmer.feed("more"), "more")
+        self.assertEqual(trimmer.flush(), "")
+
+class CodeTailTest(unittest.TestCase):
+    def test_tail_keeps_whole_lines(self):
+        code = "first line\nsecond line\nthird\n"
+        self.assertEqual(code_tail(code, 100), code)
+        self.assertEqual(code_tail(code, 14), "third\n")
+
+if __name__ == "__main__":
+    unittest.main()
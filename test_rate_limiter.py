@@ -0,0 +1,188 @@
+import time
+import threading
+import unittest
+from unittest import mock
+import httpx
+from config.settings import Config
+from core.rate_limiter import RequestScheduler, RateLimitExceeded, TokenBucket, parse_duration
+from core.api_client import HedgedCaller, make_groq_client
+
+class ParseDurationTest(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_duration("2"), 2.0)
+        self.assertAlmostEqual(parse_duration("2m59.56s"), 179.56)
+        self.assertAlmostEqual(parse_duration("120ms"), 0.12)
+        self.assertIsNone(parse_duration("soon"))
+        self.assertIsNone(parse_duration(None))
+
+class TokenBucketTest(unittest.TestCase):
+    def test_refills_over_time(self):
+        bucket = TokenBucket(60)
+        now = time.monotonic()
+        bucket.take(60, now)
+        self.assertAlmostEqual(bucket.delay(2, now), 2.0, places=2)
+        self.assertEqual(bucket.delay(2, now + 2.5), 0.0)
+
+    def test_request_larger_than_the_bucket_waits_for_a_full_refill_only(self):
+        bucket = TokenBucket(60)
+        now = time.monotonic()
+        bucket.take(60, now)
+        self.assertAlmostEqual(bucket.delay(600, now), 60.0, places=2)
+
+class RequestSchedulerTest(unittest.TestCase):
+    def test_budget_is_taken(self):
+        scheduler = RequestScheduler(requests_per_minute=10, tokens_per_minute=1000)
+        self.assertLess(scheduler.acquire(tokens=400), 0.1)
+        self.assertAlmostEqual(scheduler.tokens.level, 600, delta=1)
+        self.assertEqual(scheduler.stats["requests"], 1)
+
+    def test_interactive_requests_go_before_queued_batch_work(self):
+        scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=1000000)
+        scheduler.requests.take(600, time.monotonic())  # empty: one request every 0.1 s
+        order = []
+
+        def request(priority, name):
+            scheduler.acquire(priority)
+            order.append(name)
+
+        batch = [threading.Thread(target=request, args=(RequestScheduler.PRIORITY_BATCH, f"batch{i}"))
+                 for i in range(2)]
+        for thread in batch:
+            thread.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=request, args=(RequestScheduler.PRIORITY_INTERACTIVE, "interactive"))
+        interactive.start()
+        for thread in batch + [interactive]:
+            thread.join(timeout=5)
+        self.assertEqual(order[0], "interactive")
+        self.assertEqual(sorted(order[1:]), ["batch0", "batch1"])
+
+    def test_gives_up_after_the_priority_max_wait(self):
+        scheduler = RequestScheduler(requests_per_minute=1, tokens_per_minute=1000000)
+        scheduler.acquire()
+        with mock.patch.object(Config, "RATE_LIMIT_MAX_WAIT", 0.1):
+            with self.assertRaises(RateLimitExceeded):
+                scheduler.acquire()
+        self.assertEqual(scheduler.stats["timeouts"], 1)
+
+    def test_rate_limit_headers_resync_the_budget(self):
+        scheduler = RequestScheduler(requests_per_minute=30, tokens_per_minute=6000)
+        scheduler.observe(httpx.Response(200, headers={"x-ratelimit-remaining-requests": "5",
+                                                       "x-ratelimit-remaining-tokens": "100"}))
+        self.assertAlmostEqual(scheduler.requests.level, 5, delta=0.1)
+        self.assertAlmostEqual(scheduler.tokens.level, 100, delta=1)
+
+    def test_429_holds_the_queue(self):
+        scheduler = RequestScheduler(requests_per_minute=1000, tokens_per_minute=1000000)
+        scheduler.observe(httpx.Response(429, headers={"retry-after": "0.2"}))
+        self.assertGreaterEqual(scheduler.acquire(), 0.15)
+        self.assertEqual(scheduler.stats["rate_limited"], 1)
+
+    def test_run_retries_rate_limit_errors(self):
+        class RateLimitError(Exception):
+            response = httpx.Response(429, headers={"retry-after": "0.05"})
+
+        scheduler = RequestScheduler(requests_per_minute=1000, tokens_per_minute=1000000)
+        calls = []
+
+        def call():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise RateLimitError()
+            return "ok"
+
+        self.assertEqual(scheduler.run(call), "ok")
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.04)
+        with self.assertRaises(ValueError):
+            scheduler.run(lambda: int("x"))
+
+    def test_429_seen_by_the_response_hook_is_held_once(self):
+        response = httpx.Response(429, headers={"retry-after": "0.05"})
+
+        class RateLimitError(Exception):
+            pass
+
+        error = RateLimitError()
+        error.response = response
+        scheduler = RequestScheduler(requests_per_minute=1000, tokens_per_minute=1000000)
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                scheduler.observe(response)  # what the httpx hook does before the SDK raises
+                raise error
+            return "ok"
+
+        self.assertEqual(scheduler.run(call), "ok")
+        self.assertEqual(scheduler.stats["rate_limited"], 1)
+
+    def test_run_retries_server_errors_with_budget_for_each_attempt(self):
+        class InternalServerError(Exception):
+            pass
+
+        scheduler = RequestScheduler(requests_per_minute=1000, tokens_per_minute=1000000)
+        calls = []
+
+        def call():
+            calls.append(1)
+            raise InternalServerError()
+
+        with mock.patch.object(Config, "API_MAX_RETRIES", 1):
+            with self.assertRaises(InternalServerError):
+                scheduler.run(call, tokens=100)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(scheduler.stats["requests"], 2)
+        self.assertEqual(scheduler.stats["retries"], 1)
+
+    def test_try_acquire_never_waits(self):
+        scheduler = RequestScheduler(requests_per_minute=2, tokens_per_minute=1000000)
+        self.assertTrue(scheduler.try_acquire())
+        self.assertTrue(scheduler.try_acquire())
+        self.assertFalse(scheduler.try_acquire())
+        self.assertEqual(scheduler.stats["requests"], 2)
+
+class HedgeBudgetTest(unittest.TestCase):
+    def slow_hedger(self):
+        hedger = HedgedCaller(enabled=True)
+        hedger.samples.extend([0.01] * HedgedCaller.MIN_SAMPLES)
+        return hedger
+
+    def test_hedged_copy_is_charged_to_the_scheduler(self):
+        scheduler = RequestScheduler(requests_per_minute=1000, tokens_per_minute=1000000)
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "ok"
+
+        with mock.patch.object(Config, "API_HEDGE_MIN_DELAY", 0.05):
+            result = scheduler.run(lambda: self.slow_hedger().call(slow, may_hedge=scheduler.try_acquire))
+        self.assertEqual(result, "ok")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(scheduler.stats["requests"], 2)
+
+    def test_no_hedge_without_budget(self):
+        scheduler = RequestScheduler(requests_per_minute=1, tokens_per_minute=1000000)
+        hedger = self.slow_hedger()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "ok"
+
+        with mock.patch.object(Config, "API_HEDGE_MIN_DELAY", 0.05):
+            self.assertEqual(scheduler.run(lambda: hedger.call(slow, may_hedge=scheduler.try_acquire)), "ok")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(hedger.stats["hedges_skipped"], 1)
+
+    def test_sdk_does_not_retry_on_its_own(self):
+        client, http_client = make_groq_client()
+        self.addCleanup(http_client.close)
+        self.assertEqual(client.max_retries, 0)
+
+if __name__ == "__main__":
+    unittest.main()
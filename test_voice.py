@@ -0,0 +1,174 @@
+import os
+import time
+import wave
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from config.settings import Config
+from core.voice_input import VoiceInput
+from core.audio_replay import ReplayMicrophone, StubRecognizer
+from core.echo import PlaybackMonitor
+
+RATE = 16000
+
+def voiced(f0, seconds, formants):
+    """A vowel-like sound: harmonics of f0, louder near the formants"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    out = sum(np.sin(2 * np.pi * f0 * k * t) / k * (1.5 if any(abs(f0 * k - f) < 150 for f in formants) else 0.4)
+              for k in range(1, 12))
+    fade = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.02)
+    return (out * fade / 4).astype(np.float32)
+
+def utterance(parts):
+    return np.concatenate([voiced(f0, seconds, formants) for f0, seconds, formants in parts])
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+# Stand-ins for spoken words: the wake word and a longer command
+WAKE_WORD = utterance([(140, 0.18, (500, 1500)), (210, 0.22, (800, 1100)), (170, 0.2, (350, 2200))])
+COMMAND = utterance([(130 + 15 * (i % 5), 0.17, ((400, 800, 600, 1000, 300)[i % 5], 1500)) for i in range(9)])
+# What Spectra says, and how it reaches the microphone: quieter and 20 ms late
+SPEECH = utterance([(110 + 40 * (i % 3), 0.2, ((450, 1300, 900)[i % 3], 2400)) for i in range(8)])
+
+def echo_of(signal, gain=0.5, delay=0.02):
+    return np.concatenate([silence(delay), signal * gain])
+
+def mix(base, signal, at):
+    """`base` with `signal` added from `at` seconds on"""
+    out = base.copy()
+    start = int(at * RATE)
+    out[start:start + len(signal)] += signal[:len(out) - start]
+    return out
+
+class VoiceReplayTest(unittest.TestCase):
+    """VoiceInput fed from WAV files, with a stub recognizer"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.noise = np.random.default_rng(0)
+        patcher = mock.patch.object(Config, "WAKE_WORD_SAMPLES_DIR", os.path.join(self.tmp, "samples"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wav(self, name, *parts):
+        """Write the parts, with a little room noise, to a 16-bit mono WAV file"""
+        samples = np.concatenate(parts)
+        samples = samples + self.noise.standard_normal(len(samples)).astype(np.float32) * 0.002
+        path = os.path.join(self.tmp, name)
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(RATE)
+            f.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+        return path
+
+    def enroll(self):
+        os.makedirs(Config.WAKE_WORD_SAMPLES_DIR, exist_ok=True)
+        os.rename(self.wav("word.wav", WAKE_WORD), os.path.join(Config.WAKE_WORD_SAMPLES_DIR, "spectra_01.wav"))
+
+    def voice_input(self, path, transcript="", speed=0, **kwargs):
+        recognizer = StubRecognizer(transcript)
+        voice_input = VoiceInput(microphone=ReplayMicrophone(path, speed=speed), recognizer=recognizer, **kwargs)
+        self.addCleanup(voice_input.close)
+        return voice_input, recognizer
+
+    def capture_after_end(self, path, transcript):
+        """Capture a command from the top of the file once the replay has run out"""
+        voice_input, recognizer = self.voice_input(path, transcript)
+        voice_input.open_stream()
+        voice_input.mark_command_start(voice_input.stream.opened_at)
+        while voice_input.stream.is_running():
+            time.sleep(0.01)
+        return voice_input.get_audio_input(), recognizer
+
+    def test_command_is_captured_after_the_recording_ended(self):
+        path = self.wav("command.wav", silence(0.8), COMMAND, silence(1.5))
+        text, recognizer = self.capture_after_end(path, "create a python script")
+        self.assertEqual(text, "create a python script")
+        self.assertEqual(recognizer.calls, 1)
+
+    def test_recording_that_ends_mid_phrase_still_gives_the_phrase(self):
+        path = self.wav("cut.wav", silence(0.8), COMMAND, silence(0.1))
+        text, recognizer = self.capture_after_end(path, "open the file")
+        self.assertEqual(text, "open the file")
+        self.assertGreater(recognizer.audio_seconds, 1.0)
+
+    def start_playback(self, voice_input, playback, reference, at, seconds=None):
+        """Publish `reference` as played from `at` seconds into the replayed file (speed 1 only).
+
+        A None reference stands for an engine that does not expose what it plays.
+        """
+        stream = voice_input.stream
+        voice_input.open_stream()
+        while stream.chunk_time(stream.opened_at) is None:
+            time.sleep(0.005)
+        opened = stream.chunk_time(stream.opened_at) - stream.seconds_per_chunk
+        started = opened + at - voice_input.microphone.opened_at[-1]
+        interval = playback.begin(reference, RATE, start=started)
+        playback.end(interval, at=started + (seconds or len(reference) / RATE))
+
+    def test_command_starts_after_the_wake_word(self):
+        self.enroll()
+        word_end = 0.8 + len(WAKE_WORD) / RATE
+        path = self.wav("wake.wav", silence(0.8), WAKE_WORD, COMMAND, silence(1.0))
+        voice_input, _ = self.voice_input(path)
+        self.assertTrue(voice_input.listen_for_wake_word())
+        stream = voice_input.stream
+        command_start = voice_input.microphone.opened_at[-1] + stream.seconds_since_open(voice_input._command_cursor)
+        # Nothing before the end of the word (one 10 ms MFCC hop of slack)
+        self.assertGreaterEqual(command_start, word_end - 0.01)
+        self.assertLess(command_start, word_end + 0.2)
+
+    def test_command_spoken_over_the_acknowledgement_is_kept(self):
+        # Spectra talks from 0.8 s to 2.4 s; the user starts answering at 1.2 s
+        mic = mix(mix(silence(4.5), echo_of(SPEECH), 0.8), COMMAND, 1.2)
+        path = self.wav("answer.wav", mic)
+        playback = PlaybackMonitor()
+        voice_input, recognizer = self.voice_input(path, "open the file", speed=1, playback=playback)
+        self.start_playback(voice_input, playback, SPEECH, 0.8)
+        voice_input.mark_command_start(voice_input.stream.opened_at)
+        self.assertEqual(Config.ECHO_MODE, "gate")
+        self.assertEqual(voice_input.get_audio_input(), "open the file")
+        self.assertGreater(voice_input.echo_stats["cancelled_chunks"], 0)
+        # The whole answer was heard, not just the part after Spectra stopped
+        self.assertGreater(recognizer.audio_seconds, len(COMMAND) / RATE - 0.1)
+
+    def barge_in(self, spoken, reference, user=WAKE_WORD):
+        """Spectra says `spoken` from 0.8 s while the user says `user` at 1.8 s.
+
+        Returns (detected, seconds into the file of the detection, end of Spectra's speech, VoiceInput).
+        """
+        self.enroll()
+        mic = mix(mix(silence(5.5), echo_of(spoken), 0.8), user, 1.8)
+        playback = PlaybackMonitor()
+        voice_input, _ = self.voice_input(self.wav("barge_in.wav", mic), speed=1, playback=playback)
+        self.start_playback(voice_input, playback, reference, 0.8, len(spoken) / RATE)
+        detected = voice_input.listen_for_wake_word(timeout=4)
+        detected_at = voice_input.microphone.opened_at[-1] + voice_input.last_wake_at if detected else None
+        return detected, detected_at, 0.8 + len(spoken) / RATE, voice_input
+
+    def test_wake_word_interrupts_speech(self):
+        speech = np.tile(SPEECH, 2)
+        detected, detected_at, speech_end, voice_input = self.barge_in(speech, speech)
+        self.assertTrue(detected)
+        self.assertLess(detected_at, speech_end - 1.0)
+        self.assertGreater(voice_input.echo_stats["cancelled_chunks"], 0)
+
+    def test_wake_word_interrupts_speech_that_cannot_be_cancelled(self):
+        speech = np.tile(SPEECH, 2)
+        detected, detected_at, speech_end, _ = self.barge_in(speech, None)
+        self.assertTrue(detected)
+        self.assertLess(detected_at, speech_end - 1.0)
+
+    def test_spectra_saying_its_name_does_not_wake_it(self):
+        speech = np.concatenate([SPEECH, WAKE_WORD, SPEECH])
+        detected, _, _, voice_input = self.barge_in(speech, speech, user=silence(0.1))
+        self.assertFalse(detected)
+        self.assertGreater(voice_input.echo_stats["cancelled_chunks"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,6 +23,9 @@ class AnimatedOrb(QMainWindow):
         self.center = QPoint(self.window_size // 2, self.window_size // 2)
         self.color = QColor(0, 150, 255)  # Blue tone
         self.pulsating = False
+        self.api_state = "closed"  # circuit breaker state of the code generation API
+        self.level_source = None  # callable returning the microphone level (0 to 1), polled by the timer
+        self.input_level = 0.0
         
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_animation)
@@ -84,6 +87,10 @@ class AnimatedOrb(QMainWindow):
         for ring in self.rings:
             ring['phase'] = (ring['phase'] + ring['speed']) % (2 * math.pi)
         
+        # Follow the microphone: jump up with the voice, fall back slowly
+        if self.level_source:
+            self.input_level = max(min(1.0, self.level_source() * 5), self.input_level * 0.8)
+        
         self.update()
         
     def paintEvent(self, event):
@@ -93,7 +100,9 @@ class AnimatedOrb(QMainWindow):
         
         # Calculate pulse effect
         pulse = 1.0
-        if self.pulsating:
+        if self.pulsating and self.level_source:
+            pulse = 1.0 + 0.05 * (math.sin(self.animation_phase) * 0.5 + 0.5) + 0.25 * self.input_level
+        elif self.pulsating:
             pulse = 1.0 + 0.25 * (math.sin(self.animation_phase) * 0.5 + 0.5)
         
         size = self.orb_size * pulse
@@ -320,6 +329,14 @@ class AnimatedOrb(QMainWindow):
             # Pulsing green dot when listening
             pulse_size = indicator_size * (1 + 0.5 * math.sin(self.animation_phase * 3))
             status_color = QColor(0, 255, 100, 200)
+        elif self.api_state == "open":
+            # Red dot while the API is down and offline templates are used
+            pulse_size = indicator_size
+            status_color = QColor(255, 70, 70, 200)
+        elif self.api_state == "half_open":
+            # Slowly pulsing amber dot while the API is being probed
+            pulse_size = indicator_size * (1 + 0.3 * math.sin(self.animation_phase))
+            status_color = QColor(255, 180, 0, 200)
         else:
             # Static blue dot when idle
             pulse_size = indicator_size
@@ -349,6 +366,11 @@ class AnimatedOrb(QMainWindow):
             self.color = QColor(0, 150, 255)  # Blue when idle
         self.update()
     
+    def set_api_state(self, state):
+        """Show the API circuit breaker state ("closed", "open" or "half_open") in the status dot"""
+        # Picked up by the animation timer, so this is safe to call from any thread
+        self.api_state = state
+    
     def mousePressEvent(self, event):
         """Allow dragging the orb"""
         if event.button() == Qt.LeftButton: